@@ -4,21 +4,23 @@ Admin interface for Applications
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
+from core.search import search_objects
+from core.transitions import bulk_transition
 from .models import Document, Application, VisaApplication, PassportApplication
 
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
     """Document Admin"""
-    list_display = ['document_type', 'owner_name', 'original_filename', 'file_size_display', 
+    list_display = ['thumbnail_display', 'document_type', 'owner_name', 'original_filename', 'file_size_display', 
                     'is_verified', 'created_at']
     list_filter = ['document_type', 'is_verified', 'created_at']
     search_fields = ['owner__email', 'owner__first_name', 'owner__last_name', 'original_filename']
-    readonly_fields = ['file_size', 'created_at', 'updated_at', 'verified_at']
+    readonly_fields = ['file_size', 'preview_display', 'created_at', 'updated_at', 'verified_at']
     
     fieldsets = (
         (_('Document'), {
-            'fields': ('owner', 'document_type', 'file', 'original_filename', 'file_size', 'description')
+            'fields': ('owner', 'document_type', 'file', 'preview_display', 'original_filename', 'file_size', 'description')
         }),
         (_('Vérification'), {
             'fields': ('is_verified', 'verified_by', 'verified_at', 'verification_notes')
@@ -35,6 +37,22 @@ class DocumentAdmin(admin.ModelAdmin):
         return obj.owner.get_full_name()
     owner_name.short_description = _('Propriétaire')
     
+    def thumbnail_display(self, obj):
+        if obj.thumbnail:
+            return format_html('<img src="{}" style="max-height: 48px;" loading="lazy" />', obj.thumbnail.url)
+        return '-'
+    thumbnail_display.short_description = _('Aperçu')
+    
+    def preview_display(self, obj):
+        """Size-capped preview instead of the full-size original"""
+        if obj.preview:
+            return format_html(
+                '<a href="{}" target="_blank"><img src="{}" style="max-width: 320px;" /></a>',
+                obj.preview.url, obj.thumbnail.url if obj.thumbnail else obj.preview.url
+            )
+        return _('Aperçu non disponible')
+    preview_display.short_description = _('Aperçu')
+    
     def file_size_display(self, obj):
         """Display file size in human-readable format"""
         size_mb = obj.file_size / (1024 * 1024)
@@ -93,6 +111,12 @@ class ApplicationAdmin(admin.ModelAdmin):
     
     actions = ['mark_as_under_review', 'mark_as_processing', 'mark_as_ready', 'mark_as_completed']
     
+    def get_search_results(self, request, queryset, search_term):
+        """Search through the full-text index (core.search) instead of LIKE scans"""
+        if not search_term.strip():
+            return queryset, False
+        return search_objects(queryset, search_term), False
+    
     def applicant_name(self, obj):
         return obj.applicant.get_full_name()
     applicant_name.short_description = _('Demandeur')
@@ -119,26 +143,28 @@ class ApplicationAdmin(admin.ModelAdmin):
         )
     status_badge.short_description = _('Statut')
     
+    def _transition_selected(self, request, queryset, new_status, label):
+        updated, skipped = bulk_transition(queryset, new_status, user=request.user)
+        message = f'{updated} demande(s) {label}.'
+        if skipped:
+            message += f' {skipped} ignorée(s) (transition non autorisée).'
+        self.message_user(request, message)
+    
     @admin.action(description=_('Marquer en vérification'))
     def mark_as_under_review(self, request, queryset):
-        updated = queryset.update(status='UNDER_REVIEW')
-        self.message_user(request, f'{updated} demande(s) en vérification.')
+        self._transition_selected(request, queryset, Application.Status.UNDER_REVIEW, 'en vérification')
     
     @admin.action(description=_('Marquer en traitement'))
     def mark_as_processing(self, request, queryset):
-        updated = queryset.update(status='PROCESSING')
-        self.message_user(request, f'{updated} demande(s) en traitement.')
+        self._transition_selected(request, queryset, Application.Status.PROCESSING, 'en traitement')
     
     @admin.action(description=_('Marquer prêt'))
     def mark_as_ready(self, request, queryset):
-        updated = queryset.update(status='READY')
-        self.message_user(request, f'{updated} demande(s) prête(s).')
+        self._transition_selected(request, queryset, Application.Status.READY, 'prête(s)')
     
     @admin.action(description=_('Marquer terminé'))
     def mark_as_completed(self, request, queryset):
-        from django.utils import timezone
-        updated = queryset.update(status='COMPLETED', completed_at=timezone.now())
-        self.message_user(request, f'{updated} demande(s) terminée(s).')
+        self._transition_selected(request, queryset, Application.Status.COMPLETED, 'terminée(s)')
 
 
 @admin.register(VisaApplication)
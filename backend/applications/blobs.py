@@ -0,0 +1,117 @@
+"""
+Content-addressed storage for application documents
+
+A new Document file is hashed (SHA-256, streamed chunk by chunk) before it is
+written. Bytes already stored for another document are not written again:
+the new row points to the existing DocumentBlob. Blobs no document points
+to any more are removed by ``collect_orphan_blobs`` (manage.py
+dedupe_documents).
+"""
+import hashlib
+import logging
+import os
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Document, DocumentBlob
+
+logger = logging.getLogger('embassy')
+
+
+def blob_path(digest, filename):
+    ext = os.path.splitext(filename)[1].lower()
+    return os.path.join('documents', 'blobs', digest[:2], f"{digest}{ext}")
+
+
+def hash_file(file):
+    """SHA-256 of a Django File, read in chunks"""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def acquire_blob(file, filename, storage):
+    """Return the blob holding the content of ``file``, storing it if new"""
+    digest = hash_file(file)
+    with transaction.atomic():
+        blob, created = DocumentBlob.objects.select_for_update().get_or_create(
+            sha256=digest, defaults={'size': file.size}
+        )
+        if created or not storage.exists(blob.file.name):
+            blob.file.name = storage.save(blob_path(digest, filename), file)
+            blob.save(update_fields=['file'])
+    return blob
+
+
+def attach_blob(document):
+    """Point the uncommitted ``document.file`` at its content blob"""
+    field_file = document.file
+    blob = acquire_blob(field_file.file, field_file.name, field_file.storage)
+
+    field_file.name = blob.file.name
+    field_file._committed = True
+    document.blob = blob
+    return blob
+
+
+def backfill_blobs(dry_run=False):
+    """
+    Move documents saved before deduplication onto blobs
+
+    Duplicate files are deleted once their document points to the shared
+    blob. Returns ``(documents, bytes_freed)``.
+    """
+    count = freed = 0
+    documents = Document.objects.filter(blob__isnull=True).exclude(file='').order_by('id')
+    for document in documents.iterator():
+        storage = document.file.storage
+        old_name = document.file.name
+        try:
+            with document.file.open('rb') as file:
+                digest = hash_file(file)
+        except OSError as e:
+            logger.warning(f"Document {document.pk}: fichier illisible ({e})")
+            continue
+        count += 1
+        if dry_run:
+            continue
+
+        with transaction.atomic():
+            blob, created = DocumentBlob.objects.select_for_update().get_or_create(
+                sha256=digest, defaults={'size': document.file.size, 'file': old_name}
+            )
+            Document.objects.filter(pk=document.pk).update(blob=blob, file=blob.file.name)
+
+        if blob.file.name != old_name and not Document.objects.filter(file=old_name).exists():
+            freed += storage.size(old_name)
+            storage.delete(old_name)
+    return count, freed
+
+
+def collect_orphan_blobs(grace_hours=1, dry_run=False):
+    """
+    Delete blobs that no document references any more
+
+    Blobs younger than ``grace_hours`` are kept: their document may still be
+    being saved. Returns ``(blobs, bytes_freed)``.
+    """
+    horizon = timezone.now() - timedelta(hours=grace_hours)
+    orphans = DocumentBlob.objects.filter(documents__isnull=True, created_at__lt=horizon)
+    count = freed = 0
+    for blob in orphans.iterator():
+        count += 1
+        freed += blob.size
+        if dry_run:
+            continue
+        with transaction.atomic():
+            # Re-check under lock: a new upload may have just claimed it
+            locked = DocumentBlob.objects.select_for_update().filter(pk=blob.pk).first()
+            if locked is None or locked.documents.exists():
+                continue
+            locked.delete()
+            transaction.on_commit(lambda name=blob.file.name, storage=blob.file.storage: storage.delete(name))
+    return count, freed
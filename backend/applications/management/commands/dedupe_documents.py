@@ -0,0 +1,34 @@
+"""
+Management command to deduplicate stored application documents
+Usage: python manage.py dedupe_documents [--dry-run] [--grace-hours 1]
+"""
+from django.core.management.base import BaseCommand
+from applications.blobs import backfill_blobs, collect_orphan_blobs
+
+
+class Command(BaseCommand):
+    help = 'Regroupe les documents identiques sur un seul fichier et supprime les contenus orphelins'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Affiche ce qui serait fait sans rien modifier',
+        )
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=1,
+            help='Âge minimal (heures) d\'un contenu orphelin avant suppression',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        documents, backfill_freed = backfill_blobs(dry_run=dry_run)
+        blobs, orphan_freed = collect_orphan_blobs(grace_hours=options['grace_hours'], dry_run=dry_run)
+
+        prefix = '[simulation] ' if dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}{documents} document(s) rattaché(s), {blobs} contenu(s) orphelin(s) supprimé(s), '
+            f'{(backfill_freed + orphan_freed) / (1024 * 1024):.1f} MB libéré(s).'
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:26
+
+import core.utils.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("applications", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="preview",
+            field=models.ImageField(
+                blank=True,
+                editable=False,
+                null=True,
+                upload_to=core.utils.images.derivative_upload_path,
+                verbose_name="Aperçu",
+            ),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="thumbnail",
+            field=models.ImageField(
+                blank=True,
+                editable=False,
+                null=True,
+                upload_to=core.utils.images.derivative_upload_path,
+                verbose_name="Miniature",
+            ),
+        ),
+    ]
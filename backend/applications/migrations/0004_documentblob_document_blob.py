@@ -0,0 +1,63 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("applications", "0003_document_preview_document_thumbnail"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sha256",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="Empreinte SHA-256"
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        max_length=255, upload_to="", verbose_name="Fichier"
+                    ),
+                ),
+                ("size", models.BigIntegerField(verbose_name="Taille (octets)")),
+                (
+                    "ref_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Références"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Contenu de document",
+                "verbose_name_plural": "Contenus de documents",
+            },
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="documents",
+                to="applications.documentblob",
+                verbose_name="Contenu",
+            ),
+        ),
+    ]
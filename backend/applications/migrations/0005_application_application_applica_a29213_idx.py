@@ -0,0 +1,20 @@
+# Generated by Django 4.2.11 on 2026-10-19 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("applications", "0004_documentblob_document_blob"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="application",
+            index=models.Index(
+                fields=["applicant", "updated_at"],
+                name="application_applica_a29213_idx",
+            ),
+        ),
+    ]
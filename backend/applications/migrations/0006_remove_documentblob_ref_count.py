@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-19 15:45
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("applications", "0005_application_application_applica_a29213_idx"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="documentblob",
+            name="ref_count",
+        ),
+    ]
@@ -6,6 +6,7 @@ from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
 from core.models import ServiceType, ConsularOffice
+from core.utils.images import derivative_upload_path
 import uuid
 import os
 
@@ -17,6 +18,24 @@ def get_document_upload_path(instance, filename):
     return os.path.join('documents', str(instance.owner.id), filename)
 
 
+class DocumentBlob(models.Model):
+    """
+    Unique document content, stored once under its SHA-256 (see applications.blobs)
+    Every Document with the same bytes points to the same blob
+    """
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name=_('Empreinte SHA-256'))
+    file = models.FileField(max_length=255, verbose_name=_('Fichier'))
+    size = models.BigIntegerField(verbose_name=_('Taille (octets)'))
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('Contenu de document')
+        verbose_name_plural = _('Contenus de documents')
+    
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} octets)"
+
+
 class Document(models.Model):
     """
     Uploaded documents (passports, photos, supporting docs, etc.)
@@ -51,6 +70,26 @@ class Document(models.Model):
     )
     original_filename = models.CharField(max_length=255, verbose_name=_('Nom du fichier'))
     file_size = models.IntegerField(verbose_name=_('Taille (octets)'))
+    # Shared content behind ``file``; set when a new file is saved
+    blob = models.ForeignKey(
+        DocumentBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='documents',
+        verbose_name=_('Contenu')
+    )
+    
+    # Image derivatives built in the background (core.utils.images)
+    preview = models.ImageField(
+        upload_to=derivative_upload_path, blank=True, null=True, editable=False,
+        verbose_name=_('Aperçu')
+    )
+    thumbnail = models.ImageField(
+        upload_to=derivative_upload_path, blank=True, null=True, editable=False,
+        verbose_name=_('Miniature')
+    )
     
     # Verification
     is_verified = models.BooleanField(default=False, verbose_name=_('Vérifié'))
@@ -83,6 +122,10 @@ class Document(models.Model):
             self.file_size = self.file.size
         if self.file and not self.original_filename:
             self.original_filename = os.path.basename(self.file.name)
+        if self.file and not self.file._committed:
+            # New upload: store it once per content instead of under a fresh name
+            from .blobs import attach_blob
+            attach_blob(self)
         super().save(*args, **kwargs)
 
 
@@ -112,7 +155,27 @@ class Application(models.Model):
         COMPLETED = 'COMPLETED', _('Terminé')
         REJECTED = 'REJECTED', _('Rejeté')
         CANCELLED = 'CANCELLED', _('Annulé')
-    
+
+    # Legal status graph, enforced by core.transitions
+    STATUS_TRANSITIONS = {
+        Status.DRAFT: [Status.SUBMITTED, Status.CANCELLED],
+        Status.SUBMITTED: [Status.UNDER_REVIEW, Status.REJECTED, Status.CANCELLED],
+        Status.UNDER_REVIEW: [Status.ADDITIONAL_INFO_REQUIRED, Status.PAYMENT_PENDING, Status.PROCESSING,
+                              Status.REJECTED, Status.CANCELLED],
+        Status.ADDITIONAL_INFO_REQUIRED: [Status.UNDER_REVIEW, Status.REJECTED, Status.CANCELLED],
+        Status.PAYMENT_PENDING: [Status.PAYMENT_RECEIVED, Status.REJECTED, Status.CANCELLED],
+        Status.PAYMENT_RECEIVED: [Status.PROCESSING, Status.REJECTED, Status.CANCELLED],
+        Status.PROCESSING: [Status.READY, Status.REJECTED, Status.CANCELLED],
+        Status.READY: [Status.COMPLETED, Status.CANCELLED],
+        Status.COMPLETED: [],
+        Status.REJECTED: [Status.UNDER_REVIEW],
+        Status.CANCELLED: [],
+    }
+    STATUS_TIMESTAMPS = {
+        Status.SUBMITTED: 'submitted_at',
+        Status.COMPLETED: 'completed_at',
+    }
+
     # Reference
     reference_number = models.CharField(
         max_length=20,
@@ -211,6 +274,7 @@ class Application(models.Model):
             models.Index(fields=['status', '-created_at']),
             models.Index(fields=['applicant', '-created_at']),
             models.Index(fields=['reference_number']),
+            models.Index(fields=['applicant', 'updated_at']),
         ]
     
     def __str__(self):
@@ -3,19 +3,22 @@ Serializers for Application models
 """
 from rest_framework import serializers
 from .models import Document, Application, VisaApplication, PassportApplication
-from core.serializers import ServiceTypeListSerializer
+from core.serializers import ConsularOfficeSerializer, ServiceTypeListSerializer
+from core.sparse_fields import SparseFieldsMixin
 
 
 class DocumentSerializer(serializers.ModelSerializer):
     """Document serializer"""
     document_type_display = serializers.CharField(source='get_document_type_display', read_only=True)
     file_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Document
         fields = [
             'id', 'document_type', 'document_type_display', 'file', 'file_url',
-            'original_filename', 'file_size', 'description',
+            'preview_url', 'thumbnail_url', 'original_filename', 'file_size', 'description',
             'is_verified', 'verified_at', 'verification_notes',
             'created_at'
         ]
@@ -31,6 +34,20 @@ class DocumentSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.file.url)
         return None
     
+    def get_preview_url(self, obj):
+        if obj.preview:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(obj.preview.url)
+        return None
+    
+    def get_thumbnail_url(self, obj):
+        if obj.thumbnail:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(obj.thumbnail.url)
+        return None
+    
     def validate_file(self, value):
         """Validate file size and type"""
         from django.conf import settings
@@ -124,8 +141,8 @@ class PassportApplicationSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class ApplicationSerializer(serializers.ModelSerializer):
-    """Application serializer"""
+class ApplicationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Application serializer (supports ?fields= and ?expand=office,service_type)"""
     application_type_display = serializers.CharField(source='get_application_type_display', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     applicant_name = serializers.CharField(source='applicant.get_full_name', read_only=True)
@@ -136,6 +153,11 @@ class ApplicationSerializer(serializers.ModelSerializer):
     passport_details = PassportApplicationSerializer(read_only=True)
     is_paid = serializers.BooleanField(read_only=True)
     
+    EXPANDABLE_FIELDS = {
+        'office': (ConsularOfficeSerializer, {}),
+        'service_type': (ServiceTypeListSerializer, {}),
+    }
+    
     class Meta:
         model = Application
         fields = [
@@ -154,6 +176,34 @@ class ApplicationSerializer(serializers.ModelSerializer):
         ]
 
 
+class ApplicationListSerializer(serializers.ModelSerializer):
+    """Slim application serializer for list views (no documents, no details)"""
+    application_type_display = serializers.CharField(source='get_application_type_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    office_name = serializers.CharField(source='office.name', read_only=True)
+    service_name = serializers.CharField(source='service_type.name', read_only=True)
+    
+    # Columns needed by the fields above, for queryset.only()
+    QUERY_FIELDS = [
+        'id', 'reference_number', 'application_type', 'office__name', 'service_type__name',
+        'status', 'total_fee', 'submitted_at', 'created_at', 'updated_at',
+    ]
+    
+    class Meta:
+        model = Application
+        fields = [
+            'id', 'reference_number', 'application_type', 'application_type_display',
+            'service_type', 'service_name', 'office', 'office_name',
+            'status', 'status_display', 'total_fee',
+            'submitted_at', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+    
+    @classmethod
+    def setup_queryset(cls, queryset):
+        return queryset.select_related('office', 'service_type').only(*cls.QUERY_FIELDS)
+
+
 class ApplicationCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating applications"""
     visa_details = VisaApplicationSerializer(required=False)
@@ -1,10 +1,12 @@
 """
 Signals for application notifications
 """
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
-from .models import Application
+from core.transitions import status_changed, statuses_changed
+from .models import Application, Document, VisaApplication
 from notifications.sync_tasks import notify_application_status_changed_sync, notify_application_received_sync
 
 
@@ -30,10 +32,48 @@ def application_created_notification(sender, instance, created, **kwargs):
         )
 
 
+@receiver(post_save, sender=Document)
+def document_image_derivatives(sender, instance, **kwargs):
+    """
+    Queue the preview/thumbnail build for image documents
+    """
+    from core.utils.images import schedule_image_derivatives
+    schedule_image_derivatives(instance)
+
+
+@receiver(post_save, sender=Application)
+def application_search_entry(sender, instance, **kwargs):
+    """
+    Refresh the application's full-text search entry
+    """
+    from core.search import schedule_reindex
+    schedule_reindex(Application, instance.pk)
+
+
+@receiver(post_save, sender=VisaApplication)
+def visa_details_search_entry(sender, instance, **kwargs):
+    """
+    The visa destination is part of the application's search entry
+    """
+    from core.search import schedule_reindex
+    schedule_reindex(Application, instance.application_id)
+
+
+@receiver(post_delete, sender=Application)
+def application_search_entry_removed(sender, instance, **kwargs):
+    """
+    Drop the deleted application from the search index
+    """
+    from core.search import remove_from_index
+    remove_from_index(Application, [instance.pk])
+
+
 @receiver(pre_save, sender=Application)
 def application_status_changed_notification(sender, instance, **kwargs):
     """
-    Send notification when application status changes
+    Send notification when application status changes through a plain save()
+    (admin form edits, payment confirmation). Transitions made through
+    core.transitions are handled by application_status_transitioned.
     """
     if instance.pk:
         try:
@@ -55,3 +95,62 @@ def application_status_changed_notification(sender, instance, **kwargs):
                 )
         except Application.DoesNotExist:
             pass
+
+
+@receiver(status_changed, sender=Application)
+def application_status_transitioned(sender, instance, old_status, new_status, user=None, note='', notify=True, **kwargs):
+    """
+    Log and notify status transitions made through core.transitions
+    """
+    from core.models import AuditLog
+    from django.contrib.contenttypes.models import ContentType
+
+    description = f"Statut changé: {old_status} → {new_status} - {instance.reference_number}"
+    if note:
+        description = f"{description} - {note}"
+
+    AuditLog.objects.create(
+        user=user or instance.applicant,
+        action='UPDATE',
+        description=description,
+        content_type=ContentType.objects.get_for_model(Application),
+        object_id=instance.id
+    )
+
+    if notify:
+        # Emails the applicant: only once the transition is committed
+        application_id = instance.id
+        transaction.on_commit(lambda: notify_application_status_changed_sync(application_id))
+
+
+@receiver(statuses_changed, sender=Application)
+def application_statuses_bulk_transitioned(sender, changes, new_status, user=None, note='', notify=True, **kwargs):
+    """
+    Log bulk transitions with one INSERT and notify the applicants from
+    batched background jobs
+    """
+    from core.models import AuditLog
+    from django.contrib.contenttypes.models import ContentType
+
+    content_type = ContentType.objects.get_for_model(Application)
+    rows = Application.objects.filter(pk__in=list(changes)).values_list('pk', 'reference_number', 'applicant_id')
+    logs = []
+    for pk, reference_number, applicant_id in rows:
+        description = f"Statut changé: {changes[pk]} → {new_status} - {reference_number}"
+        if note:
+            description = f"{description} - {note}"
+        logs.append(AuditLog(
+            user_id=user.pk if user else applicant_id,
+            action='UPDATE',
+            description=description,
+            content_type=content_type,
+            object_id=pk
+        ))
+    AuditLog.objects.bulk_create(logs)
+
+    if notify:
+        from notifications.tasks import enqueue_in_batches
+        ids = list(changes)
+        transaction.on_commit(
+            lambda: enqueue_in_batches('notifications.tasks.notify_application_status_changed_batch', ids)
+        )
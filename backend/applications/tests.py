@@ -2,6 +2,7 @@
 Tests for Applications app
 """
 from django.test import TestCase
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from .models import Document, Application
@@ -46,6 +47,84 @@ class DocumentModelTest(TestCase):
         self.assertIn("Passeport", str(self.document))
 
 
+    def test_image_derivatives(self):
+        """Image documents get an upright, metadata-free preview and thumbnail"""
+        import tempfile
+        from io import BytesIO
+        from unittest import mock
+        from django.test import override_settings
+        from PIL import Image
+        from core.utils.images import generate_image_derivatives
+
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90° clockwise
+        buffer = BytesIO()
+        Image.new('RGB', (2000, 1000), 'blue').save(buffer, format='JPEG', exif=exif)
+
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media), \
+                mock.patch('django_q.tasks.async_task') as async_task, \
+                self.captureOnCommitCallbacks(execute=True):
+            document = Document.objects.create(
+                owner=self.user,
+                document_type="PHOTO",
+                file=SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg"),
+                original_filename="photo.jpg",
+                file_size=len(buffer.getvalue()),
+            )
+            self.assertTrue(generate_image_derivatives('applications.Document', document.pk))
+            document.refresh_from_db()
+
+            with Image.open(document.thumbnail.path) as thumbnail:
+                self.assertEqual(thumbnail.size, (160, 320))
+                self.assertFalse(thumbnail.getexif())
+            with Image.open(document.preview.path) as preview:
+                self.assertEqual(max(preview.size), 1600)
+            self.assertIn('/derived/', document.thumbnail.name)
+
+        async_task.assert_called_once_with(
+            'core.utils.images.generate_image_derivatives', 'applications.Document', document.pk
+        )
+        # PDFs are left alone
+        self.assertFalse(generate_image_derivatives('applications.Document', self.document.pk))
+
+    def test_identical_files_share_one_blob(self):
+        """Same bytes uploaded twice are stored once and collected when unused"""
+        import os
+        import tempfile
+        from django.test import override_settings
+        from .blobs import collect_orphan_blobs
+        from .models import DocumentBlob
+
+        content = b"%PDF-1.4 identical passport scan"
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            documents = [
+                Document.objects.create(
+                    owner=self.user,
+                    document_type="PASSPORT",
+                    file=SimpleUploadedFile(name, content, content_type="application/pdf"),
+                )
+                for name in ("passeport.pdf", "passeport (1).pdf")
+            ]
+            first, second = documents
+            self.assertEqual(first.blob_id, second.blob_id)
+            self.assertEqual(first.file.name, second.file.name)
+            self.assertEqual(first.original_filename, "passeport.pdf")
+            blob = DocumentBlob.objects.get(pk=first.blob_id)
+            self.assertEqual(blob.documents.count(), 2)
+            self.assertEqual(os.listdir(os.path.dirname(first.file.path)), [os.path.basename(first.file.name)])
+
+            first.delete()
+            self.assertEqual(collect_orphan_blobs(grace_hours=0), (0, 0))
+            self.assertTrue(os.path.exists(second.file.path))
+
+            second.delete()
+            self.assertFalse(blob.documents.exists())
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(collect_orphan_blobs(grace_hours=0), (1, len(content)))
+            self.assertFalse(DocumentBlob.objects.filter(pk=blob.pk).exists())
+            self.assertFalse(os.path.exists(second.file.path))
+
+
 class ApplicationModelTest(TestCase):
     """Test Application model"""
 
@@ -102,6 +181,137 @@ class ApplicationModelTest(TestCase):
         self.application.save()
         self.assertFalse(self.application.can_be_cancelled)
 
+    def test_status_transition(self):
+        """Status graph uses the stored INFO_REQUIRED value"""
+        from core.transitions import transition, InvalidTransition
+
+        transition(self.application, Application.Status.SUBMITTED, notify=False)
+        self.assertIsNotNone(self.application.submitted_at)
+        transition(self.application, Application.Status.UNDER_REVIEW, notify=False)
+        transition(self.application, Application.Status.ADDITIONAL_INFO_REQUIRED, notify=False)
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.status, 'INFO_REQUIRED')
+
+        with self.assertRaises(InvalidTransition):
+            transition(self.application, Application.Status.COMPLETED, notify=False)
+
+    def test_transition_notifies_after_commit(self):
+        """The applicant is emailed once the transition commits, never before"""
+        from unittest import mock
+        from core.transitions import transition
+
+        with mock.patch('applications.signals.notify_application_status_changed_sync') as notify:
+            with self.captureOnCommitCallbacks() as callbacks:
+                transition(self.application, Application.Status.SUBMITTED)
+            notify.assert_not_called()
+            for callback in callbacks:
+                callback()
+        notify.assert_called_once_with(self.application.id)
+
+    def test_bulk_transition(self):
+        """Bulk transitions write one UPDATE, one audit INSERT and queue batched notifications"""
+        from unittest import mock
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.models import AuditLog
+        from core.transitions import bulk_transition
+
+        Application.objects.filter(pk=self.application.pk).update(status=Application.Status.SUBMITTED)
+        others = [
+            Application.objects.create(
+                application_type="VISA",
+                service_type=self.service,
+                applicant=self.user,
+                office=self.office,
+                base_fee=50000,
+                status=Application.Status.SUBMITTED,
+            )
+            for _ in range(3)
+        ]
+        queryset = Application.objects.filter(pk__in=[self.application.pk] + [a.pk for a in others])
+        draft = others[0]
+        Application.objects.filter(pk=draft.pk).update(status=Application.Status.DRAFT)
+        logs_before = AuditLog.objects.count()
+
+        with mock.patch('notifications.tasks.async_task') as async_task, \
+                self.captureOnCommitCallbacks(execute=True), \
+                CaptureQueriesContext(connection) as queries:
+            updated, skipped = bulk_transition(queryset, Application.Status.UNDER_REVIEW)
+
+        self.assertEqual((updated, skipped), (3, 1))
+        self.assertEqual(
+            len([q for q in queries if q['sql'].startswith('UPDATE "applications_application"')]), 1
+        )
+        self.assertEqual(AuditLog.objects.count(), logs_before + 3)
+        async_task.assert_called_once()
+        self.assertEqual(len(async_task.call_args[0][1]), 3)
+        draft.refresh_from_db()
+        self.assertEqual(draft.status, Application.Status.DRAFT)
+
+    def test_drafts_are_paginated(self):
+        """Test drafts uses pagination and the slim list serializer"""
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/applications/drafts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        item = response.data['results'][0]
+        self.assertEqual(item['office_name'], "Test Embassy")
+        self.assertNotIn('documents', item)
+
+    def test_search(self):
+        """Full-text search matches word prefixes without accents and keeps citizens to their records"""
+        from rest_framework.test import APIClient
+        from .models import VisaApplication
+
+        # Entries are refreshed on commit by the save signals
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name, self.user.last_name = "Hélène", "Mbemba"
+            self.user.save()
+            VisaApplication.objects.create(
+                application=self.application,
+                visa_type="TOURIST",
+                purpose_of_visit="Tourisme",
+                intended_entry_date=timezone.now().date(),
+                intended_departure_date=timezone.now().date(),
+                duration_days=10,
+                destination_city="Brazzaville",
+            )
+            other = User.objects.create_user(username="other", email="other@example.com", password="testpass123")
+            other_application = Application.objects.create(
+                application_type="VISA",
+                service_type=self.service,
+                applicant=other,
+                office=self.office,
+                base_fee=50000,
+            )
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for query in ("helene mbem", "brazza", self.application.reference_number.replace('-', '')[:7]):
+            response = client.get('/api/applications/search/', {'q': query})
+            self.assertEqual(response.status_code, 200, query)
+            self.assertEqual([item['id'] for item in response.data['results']], [self.application.id], query)
+
+        # Both applications are at Dakar, but a citizen only finds their own
+        response = client.get('/api/applications/search/', {'q': 'dakar'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(client.get('/api/applications/search/', {'q': 'x'}).status_code, 400)
+
+        other.role = 'AGENT_CONSULAIRE'
+        other.save()
+        client.force_authenticate(other)
+        response = client.get('/api/applications/search/', {'q': 'dakar'})
+        self.assertEqual(
+            [item['id'] for item in response.data['results']], [other_application.id, self.application.id]
+        )
+
+        other_application.delete()
+        response = client.get('/api/applications/search/', {'q': 'other'})
+        self.assertEqual(response.data['count'], 0)
+
     def test_is_paid(self):
         """Test is_paid property"""
         from payments.models import Payment
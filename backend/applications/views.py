@@ -7,13 +7,17 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from .models import Document, Application
 from .serializers import (
-    DocumentSerializer, ApplicationSerializer, ApplicationCreateSerializer
+    DocumentSerializer, ApplicationSerializer, ApplicationListSerializer, ApplicationCreateSerializer
 )
 from core.models import AuditLog, SiteSettings
 from core.permissions import IsAgent
+from core.search import search_objects
+from core.sparse_fields import SparseFieldsViewMixin
+from core.transitions import transition, TransitionError
 from notifications.tasks import notify_application_missing_documents
 
 
@@ -47,7 +51,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
         )
 
 
-class ApplicationViewSet(viewsets.ModelViewSet):
+class ApplicationViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing applications
     Users can only view/manage their own applications
@@ -67,8 +71,20 @@ class ApplicationViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'create':
             return ApplicationCreateSerializer
+        if self.action in ('drafts', 'in_progress', 'completed', 'search'):
+            return ApplicationListSerializer
         return ApplicationSerializer
     
+    def paginated_list(self, queryset):
+        """Paginate ``queryset`` through the slim list serializer"""
+        serializer_class = self.get_serializer_class()
+        page = self.paginate_queryset(serializer_class.setup_queryset(queryset))
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+    
     def create(self, request, *args, **kwargs):
         """Vérifier si les demandes sont activées"""
         # Vérifier si les demandes sont activées
@@ -128,19 +144,10 @@ class ApplicationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        from django.utils import timezone
-        application.status = 'SUBMITTED'
-        application.submitted_at = timezone.now()
-        application.save()
-        
-        # Log submission
-        AuditLog.objects.create(
-            user=request.user,
-            action='UPDATE',
-            description=f"Demande soumise: {application.reference_number}",
-            content_type=ContentType.objects.get_for_model(Application),
-            object_id=application.id
-        )
+        try:
+            transition(application, Application.Status.SUBMITTED, user=request.user, note='Demande soumise')
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=e.status_code)
         
         return Response({"status": "Demande soumise avec succès."})
     
@@ -181,19 +188,16 @@ class ApplicationViewSet(viewsets.ModelViewSet):
             )
         
         # Annuler la demande
-        application.status = 'CANCELLED'
+        fields = {}
         if user.role in ['ADMIN', 'SUPERADMIN', 'AGENT_CONSULAIRE']:
-            application.admin_notes = f"{application.admin_notes or ''}\n\nAnnulation: {request.data.get('admin_reason', '')}".strip()
-        application.save()
-        
-        # Log cancellation
-        AuditLog.objects.create(
-            user=request.user,
-            action='UPDATE',
-            description=f"Demande annulée: {application.reference_number} - {cancellation_reason}",
-            content_type=ContentType.objects.get_for_model(Application),
-            object_id=application.id
-        )
+            fields['admin_notes'] = f"{application.admin_notes or ''}\n\nAnnulation: {request.data.get('admin_reason', '')}".strip()
+        try:
+            transition(
+                application, Application.Status.CANCELLED,
+                user=request.user, fields=fields, note=cancellation_reason
+            )
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=e.status_code)
         
         return Response({
             "status": "Demande annulée avec succès.",
@@ -223,54 +227,22 @@ class ApplicationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Vérifier les transitions de statut valides
-        valid_transitions = {
-            'DRAFT': ['SUBMITTED', 'CANCELLED'],
-            'SUBMITTED': ['UNDER_REVIEW', 'REJECTED', 'CANCELLED'],
-            'UNDER_REVIEW': ['ADDITIONAL_INFO_REQUIRED', 'PAYMENT_PENDING', 'PROCESSING', 'REJECTED', 'CANCELLED'],
-            'ADDITIONAL_INFO_REQUIRED': ['UNDER_REVIEW', 'REJECTED', 'CANCELLED'],
-            'PAYMENT_PENDING': ['PAYMENT_RECEIVED', 'REJECTED', 'CANCELLED'],
-            'PAYMENT_RECEIVED': ['PROCESSING', 'REJECTED', 'CANCELLED'],
-            'PROCESSING': ['READY', 'REJECTED', 'CANCELLED'],
-            'READY': ['COMPLETED', 'CANCELLED'],
-            'COMPLETED': [],
-            'REJECTED': ['UNDER_REVIEW'],
-            'CANCELLED': []
-        }
-        
-        if new_status not in valid_transitions.get(application.status, []):
-            return Response(
-                {"error": f"Transition de statut invalide de {application.status} vers {new_status}."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Mettre à jour le statut
         old_status = application.status
-        application.status = new_status
+        fields = {}
         
         # Ajouter les notes administratives
         if admin_notes:
-            application.admin_notes = f"{application.admin_notes or ''}\n\n{admin_notes}".strip()
+            fields['admin_notes'] = f"{application.admin_notes or ''}\n\n{admin_notes}".strip()
         
         # Ajouter la raison de rejet si applicable
         if new_status == 'REJECTED' and rejection_reason:
-            application.rejection_reason = rejection_reason
-        
-        # Marquer comme terminé si nécessaire
-        if new_status == 'COMPLETED':
-            from django.utils import timezone
-            application.completed_at = timezone.now()
-        
-        application.save()
+            fields['rejection_reason'] = rejection_reason
         
-        # Log de la modification
-        AuditLog.objects.create(
-            user=user,
-            action='UPDATE',
-            description=f"Statut changé: {old_status} → {new_status} - {application.reference_number}",
-            content_type=ContentType.objects.get_for_model(Application),
-            object_id=application.id
-        )
+        # Le graphe des transitions valides est porté par Application.STATUS_TRANSITIONS
+        try:
+            transition(application, new_status, user=user, fields=fields)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=e.status_code)
         
         return Response({
             "status": "Statut mis à jour avec succès.",
@@ -281,27 +253,41 @@ class ApplicationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def drafts(self, request):
         """Get user's draft applications"""
-        applications = self.get_queryset().filter(status='DRAFT')
-        serializer = self.get_serializer(applications, many=True)
-        return Response(serializer.data)
+        applications = self.get_queryset().filter(status='DRAFT').order_by('-created_at', '-id')
+        return self.paginated_list(applications)
     
     @action(detail=False, methods=['get'])
     def in_progress(self, request):
         """Get user's in-progress applications"""
         applications = self.get_queryset().filter(
             status__in=['SUBMITTED', 'UNDER_REVIEW', 'PROCESSING']
-        )
-        serializer = self.get_serializer(applications, many=True)
-        return Response(serializer.data)
+        ).order_by('-created_at', '-id')
+        return self.paginated_list(applications)
     
     @action(detail=False, methods=['get'])
     def completed(self, request):
         """Get user's completed applications"""
         applications = self.get_queryset().filter(
             status__in=['READY', 'COMPLETED']
-        )
-        serializer = self.get_serializer(applications, many=True)
-        return Response(serializer.data)
+        ).order_by('-created_at', '-id')
+        return self.paginated_list(applications)
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Full-text search: reference, applicant name or email, destination, service, office"""
+        query = request.query_params.get('q', '').strip()
+        if len(query) < 2:
+            return Response(
+                {"error": "La recherche doit contenir au moins 2 caractères."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        user = request.user
+        owner = None if user.role in ['ADMIN', 'SUPERADMIN', 'AGENT_CONSULAIRE'] else user
+        applications = search_objects(
+            self.get_queryset(), query, owner=owner, limit=settings.SEARCH_MAX_RESULTS
+        ).order_by('-id')
+        return self.paginated_list(applications)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsAgent])
     def request_missing_documents(self, request, pk=None):
@@ -1,10 +1,14 @@
 """
 Admin interface for Appointments
 """
+import base64
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
-from .models import Appointment, AppointmentSlot
+from core.search import search_objects
+from core.transitions import bulk_transition
+from .models import Appointment, AppointmentSlot, ArchivedAppointment
+from .qr import get_appointment_qr
 
 
 @admin.register(Appointment)
@@ -45,6 +49,12 @@ class AppointmentAdmin(admin.ModelAdmin):
     
     actions = ['mark_as_confirmed', 'mark_as_completed', 'mark_as_cancelled']
     
+    def get_search_results(self, request, queryset, search_term):
+        """Search through the full-text index (core.search) instead of LIKE scans"""
+        if not search_term.strip():
+            return queryset, False
+        return search_objects(queryset, search_term), False
+    
     def user_name(self, obj):
         return obj.user.get_full_name()
     user_name.short_description = _('Utilisateur')
@@ -68,27 +78,33 @@ class AppointmentAdmin(admin.ModelAdmin):
     status_badge.short_description = _('Statut')
     
     def qr_code_display(self, obj):
-        if obj.qr_code:
-            return format_html('<img src="{}" width="200" height="200" />', obj.qr_code.url)
+        if obj.pk:
+            _version, png = get_appointment_qr(obj)
+            return format_html(
+                '<img src="data:image/png;base64,{}" width="200" height="200" />',
+                base64.b64encode(png).decode('ascii')
+            )
         return '-'
     qr_code_display.short_description = _('QR Code')
     
+    def _transition_selected(self, request, queryset, new_status, label):
+        updated, skipped = bulk_transition(queryset, new_status, user=request.user)
+        message = f'{updated} rendez-vous {label}.'
+        if skipped:
+            message += f' {skipped} ignoré(s) (transition non autorisée).'
+        self.message_user(request, message)
+    
     @admin.action(description=_('Marquer comme confirmé'))
     def mark_as_confirmed(self, request, queryset):
-        from django.utils import timezone
-        updated = queryset.update(status='CONFIRMED', confirmed_at=timezone.now())
-        self.message_user(request, f'{updated} rendez-vous confirmé(s).')
+        self._transition_selected(request, queryset, Appointment.Status.CONFIRMED, 'confirmé(s)')
     
     @admin.action(description=_('Marquer comme terminé'))
     def mark_as_completed(self, request, queryset):
-        from django.utils import timezone
-        updated = queryset.update(status='COMPLETED', completed_at=timezone.now())
-        self.message_user(request, f'{updated} rendez-vous terminé(s).')
+        self._transition_selected(request, queryset, Appointment.Status.COMPLETED, 'terminé(s)')
     
     @admin.action(description=_('Annuler'))
     def mark_as_cancelled(self, request, queryset):
-        updated = queryset.update(status='CANCELLED')
-        self.message_user(request, f'{updated} rendez-vous annulé(s).')
+        self._transition_selected(request, queryset, Appointment.Status.CANCELLED, 'annulé(s)')
 
 
 @admin.register(AppointmentSlot)
@@ -112,3 +128,19 @@ class AppointmentSlotAdmin(admin.ModelAdmin):
         }),
     )
 
+
+
+@admin.register(ArchivedAppointment)
+class ArchivedAppointmentAdmin(admin.ModelAdmin):
+    """Read-only view of archived appointments"""
+    list_display = ['reference_number', 'user', 'service_type', 'appointment_date',
+                    'appointment_time', 'status', 'office', 'archived_at']
+    list_filter = ['status', 'office', 'service_type']
+    search_fields = ['reference_number', 'user__email', 'user__first_name', 'user__last_name']
+    date_hierarchy = 'appointment_date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -5,4 +5,7 @@ class AppointmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'appointments'
     verbose_name = 'Rendez-vous'
+    
+    def ready(self):
+        import appointments.signals
 
@@ -0,0 +1,108 @@
+"""
+Hot/cold archival of finished appointments
+
+Appointments that are COMPLETED, CANCELLED or NO_SHOW and older than
+APPOINTMENT_ARCHIVE_AFTER_DAYS are moved, with their check-in logs, to the
+ArchivedAppointment/ArchivedCheckInLog tables in batches. Each batch is one
+transaction, so an interrupted run leaves no row in both tables.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, F, Value
+from django.utils import timezone
+
+from core.sync import suppress_tombstones
+
+from .models import Appointment, ArchivedAppointment, ArchivedCheckInLog, CheckInLog
+
+logger = logging.getLogger('embassy')
+
+ARCHIVABLE_STATUSES = [
+    Appointment.Status.COMPLETED,
+    Appointment.Status.CANCELLED,
+    Appointment.Status.NO_SHOW,
+]
+
+APPOINTMENT_COPY_FIELDS = [
+    'id', 'reference_number', 'user_id', 'office_id', 'service_type_id',
+    'appointment_date', 'appointment_time', 'duration_minutes', 'status',
+    'user_notes', 'admin_notes', 'assigned_agent_id', 'confirmation_sent', 'reminder_sent',
+    'created_at', 'updated_at', 'confirmed_at', 'completed_at',
+]
+CHECKIN_COPY_FIELDS = [
+    'id', 'appointment_id', 'scanned_by_id', 'scanned_at', 'reference_number', 'status_after', 'notes',
+]
+
+
+def archivable_appointments(older_than_days=None):
+    """Queryset of appointments due for archival"""
+    if older_than_days is None:
+        older_than_days = settings.APPOINTMENT_ARCHIVE_AFTER_DAYS
+    horizon = timezone.now().date() - timedelta(days=older_than_days)
+    return Appointment.objects.filter(status__in=ARCHIVABLE_STATUSES, appointment_date__lt=horizon)
+
+
+def archive_batch(ids):
+    """Move the given appointments and their check-in logs to the archive tables"""
+    with transaction.atomic():
+        appointments = Appointment.objects.select_for_update().filter(
+            id__in=ids, status__in=ARCHIVABLE_STATUSES
+        ).values(*APPOINTMENT_COPY_FIELDS)
+        archived = ArchivedAppointment.objects.bulk_create(
+            [ArchivedAppointment(**row) for row in appointments]
+        )
+        archived_ids = [row.id for row in archived]
+
+        logs = CheckInLog.objects.filter(appointment_id__in=archived_ids).values(*CHECKIN_COPY_FIELDS)
+        ArchivedCheckInLog.objects.bulk_create([ArchivedCheckInLog(**row) for row in logs])
+
+        CheckInLog.objects.filter(appointment_id__in=archived_ids).delete()
+        # Still served by /history/: not a deletion for delta sync clients
+        with suppress_tombstones():
+            Appointment.objects.filter(id__in=archived_ids).delete()
+    return len(archived_ids)
+
+
+def archive_appointments(older_than_days=None, batch_size=500):
+    """Archive every due appointment, ``batch_size`` rows at a time; returns the count"""
+    queryset = archivable_appointments(older_than_days).order_by('id')
+    total = 0
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        total += archive_batch(ids)
+        last_id = ids[-1]
+    logger.info(f"{total} rendez-vous archivé(s)")
+    return total
+
+
+HISTORY_FIELDS = [
+    'id', 'reference_number', 'office_id', 'service_type_id',
+    'appointment_date', 'appointment_time', 'duration_minutes', 'status',
+]
+
+
+def _history_values(queryset, archived):
+    return queryset.order_by().values(
+        *HISTORY_FIELDS,
+        office_name=F('office__name'),
+        service_name=F('service_type__name'),
+        archived=Value(archived, output_field=BooleanField()),
+    )
+
+
+def history_rows(appointments, archived_appointments):
+    """
+    Read-through view over hot and archived appointments, as one ordered
+    values() queryset that can be paginated like any other
+    """
+    return (
+        _history_values(appointments, False)
+        .union(_history_values(archived_appointments, True), all=True)
+        .order_by('-appointment_date', '-appointment_time', '-id')
+    )
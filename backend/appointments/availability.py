@@ -0,0 +1,87 @@
+"""
+Month-at-a-glance availability for the booking calendar
+
+Remaining capacity per day is computed with one grouped query over
+AppointmentSlot, each slot annotated with its count of active appointments,
+and cached per (office, service, month). The cache entry is dropped whenever
+an appointment or slot of that month changes.
+"""
+import calendar
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Appointment, AppointmentSlot
+
+CALENDAR_CACHE_TIMEOUT = 60 * 60
+
+# Statuses that hold a place in a slot
+ACTIVE_STATUSES = [Appointment.Status.PENDING, Appointment.Status.CONFIRMED]
+
+
+def calendar_cache_key(office_id, service_id, year, month):
+    return f"appointments:calendar:{office_id}:{service_id}:{year:04d}-{month:02d}"
+
+
+def invalidate_month(office_id, service_id, day):
+    """Drop the cached calendar of the month containing ``day``"""
+    cache.delete(calendar_cache_key(office_id, service_id, day.year, day.month))
+
+
+def compute_month_availability(office_id, service_id, year, month):
+    """Return ``[{date, slots, capacity, remaining}]`` for every day with open slots"""
+    first_day = date(year, month, 1)
+    last_day = date(year, month, calendar.monthrange(year, month)[1])
+
+    booked = (
+        Appointment.objects.filter(
+            office_id=OuterRef('office_id'),
+            service_type_id=OuterRef('service_type_id'),
+            appointment_date=OuterRef('date'),
+            appointment_time=OuterRef('start_time'),
+            status__in=ACTIVE_STATUSES,
+        )
+        .order_by()
+        .values('appointment_date')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+
+    rows = (
+        AppointmentSlot.objects.filter(
+            office_id=office_id,
+            service_type_id=service_id,
+            date__range=(first_day, last_day),
+            is_available=True,
+        )
+        .annotate(booked=Coalesce(Subquery(booked, output_field=IntegerField()), Value(0)))
+        .values('date')
+        .annotate(
+            slots=Count('id'),
+            capacity=Sum('max_appointments'),
+            remaining=Sum(Greatest(F('max_appointments') - F('booked'), Value(0))),
+        )
+        .order_by('date')
+    )
+
+    return [
+        {
+            'date': row['date'].isoformat(),
+            'slots': row['slots'],
+            'capacity': row['capacity'],
+            'remaining': row['remaining'],
+        }
+        for row in rows
+    ]
+
+
+def get_month_availability(office_id, service_id, year, month):
+    """Cached variant of ``compute_month_availability``"""
+    key = calendar_cache_key(office_id, service_id, year, month)
+    days = cache.get(key)
+    if days is None:
+        days = compute_month_availability(office_id, service_id, year, month)
+        cache.set(key, days, CALENDAR_CACHE_TIMEOUT)
+    return days
@@ -0,0 +1,160 @@
+"""
+Personal iCalendar feed of upcoming appointments
+
+Each user gets a signed, unguessable feed URL that calendar clients can poll
+without a JWT. The token carries the user's ``calendar_feed_version``:
+regenerating the link bumps it and every earlier URL stops working, as do
+the URLs of a deactivated account. The feed is built from a narrow values() query, cached per
+user and invalidated whenever one of their appointments changes.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Appointment
+
+FEED_SALT = 'appointments.ics-feed'
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# Statuses shown in the feed (same as AppointmentViewSet.upcoming)
+FEED_STATUSES = [Appointment.Status.PENDING, Appointment.Status.CONFIRMED]
+
+
+def make_feed_token(user):
+    """Return the signed token identifying ``user``'s feed"""
+    return signing.dumps({'u': user.pk, 'v': user.calendar_feed_version}, salt=FEED_SALT)
+
+
+def read_feed_token(token):
+    """
+    Return the user id encoded in ``token``, or None if it is invalid,
+    regenerated since, or belongs to an inactive user
+    """
+    try:
+        data = signing.loads(token, salt=FEED_SALT)
+        user_id, version = data['u'], data.get('v', 0)
+    except (signing.BadSignature, KeyError, TypeError, AttributeError):
+        return None
+    if not get_user_model().objects.filter(pk=user_id, is_active=True, calendar_feed_version=version).exists():
+        return None
+    return user_id
+
+
+def regenerate_feed_token(user):
+    """Revoke ``user``'s feed URLs and return the token of the new one"""
+    from core.authentication import forget_cached_user
+
+    get_user_model().objects.filter(pk=user.pk).update(calendar_feed_version=F('calendar_feed_version') + 1)
+    forget_cached_user(user)
+    user.refresh_from_db(fields=['calendar_feed_version'])
+    return make_feed_token(user)
+
+
+def feed_cache_key(user_id):
+    return f"appointments:ics:{user_id}"
+
+
+def invalidate_feed(user_id):
+    cache.delete(feed_cache_key(user_id))
+
+
+def _escape(value):
+    return (
+        str(value or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Fold content lines longer than 75 octets (RFC 5545 §3.1)"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        chunk = encoded[:limit]
+        # Do not split a multi-byte character
+        while True:
+            try:
+                text = chunk.decode('utf-8')
+                break
+            except UnicodeDecodeError:
+                chunk = chunk[:-1]
+        parts.append(text)
+        encoded = encoded[len(chunk):]
+    return '\r\n '.join(parts)
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def build_feed(user_id):
+    """
+    Build the feed for ``user_id``.
+
+    Returns ``(body, etag, last_modified)``; ``last_modified`` is None when
+    the user has no upcoming appointment at all.
+    """
+    today = timezone.localdate()
+    rows = list(
+        Appointment.objects.filter(user_id=user_id, appointment_date__gte=today)
+        .order_by('appointment_date', 'appointment_time')
+        .values(
+            'id', 'reference_number', 'appointment_date', 'appointment_time',
+            'duration_minutes', 'status', 'updated_at',
+            'office__name', 'office__city', 'service_type__name',
+        )
+    )
+
+    # Cancellations also move Last-Modified forward, hence the max over all rows
+    last_modified = max((row['updated_at'] for row in rows), default=None)
+
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Ambassade du Congo//Rendez-vous//FR',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        'X-WR-CALNAME:Mes rendez-vous - Ambassade du Congo',
+    ]
+    for row in rows:
+        if row['status'] not in FEED_STATUSES:
+            continue
+        start = timezone.make_aware(datetime.combine(row['appointment_date'], row['appointment_time']))
+        end = start + timedelta(minutes=row['duration_minutes'])
+        lines.extend([
+            'BEGIN:VEVENT',
+            f"UID:{row['reference_number']}@ambassade-congo.sn",
+            f"DTSTAMP:{_utc(row['updated_at'])}",
+            f"DTSTART:{_utc(start)}",
+            f"DTEND:{_utc(end)}",
+            f"SUMMARY:{_escape(row['service_type__name'])} - {_escape(row['reference_number'])}",
+            f"LOCATION:{_escape(', '.join(filter(None, [row['office__name'], row['office__city']])))}",
+            f"STATUS:{'CONFIRMED' if row['status'] == Appointment.Status.CONFIRMED else 'TENTATIVE'}",
+            'END:VEVENT',
+        ])
+    lines.append('END:VCALENDAR')
+
+    body = '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+    etag = f'"{hashlib.sha256(body.encode("utf-8")).hexdigest()}"'
+    return body, etag, last_modified
+
+
+def get_feed(user_id):
+    """Cached variant of ``build_feed``"""
+    key = feed_cache_key(user_id)
+    feed = cache.get(key)
+    if feed is None:
+        feed = build_feed(user_id)
+        cache.set(key, feed, FEED_CACHE_TIMEOUT)
+    return feed
@@ -0,0 +1,43 @@
+"""
+Management command to move finished appointments to the archive tables
+Usage: python manage.py archive_appointments [--days 180] [--batch-size 500] [--dry-run]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from appointments.archive import archivable_appointments, archive_appointments
+
+
+class Command(BaseCommand):
+    help = 'Archive les rendez-vous terminés, annulés ou manqués plus anciens que l\'horizon configuré'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.APPOINTMENT_ARCHIVE_AFTER_DAYS,
+            help='Âge minimum (en jours) des rendez-vous à archiver',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Nombre de rendez-vous déplacés par transaction',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Affiche ce qui serait fait sans modifier la base de données',
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+
+        if options['dry_run']:
+            count = archivable_appointments(days).count()
+            self.stdout.write(
+                self.style.WARNING(f'[DRY RUN] {count} rendez-vous de plus de {days} jours seraient archivés.')
+            )
+            return
+
+        count = archive_appointments(days, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{count} rendez-vous archivé(s).'))
@@ -0,0 +1,180 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_sitesettings_auditlog_core_auditl_ip_addr_71e206_idx_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("appointments", "0004_checkinlog"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedAppointment",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "reference_number",
+                    models.CharField(
+                        max_length=20, unique=True, verbose_name="Numéro de référence"
+                    ),
+                ),
+                (
+                    "appointment_date",
+                    models.DateField(verbose_name="Date du rendez-vous"),
+                ),
+                (
+                    "appointment_time",
+                    models.TimeField(verbose_name="Heure du rendez-vous"),
+                ),
+                (
+                    "duration_minutes",
+                    models.IntegerField(default=30, verbose_name="Durée (minutes)"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "En attente"),
+                            ("CONFIRMED", "Confirmé"),
+                            ("CHECKED_IN", "Enregistré"),
+                            ("IN_PROGRESS", "En cours"),
+                            ("COMPLETED", "Terminé"),
+                            ("CANCELLED", "Annulé"),
+                            ("NO_SHOW", "Absent"),
+                        ],
+                        max_length=20,
+                        verbose_name="Statut",
+                    ),
+                ),
+                (
+                    "user_notes",
+                    models.TextField(blank=True, verbose_name="Notes de l'utilisateur"),
+                ),
+                (
+                    "admin_notes",
+                    models.TextField(blank=True, verbose_name="Notes administratives"),
+                ),
+                (
+                    "confirmation_sent",
+                    models.BooleanField(
+                        default=False, verbose_name="Confirmation envoyée"
+                    ),
+                ),
+                (
+                    "reminder_sent",
+                    models.BooleanField(default=False, verbose_name="Rappel envoyé"),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                (
+                    "confirmed_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Confirmé le"
+                    ),
+                ),
+                (
+                    "completed_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Terminé le"
+                    ),
+                ),
+                (
+                    "archived_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Archivé le"),
+                ),
+                (
+                    "assigned_agent",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="archived_assigned_appointments",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Agent assigné",
+                    ),
+                ),
+                (
+                    "office",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_appointments",
+                        to="core.consularoffice",
+                        verbose_name="Bureau consulaire",
+                    ),
+                ),
+                (
+                    "service_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_appointments",
+                        to="core.servicetype",
+                        verbose_name="Type de service",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_appointments",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Utilisateur",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Rendez-vous archivé",
+                "verbose_name_plural": "Rendez-vous archivés",
+                "ordering": ["-appointment_date", "-appointment_time"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedCheckInLog",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("scanned_at", models.DateTimeField()),
+                ("reference_number", models.CharField(max_length=20)),
+                ("status_after", models.CharField(max_length=20)),
+                ("notes", models.TextField(blank=True)),
+                (
+                    "appointment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="checkin_logs",
+                        to="appointments.archivedappointment",
+                    ),
+                ),
+                (
+                    "scanned_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="archived_performed_checkins",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-scanned_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["reference_number", "-scanned_at"],
+                        name="appointment_referen_12dce8_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="archivedappointment",
+            index=models.Index(
+                fields=["user", "-appointment_date"],
+                name="appointment_user_id_7209fc_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.11 on 2026-10-19 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0005_archivedappointment_archivedcheckinlog_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                fields=["user", "updated_at"], name="appointment_user_id_3c2387_idx"
+            ),
+        ),
+    ]
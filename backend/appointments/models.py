@@ -6,9 +6,6 @@ from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
 from core.models import ConsularOffice, ServiceType
-import qrcode
-from io import BytesIO
-from django.core.files import File
 from django.utils import timezone
 import uuid
 
@@ -25,7 +22,22 @@ class Appointment(models.Model):
         COMPLETED = 'COMPLETED', _('Terminé')
         CANCELLED = 'CANCELLED', _('Annulé')
         NO_SHOW = 'NO_SHOW', _('Absent')
-    
+
+    # Legal status graph, enforced by core.transitions
+    STATUS_TRANSITIONS = {
+        Status.PENDING: [Status.CONFIRMED, Status.CHECKED_IN, Status.CANCELLED, Status.NO_SHOW],
+        Status.CONFIRMED: [Status.CHECKED_IN, Status.IN_PROGRESS, Status.COMPLETED, Status.CANCELLED, Status.NO_SHOW],
+        Status.CHECKED_IN: [Status.IN_PROGRESS, Status.COMPLETED, Status.NO_SHOW],
+        Status.IN_PROGRESS: [Status.COMPLETED],
+        Status.COMPLETED: [],
+        Status.CANCELLED: [],
+        Status.NO_SHOW: [],
+    }
+    STATUS_TIMESTAMPS = {
+        Status.CONFIRMED: 'confirmed_at',
+        Status.COMPLETED: 'completed_at',
+    }
+
     # Unique reference number
     reference_number = models.CharField(
         max_length=20,
@@ -70,7 +82,7 @@ class Appointment(models.Model):
         verbose_name=_('Statut')
     )
     
-    # QR Code for check-in
+    # Legacy stored QR code; QR codes are now rendered on demand (see appointments.qr)
     qr_code = models.ImageField(
         upload_to='qrcodes/',
         blank=True,
@@ -116,6 +128,7 @@ class Appointment(models.Model):
             models.Index(fields=['appointment_date', 'appointment_time']),
             models.Index(fields=['user', '-appointment_date']),
             models.Index(fields=['status', 'appointment_date']),
+            models.Index(fields=['user', 'updated_at']),
         ]
     
     def __str__(self):
@@ -126,10 +139,6 @@ class Appointment(models.Model):
         if not self.reference_number:
             self.reference_number = self.generate_reference_number()
         
-        # Generate QR code if new or reference changed
-        if not self.qr_code or not self.pk:
-            self.generate_qr_code()
-        
         super().save(*args, **kwargs)
     
     @staticmethod
@@ -137,62 +146,6 @@ class Appointment(models.Model):
         """Generate a unique reference number"""
         return f"APT-{uuid.uuid4().hex[:8].upper()}"
     
-    def generate_qr_code(self):
-        """Generate QR code for appointment with complete information"""
-        import json
-        from datetime import datetime, timedelta
-        
-        # Create appointment data in JSON format
-        appointment_data = {
-            "type": "APPOINTMENT",
-            "reference": self.reference_number,
-            "appointment": {
-                "id": str(self.id),
-                "reference": self.reference_number,
-                "date": self.appointment_date.strftime("%Y-%m-%d"),
-                "time": self.appointment_time.strftime("%H:%M"),
-                "duration": self.duration_minutes,
-                "status": self.status,
-                "service": {
-                    "id": self.service_type.id,
-                    "name": self.service_type.name,
-                    "description": self.service_type.description
-                },
-                "office": {
-                    "id": self.office.id,
-                    "name": self.office.name,
-                    "address": self.office.full_address
-                },
-                "user": {
-                    "id": str(self.user.id),
-                    "name": self.user.get_full_name(),
-                    "email": self.user.email,
-                    "role": self.user.role
-                }
-            },
-            "embassy": {
-                "name": "Ambassade de la République du Congo - Sénégal",
-                "address": "Stèle Mermoz, Pyrotechnie, P.O. Box 5243, Dakar, Sénégal",
-                "phone": "+221 824 8398",
-                "email": "contact@ambassade-congo.sn"
-            },
-            "generatedAt": datetime.now().isoformat() + "Z",
-            "validUntil": (self.appointment_date + timedelta(days=1)).isoformat() + "Z",
-            "purpose": "Identification rendez-vous - Accès aux services consulaires"
-        }
-        
-        qr = qrcode.QRCode(version=1, box_size=8, border=5)
-        qr.add_data(json.dumps(appointment_data, ensure_ascii=False))
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        filename = f'qr_{self.reference_number}.png'
-        self.qr_code.save(filename, File(buffer), save=False)
-    
     @property
     def can_be_cancelled(self):
         """Check if appointment can be cancelled"""
@@ -219,6 +172,91 @@ class CheckInLog(models.Model):
             models.Index(fields=['scanned_at']),
         ]
 
+
+class ArchivedAppointment(models.Model):
+    """
+    Cold storage for finished appointments (see appointments.archive)
+    Rows keep the id of the original Appointment so audit references stay valid
+    """
+    id = models.BigIntegerField(primary_key=True)
+    reference_number = models.CharField(max_length=20, unique=True, verbose_name=_('Numéro de référence'))
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_appointments',
+        verbose_name=_('Utilisateur')
+    )
+    office = models.ForeignKey(
+        ConsularOffice,
+        on_delete=models.CASCADE,
+        related_name='archived_appointments',
+        verbose_name=_('Bureau consulaire')
+    )
+    service_type = models.ForeignKey(
+        ServiceType,
+        on_delete=models.CASCADE,
+        related_name='archived_appointments',
+        verbose_name=_('Type de service')
+    )
+    appointment_date = models.DateField(verbose_name=_('Date du rendez-vous'))
+    appointment_time = models.TimeField(verbose_name=_('Heure du rendez-vous'))
+    duration_minutes = models.IntegerField(default=30, verbose_name=_('Durée (minutes)'))
+    status = models.CharField(max_length=20, choices=Appointment.Status.choices, verbose_name=_('Statut'))
+    user_notes = models.TextField(blank=True, verbose_name=_('Notes de l\'utilisateur'))
+    admin_notes = models.TextField(blank=True, verbose_name=_('Notes administratives'))
+    assigned_agent = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_assigned_appointments',
+        verbose_name=_('Agent assigné')
+    )
+    confirmation_sent = models.BooleanField(default=False, verbose_name=_('Confirmation envoyée'))
+    reminder_sent = models.BooleanField(default=False, verbose_name=_('Rappel envoyé'))
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    confirmed_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Confirmé le'))
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Terminé le'))
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Archivé le'))
+
+    class Meta:
+        verbose_name = _('Rendez-vous archivé')
+        verbose_name_plural = _('Rendez-vous archivés')
+        ordering = ['-appointment_date', '-appointment_time']
+        indexes = [
+            models.Index(fields=['user', '-appointment_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.reference_number} - {self.appointment_date} ({self.status})"
+
+    def get_status_display(self):
+        return Appointment.Status(self.status).label
+
+
+class ArchivedCheckInLog(models.Model):
+    """Check-in logs moved to cold storage with their appointment"""
+    id = models.BigIntegerField(primary_key=True)
+    appointment = models.ForeignKey(
+        ArchivedAppointment, on_delete=models.CASCADE, related_name='checkin_logs'
+    )
+    scanned_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='archived_performed_checkins'
+    )
+    scanned_at = models.DateTimeField()
+    reference_number = models.CharField(max_length=20)
+    status_after = models.CharField(max_length=20)
+    notes = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-scanned_at']
+        indexes = [
+            models.Index(fields=['reference_number', '-scanned_at']),
+        ]
+
+
 class AppointmentSlot(models.Model):
     """
     Available time slots for appointments
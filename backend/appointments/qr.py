@@ -0,0 +1,87 @@
+"""
+On-demand QR code rendering for appointments
+
+QR codes are no longer stored per appointment: they are rendered when
+requested and cached by the hash of their payload, so an unchanged
+appointment is rendered once and repeat views come from cache.
+"""
+import json
+from datetime import timedelta
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+
+from core.utils.content_cache import ContentCache, content_hash
+
+# Bump when the image parameters below change so old renders are not reused
+QR_RENDER_VERSION = 1
+
+_qr_cache = ContentCache('qrcodes', max_items=getattr(settings, 'QR_CACHE_MAX_ITEMS', 256))
+
+
+def appointment_qr_payload(appointment):
+    """Build the JSON payload encoded in an appointment's QR code"""
+    return {
+        "type": "APPOINTMENT",
+        "reference": appointment.reference_number,
+        "appointment": {
+            "id": str(appointment.id),
+            "reference": appointment.reference_number,
+            "date": appointment.appointment_date.strftime("%Y-%m-%d"),
+            "time": appointment.appointment_time.strftime("%H:%M"),
+            "duration": appointment.duration_minutes,
+            "status": appointment.status,
+            "service": {
+                "id": appointment.service_type.id,
+                "name": appointment.service_type.name,
+                "description": appointment.service_type.description
+            },
+            "office": {
+                "id": appointment.office.id,
+                "name": appointment.office.name,
+                "address": appointment.office.full_address
+            },
+            "user": {
+                "id": str(appointment.user.id),
+                "name": appointment.user.get_full_name(),
+                "email": appointment.user.email,
+                "role": appointment.user.role
+            }
+        },
+        "embassy": {
+            "name": "Ambassade de la République du Congo - Sénégal",
+            "address": "Stèle Mermoz, Pyrotechnie, P.O. Box 5243, Dakar, Sénégal",
+            "phone": "+221 824 8398",
+            "email": "contact@ambassade-congo.sn"
+        },
+        # Derived from the row itself so the payload (and its hash) is stable
+        "generatedAt": appointment.created_at.isoformat() if appointment.created_at else None,
+        "validUntil": (appointment.appointment_date + timedelta(days=1)).isoformat() + "Z",
+        "purpose": "Identification rendez-vous - Accès aux services consulaires"
+    }
+
+
+def qr_version(payload):
+    """Return the content hash identifying a rendered QR code"""
+    return content_hash({'v': QR_RENDER_VERSION, 'payload': payload})
+
+
+def render_qr_png(payload):
+    """Render ``payload`` as a PNG QR code (uncached)"""
+    qr = qrcode.QRCode(version=1, box_size=8, border=5)
+    qr.add_data(json.dumps(payload, ensure_ascii=False))
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def get_appointment_qr(appointment):
+    """Return ``(version, png_bytes)`` for an appointment, rendering on a cache miss"""
+    payload = appointment_qr_payload(appointment)
+    version = qr_version(payload)
+    png = _qr_cache.get_or_render(version, lambda: render_qr_png(payload))
+    return version, png
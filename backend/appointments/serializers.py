@@ -2,19 +2,35 @@
 Serializers for Appointment models
 """
 from rest_framework import serializers
+from django.urls import reverse
 from django.utils import timezone
 from .models import Appointment, AppointmentSlot
+from .qr import appointment_qr_payload, qr_version
 from core.serializers import ConsularOfficeSerializer, ServiceTypeListSerializer
+from core.sparse_fields import SparseFieldsMixin
 
 
-class AppointmentSerializer(serializers.ModelSerializer):
-    """Appointment serializer"""
+class AppointmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Appointment serializer (supports ?fields= and ?expand=office,service_type)"""
     office_name = serializers.CharField(source='office.name', read_only=True)
     service_name = serializers.CharField(source='service_type.name', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
     qr_code_url = serializers.SerializerMethodField()
     
+    EXPANDABLE_FIELDS = {
+        'office': (ConsularOfficeSerializer, {}),
+        'service_type': (ServiceTypeListSerializer, {}),
+    }
+    # Columns of the QR payload (appointments.qr) behind qr_code_url
+    FIELD_COLUMNS = {
+        'qr_code_url': [
+            'reference_number', 'appointment_date', 'appointment_time', 'duration_minutes', 'status',
+            'created_at', 'service_type__name', 'service_type__description',
+            'office__full_address', 'user__get_full_name',
+        ],
+    }
+    
     class Meta:
         model = Appointment
         fields = [
@@ -33,11 +49,14 @@ class AppointmentSerializer(serializers.ModelSerializer):
         ]
     
     def get_qr_code_url(self, obj):
-        if obj.qr_code:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.qr_code.url)
-        return None
+        """Versioned URL of the on-demand QR code (cacheable forever)"""
+        if not obj.pk:
+            return None
+        url = f"{reverse('appointments:appointment-qr', kwargs={'pk': obj.pk})}?v={qr_version(appointment_qr_payload(obj))}"
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(url)
+        return url
     
     def validate_appointment_date(self, value):
         """Ensure appointment date is in the future"""
@@ -74,6 +93,54 @@ class AppointmentSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class AppointmentListSerializer(serializers.ModelSerializer):
+    """Slim appointment serializer for list views (no QR, no notes)"""
+    office_name = serializers.CharField(source='office.name', read_only=True)
+    service_name = serializers.CharField(source='service_type.name', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    # Columns needed by the fields above, for queryset.only()
+    QUERY_FIELDS = [
+        'id', 'reference_number', 'office__name', 'service_type__name',
+        'appointment_date', 'appointment_time', 'duration_minutes', 'status',
+    ]
+    
+    class Meta:
+        model = Appointment
+        fields = [
+            'id', 'reference_number', 'office', 'office_name',
+            'service_type', 'service_name', 'appointment_date', 'appointment_time',
+            'duration_minutes', 'status', 'status_display'
+        ]
+        read_only_fields = fields
+    
+    @classmethod
+    def setup_queryset(cls, queryset):
+        return queryset.select_related('office', 'service_type').only(*cls.QUERY_FIELDS)
+
+
+class AppointmentHistorySerializer(serializers.Serializer):
+    """
+    Serializer for history rows (appointments.archive.history_rows).
+    Same output as AppointmentListSerializer, plus an ``archived`` flag.
+    """
+    id = serializers.IntegerField()
+    reference_number = serializers.CharField()
+    office = serializers.IntegerField(source='office_id')
+    office_name = serializers.CharField()
+    service_type = serializers.IntegerField(source='service_type_id')
+    service_name = serializers.CharField()
+    appointment_date = serializers.DateField()
+    appointment_time = serializers.TimeField()
+    duration_minutes = serializers.IntegerField()
+    status = serializers.CharField()
+    status_display = serializers.SerializerMethodField()
+    archived = serializers.BooleanField()
+    
+    def get_status_display(self, obj):
+        return Appointment.Status(obj['status']).label
+
+
 class AppointmentCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating appointments"""
     
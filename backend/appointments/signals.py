@@ -0,0 +1,137 @@
+"""
+Signals for appointment audit, notifications and cache invalidation
+"""
+import logging
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.transitions import status_changed, statuses_changed
+from .availability import invalidate_month
+from .ics import invalidate_feed
+from .models import Appointment, AppointmentSlot
+
+logger = logging.getLogger('embassy')
+
+
+@receiver(status_changed, sender=Appointment)
+def appointment_status_changed(sender, instance, old_status, new_status, user=None, note='', notify=True, **kwargs):
+    """
+    Log and notify every appointment status transition
+
+    Caches are dropped and the user notified once the transition commits,
+    so no reader caches the old status again and a rolled back transition
+    notifies no one.
+    """
+    from core.models import AuditLog
+    from django.contrib.contenttypes.models import ContentType
+
+    description = f"Statut RDV {instance.reference_number}: {old_status} → {new_status}"
+    if note:
+        description = f"{description} - {note}"
+
+    AuditLog.objects.create(
+        user=user or instance.user,
+        action='UPDATE',
+        description=description,
+        content_type=ContentType.objects.get_for_model(Appointment),
+        object_id=instance.id
+    )
+
+    appointment_id = instance.id
+    month = (instance.office_id, instance.service_type_id, instance.appointment_date)
+    user_id = instance.user_id
+
+    def after_commit():
+        invalidate_month(*month)
+        invalidate_feed(user_id)
+        if notify:
+            try:
+                from notifications.tasks import notify_appointment_status_changed
+                notify_appointment_status_changed(appointment_id)
+            except Exception as e:
+                # Notification failures should not block the transition
+                logger.error(f"Failed to notify appointment status change: {e}")
+
+    transaction.on_commit(after_commit)
+
+
+@receiver(statuses_changed, sender=Appointment)
+def appointment_statuses_bulk_changed(sender, changes, new_status, user=None, note='', notify=True, **kwargs):
+    """
+    Bulk counterpart of appointment_status_changed: one INSERT of audit rows,
+    one invalidation per affected month/feed and batched notification jobs
+    """
+    from core.models import AuditLog
+    from django.contrib.contenttypes.models import ContentType
+
+    rows = Appointment.objects.filter(pk__in=list(changes)).values_list(
+        'pk', 'reference_number', 'user_id', 'office_id', 'service_type_id', 'appointment_date'
+    )
+    content_type = ContentType.objects.get_for_model(Appointment)
+    months = set()
+    users = set()
+    logs = []
+    for pk, reference_number, user_id, office_id, service_type_id, appointment_date in rows:
+        months.add((office_id, service_type_id, appointment_date.replace(day=1)))
+        users.add(user_id)
+        description = f"Statut RDV {reference_number}: {changes[pk]} → {new_status}"
+        if note:
+            description = f"{description} - {note}"
+        logs.append(AuditLog(
+            user_id=user.pk if user else user_id,
+            action='UPDATE',
+            description=description,
+            content_type=content_type,
+            object_id=pk
+        ))
+    AuditLog.objects.bulk_create(logs)
+
+    for office_id, service_type_id, month in months:
+        invalidate_month(office_id, service_type_id, month)
+    for user_id in users:
+        invalidate_feed(user_id)
+
+    if notify:
+        from notifications.tasks import enqueue_in_batches
+        ids = list(changes)
+        transaction.on_commit(
+            lambda: enqueue_in_batches('notifications.tasks.notify_appointment_status_changed_batch', ids)
+        )
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def appointment_booking_changed(sender, instance, **kwargs):
+    """
+    Refresh the availability calendar and the owner's feed when a booking
+    is made, edited or removed
+    """
+    invalidate_month(instance.office_id, instance.service_type_id, instance.appointment_date)
+    invalidate_feed(instance.user_id)
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_search_entry(sender, instance, **kwargs):
+    """
+    Refresh the appointment's full-text search entry
+    """
+    from core.search import schedule_reindex
+    schedule_reindex(Appointment, instance.pk)
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_search_entry_removed(sender, instance, **kwargs):
+    """
+    Drop the deleted (or archived) appointment from the search index
+    """
+    from core.search import remove_from_index
+    remove_from_index(Appointment, [instance.pk])
+
+
+@receiver(post_save, sender=AppointmentSlot)
+@receiver(post_delete, sender=AppointmentSlot)
+def appointment_slot_changed(sender, instance, **kwargs):
+    """
+    Refresh the availability calendar when slots are opened, closed or resized
+    """
+    invalidate_month(instance.office_id, instance.service_type_id, instance.date)
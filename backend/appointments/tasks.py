@@ -0,0 +1,16 @@
+"""
+Tâches asynchrones pour les rendez-vous
+"""
+from django_q.tasks import async_task
+from .archive import archive_appointments
+
+
+def archive_old_appointments():
+    """Archiver les rendez-vous terminés au-delà de l'horizon configuré"""
+    return archive_appointments()
+
+
+# Tâche asynchrone pour être appelée régulièrement
+def schedule_appointment_archival():
+    """Planifier l'archivage des anciens rendez-vous"""
+    async_task('appointments.tasks.archive_old_appointments')
@@ -1,11 +1,12 @@
 """
 Tests for Appointments app
 """
-from django.test import TestCase
+import tempfile
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta
-from .models import Appointment, AppointmentSlot
+from .models import Appointment, AppointmentSlot, CheckInLog
 from core.models import ConsularOffice, ServiceType
 
 User = get_user_model()
@@ -18,7 +19,8 @@ class AppointmentModelTest(TestCase):
         self.user = User.objects.create_user(
             username="testuser",
             email="test@example.com",
-            password="testpass123"
+            password="testpass123",
+            consular_card_number="SN1234567",
         )
 
         self.office = ConsularOffice.objects.create(
@@ -55,8 +57,111 @@ class AppointmentModelTest(TestCase):
         self.assertEqual(self.appointment.status, 'PENDING')
 
     def test_qr_code_generation(self):
-        """Test QR code is generated"""
-        self.assertIsNotNone(self.appointment.qr_code)
+        """Test QR code is rendered on demand instead of stored at booking"""
+        from .qr import get_appointment_qr
+
+        self.appointment.refresh_from_db()
+        self.assertFalse(self.appointment.qr_code)
+
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CONTENT_CACHE_DIR=cache_dir):
+            version, png = get_appointment_qr(self.appointment)
+            self.assertTrue(png.startswith(b'\x89PNG'))
+            self.assertEqual(get_appointment_qr(self.appointment), (version, png))
+
+    def test_qr_endpoint_etag(self):
+        """Test QR endpoint serves a strong ETag and honours If-None-Match"""
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = f'/api/appointments/{self.appointment.pk}/qr/'
+
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CONTENT_CACHE_DIR=cache_dir):
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'image/png')
+            etag = response['ETag']
+
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_upcoming_is_paginated(self):
+        """Test upcoming uses pagination and the slim list serializer"""
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/appointments/upcoming/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        item = response.data['results'][0]
+        self.assertEqual(item['reference_number'], self.appointment.reference_number)
+        self.assertEqual(item['service_name'], "Test Service")
+        self.assertNotIn('qr_code_url', item)
+
+    def test_sparse_fields_and_expand(self):
+        """Test ?fields= trims the output and ?expand= nests the office"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/appointments/', {'fields': 'id,status,office_name'})
+        self.assertEqual(response.status_code, 200)
+        item = response.data['results'][0]
+        self.assertEqual(set(item), {'id', 'status', 'office_name'})
+        self.assertEqual(item['office_name'], "Test Embassy")
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/api/appointments/', {'fields': 'id,status,office_name'})
+        select = [q['sql'] for q in queries if 'FROM "appointments_appointment"' in q['sql']][-1]
+        self.assertNotIn('"user_notes"', select)
+        self.assertIn('"core_consularoffice"."name"', select)
+
+        response = client.get(f'/api/appointments/{self.appointment.pk}/', {'expand': 'office'})
+        self.assertEqual(response.data['office']['city'], "Dakar")
+        self.assertIn('qr_code_url', response.data)
+
+        response = client.get(f'/api/appointments/{self.appointment.pk}/', {'fields': 'id,qr_code_url'})
+        self.assertEqual(set(response.data), {'id', 'qr_code_url'})
+
+    def test_ics_feed(self):
+        """Test the signed iCalendar feed and its conditional GET"""
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        feed_url = client.get('/api/appointments/calendar_feed/').data['url']
+
+        anonymous = APIClient()
+        response = anonymous.get(feed_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.appointment.reference_number, response.content.decode())
+
+        response = anonymous.get(feed_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = anonymous.get('/api/appointments/feed/forged-token/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_ics_feed_revocation(self):
+        """Test a regenerated feed URL replaces the old one and inactive users get no feed"""
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        old_url = client.get('/api/appointments/calendar_feed/').data['url']
+        new_url = client.post('/api/appointments/regenerate_calendar_feed/').data['url']
+        self.assertEqual(client.get('/api/appointments/calendar_feed/').data['url'], new_url)
+
+        anonymous = APIClient()
+        self.assertEqual(anonymous.get(old_url).status_code, 404)
+        self.assertEqual(anonymous.get(new_url).status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(anonymous.get(new_url).status_code, 404)
 
     def test_can_be_cancelled(self):
         """Test can_be_cancelled property"""
@@ -109,3 +214,248 @@ class AppointmentSlotTest(TestCase):
         """Test is_full property"""
         self.assertFalse(self.slot.is_full)
 
+    def test_month_availability(self):
+        """Test calendar capacity is aggregated per day and refreshed on booking"""
+        from django.core.cache import cache
+        from .availability import get_month_availability
+
+        cache.clear()
+        day = self.slot.date
+        AppointmentSlot.objects.create(
+            office=self.office,
+            service_type=self.service,
+            date=day,
+            start_time="11:00",
+            end_time="11:30",
+            max_appointments=3,
+        )
+
+        days = get_month_availability(self.office.id, self.service.id, day.year, day.month)
+        self.assertEqual(days, [{'date': day.isoformat(), 'slots': 2, 'capacity': 5, 'remaining': 5}])
+
+        user = User.objects.create_user(username="booker", email="booker@example.com", password="testpass123")
+        Appointment.objects.create(
+            user=user,
+            office=self.office,
+            service_type=self.service,
+            appointment_date=day,
+            appointment_time="10:00",
+        )
+        days = get_month_availability(self.office.id, self.service.id, day.year, day.month)
+        self.assertEqual(days[0]['remaining'], 4)
+
+
+
+class AppointmentTransitionTest(TestCase):
+    """Test status transitions through core.transitions"""
+
+    def setUp(self):
+        from datetime import time
+
+        self.user = User.objects.create_user(
+            username="transuser",
+            email="trans@example.com",
+            password="testpass123"
+        )
+        self.office = ConsularOffice.objects.create(
+            name="Test Embassy",
+            office_type="EMBASSY",
+            address_line1="123 Test St",
+            city="Dakar",
+            country="Sénégal",
+            phone_primary="+221123456789",
+            email="test@embassy.com",
+        )
+        self.service = ServiceType.objects.create(name="Test Service", category="VISA")
+        self.appointment = Appointment.objects.create(
+            user=self.user,
+            office=self.office,
+            service_type=self.service,
+            appointment_date=timezone.now().date() + timedelta(days=1),
+            appointment_time=time(10, 0),
+        )
+
+    def test_valid_transition_sets_timestamp_and_logs(self):
+        """Confirming stamps confirmed_at and writes one audit entry"""
+        from core.models import AuditLog
+        from core.transitions import transition
+
+        transition(self.appointment, 'CONFIRMED', user=self.user, notify=False)
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.status, 'CONFIRMED')
+        self.assertIsNotNone(self.appointment.confirmed_at)
+        self.assertEqual(AuditLog.objects.filter(object_id=self.appointment.id, action='UPDATE').count(), 1)
+
+    def test_bulk_transition(self):
+        """Bulk confirmation stamps confirmed_at and logs without per-row signals"""
+        from core.models import AuditLog
+        from core.transitions import bulk_transition
+
+        updated, skipped = bulk_transition(Appointment.objects.all(), 'CONFIRMED', user=self.user, notify=False)
+        self.assertEqual((updated, skipped), (1, 0))
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.status, 'CONFIRMED')
+        self.assertIsNotNone(self.appointment.confirmed_at)
+        self.assertEqual(AuditLog.objects.filter(object_id=self.appointment.id, action='UPDATE').count(), 1)
+
+        # Already confirmed: nothing left to move
+        self.assertEqual(bulk_transition(Appointment.objects.all(), 'CONFIRMED', notify=False), (0, 1))
+
+    def test_invalid_transition_rejected(self):
+        """Terminal statuses cannot be left"""
+        from core.transitions import transition, InvalidTransition
+
+        transition(self.appointment, 'CANCELLED', notify=False)
+        with self.assertRaises(InvalidTransition):
+            transition(self.appointment, 'CONFIRMED', notify=False)
+
+    def test_stale_status_raises_conflict(self):
+        """A concurrent change is detected instead of overwritten"""
+        from core.transitions import transition, ConcurrentTransition
+
+        stale = Appointment.objects.get(pk=self.appointment.pk)
+        transition(self.appointment, 'CANCELLED', notify=False)
+        with self.assertRaises(ConcurrentTransition):
+            transition(stale, 'CONFIRMED', notify=False)
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.status, 'CANCELLED')
+
+    def test_failed_receiver_rolls_transition_back(self):
+        """The UPDATE and the audit log commit together or not at all"""
+        from unittest import mock
+        from core.models import AuditLog
+        from core.transitions import transition
+
+        with mock.patch.object(AuditLog.objects, 'create', side_effect=RuntimeError('panne')):
+            with self.assertRaises(RuntimeError):
+                transition(self.appointment, 'CONFIRMED', notify=False)
+        self.assertEqual(self.appointment.status, 'PENDING')
+        self.assertEqual(Appointment.objects.get(pk=self.appointment.pk).status, 'PENDING')
+
+    def test_cancel_sends_in_app_notice_only(self):
+        """Cancelling through the API keeps its in-app notice, without email or push"""
+        from unittest import mock
+        from rest_framework.test import APIClient
+        from notifications.models import Notification
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch('notifications.tasks.notify_appointment_status_changed') as notify, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f'/api/appointments/{self.appointment.pk}/cancel/')
+        self.assertEqual(response.status_code, 200)
+        notify.assert_not_called()
+        notice = Notification.objects.get(recipient=self.user)
+        self.assertEqual((notice.channel, notice.notification_type), ('IN_APP', 'APPOINTMENT_CANCELLED'))
+
+
+    def test_transition_side_effects_wait_for_commit(self):
+        """Caches are dropped and the user notified only once the transition commits"""
+        from unittest import mock
+        from core.transitions import transition
+
+        with mock.patch('notifications.tasks.notify_appointment_status_changed') as notify, \
+                mock.patch('appointments.signals.invalidate_feed') as invalidate_feed:
+            with self.captureOnCommitCallbacks() as callbacks:
+                transition(self.appointment, 'CONFIRMED')
+            notify.assert_not_called()
+            invalidate_feed.assert_not_called()
+            for callback in callbacks:
+                callback()
+        notify.assert_called_once_with(self.appointment.id)
+        invalidate_feed.assert_called_once_with(self.user.id)
+
+
+class AppointmentArchiveTest(TestCase):
+    """Test hot/cold archival of finished appointments"""
+
+    def setUp(self):
+        from datetime import time
+
+        self.user = User.objects.create_user(
+            username="archiveuser",
+            email="archive@example.com",
+            password="testpass123"
+        )
+        self.office = ConsularOffice.objects.create(
+            name="Test Embassy",
+            office_type="EMBASSY",
+            address_line1="123 Test St",
+            city="Dakar",
+            country="Sénégal",
+            phone_primary="+221123456789",
+            email="test@embassy.com",
+        )
+        self.service = ServiceType.objects.create(name="Test Service", category="VISA")
+        self.old = Appointment.objects.create(
+            user=self.user,
+            office=self.office,
+            service_type=self.service,
+            appointment_date=timezone.now().date() - timedelta(days=400),
+            appointment_time=time(9, 0),
+            status='COMPLETED',
+        )
+        CheckInLog.objects.create(
+            appointment=self.old,
+            reference_number=self.old.reference_number,
+            status_after='COMPLETED',
+        )
+        self.recent = Appointment.objects.create(
+            user=self.user,
+            office=self.office,
+            service_type=self.service,
+            appointment_date=timezone.now().date() - timedelta(days=2),
+            appointment_time=time(9, 0),
+            status='COMPLETED',
+        )
+
+    def test_archive_moves_old_rows(self):
+        """Old finished appointments and their logs move to the archive tables"""
+        from .archive import archive_appointments
+        from .models import ArchivedAppointment, ArchivedCheckInLog
+
+        self.assertEqual(archive_appointments(older_than_days=180, batch_size=1), 1)
+        self.assertFalse(Appointment.objects.filter(pk=self.old.pk).exists())
+        self.assertTrue(Appointment.objects.filter(pk=self.recent.pk).exists())
+        self.assertTrue(ArchivedAppointment.objects.filter(pk=self.old.pk).exists())
+        self.assertEqual(ArchivedCheckInLog.objects.filter(appointment_id=self.old.pk).count(), 1)
+        self.assertFalse(CheckInLog.objects.filter(appointment_id=self.old.pk).exists())
+
+    def test_history_reads_through_archive(self):
+        """History merges hot and archived appointments"""
+        from rest_framework.test import APIClient
+        from .archive import archive_appointments
+
+        archive_appointments(older_than_days=180)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/appointments/history/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            [(row['id'], row['archived']) for row in response.data['results']],
+            [(self.recent.pk, False), (self.old.pk, True)]
+        )
+        self.assertEqual(response.data['results'][1]['status_display'], 'Terminé')
+
+    def test_archive_writes_no_tombstone(self):
+        """Archived appointments are not reported as deleted by delta sync"""
+        from unittest import mock
+        from rest_framework.test import APIClient
+        from core.models import Tombstone
+        from .archive import archive_appointments
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch('core.sync.SAFETY_MARGIN', timedelta(0)):
+            since = client.get('/api/core/changes/').data['next']
+            archive_appointments(older_than_days=180)
+            response = client.get('/api/core/changes/', {'since': since})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['changes']['appointments']['deleted'], [])
+        self.assertFalse(Tombstone.objects.exists())
+
+        # Plain deletions still write theirs
+        recent_pk = self.recent.pk
+        self.recent.delete()
+        self.assertEqual(list(Tombstone.objects.values_list('object_id', flat=True)), [recent_pk])
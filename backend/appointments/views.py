@@ -4,25 +4,38 @@ API views for Appointments
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.utils import timezone
-from datetime import timedelta
-from .models import Appointment, AppointmentSlot, CheckInLog
+from datetime import datetime, timedelta
+from .availability import get_month_availability
+from .ics import get_feed, make_feed_token, read_feed_token, regenerate_feed_token
+from .archive import history_rows
+from .models import Appointment, AppointmentSlot, ArchivedAppointment, CheckInLog
+from .qr import get_appointment_qr
 from .serializers import (
-    AppointmentSerializer, AppointmentCreateSerializer, AppointmentSlotSerializer
+    AppointmentSerializer, AppointmentListSerializer, AppointmentHistorySerializer,
+    AppointmentCreateSerializer, AppointmentSlotSerializer
 )
 from core.models import AuditLog, SiteSettings
 from core.permissions import IsAgent, IsVigile
+from core.search import search_objects
+from core.sparse_fields import SparseFieldsViewMixin
+from core.transitions import transition, TransitionError
 from django.contrib.contenttypes.models import ContentType
 from django.core.mail import send_mail
 from django.conf import settings
 
 # Notifications
-from notifications.tasks import notify_appointment_status_changed, send_appointment_reminder
+from notifications.tasks import send_appointment_reminder
 
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing appointments
     Users can only view/manage their own appointments
@@ -39,11 +52,32 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             return Appointment.objects.all()
         return Appointment.objects.filter(user=user)
     
+    def get_archived_queryset(self):
+        """Archived counterpart of get_queryset"""
+        user = self.request.user
+        if user.role in ['ADMIN', 'SUPERADMIN', 'AGENT_CONSULAIRE']:
+            return ArchivedAppointment.objects.all()
+        return ArchivedAppointment.objects.filter(user=user)
+    
     def get_serializer_class(self):
         if self.action == 'create':
             return AppointmentCreateSerializer
+        if self.action in ('upcoming', 'search'):
+            return AppointmentListSerializer
+        if self.action == 'history':
+            return AppointmentHistorySerializer
         return AppointmentSerializer
     
+    def paginated_list(self, queryset):
+        """Paginate ``queryset`` through the slim list serializer"""
+        serializer_class = self.get_serializer_class()
+        page = self.paginate_queryset(serializer_class.setup_queryset(queryset))
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+    
     def create(self, request, *args, **kwargs):
         """Restrict creation to citizens and appointment/consular agents"""
         # Vérifier si les rendez-vous sont activés
@@ -120,17 +154,11 @@ class AppointmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        appointment.status = 'CANCELLED'
-        appointment.save()
-        
-        # Log cancellation
-        AuditLog.objects.create(
-            user=request.user,
-            action='UPDATE',
-            description=f"Rendez-vous annulé: {appointment.reference_number}",
-            content_type=ContentType.objects.get_for_model(Appointment),
-            object_id=appointment.id
-        )
+        try:
+            # The user cancelled it: an in-app notice only, no email or push
+            transition(appointment, Appointment.Status.CANCELLED, user=request.user, notify=False)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=e.status_code)
 
         # Create in-app notification
         try:
@@ -165,35 +193,74 @@ class AppointmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Update timestamps depending on status
-        from django.utils import timezone as dj_timezone
-
-        appointment.status = new_status
-        if new_status == 'CONFIRMED':
-            appointment.confirmed_at = dj_timezone.now()
-        if new_status == 'COMPLETED':
-            appointment.completed_at = dj_timezone.now()
-        appointment.save()
-
-        # Log
-        AuditLog.objects.create(
-            user=request.user,
-            action='UPDATE',
-            description=f"Statut RDV {appointment.reference_number} -> {new_status}",
-            content_type=ContentType.objects.get_for_model(Appointment),
-            object_id=appointment.id
-        )
-
-        # Notify asynchronously
+        # Timestamps, audit log and user notification are handled by the transition
         try:
-            notify_appointment_status_changed(appointment.id)
-        except Exception:
-            # Notification failures should not block the response
-            pass
+            transition(appointment, new_status, user=request.user)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=e.status_code)
 
         serializer = self.get_serializer(appointment)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def qr(self, request, pk=None):
+        """Render the appointment QR code on demand (PNG, cached by content hash)"""
+        appointment = self.get_object()
+        version, png = get_appointment_qr(appointment)
+
+        etag = f'"{version}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = HttpResponse(png, content_type='image/png')
+        response['ETag'] = etag
+        if request.query_params.get('v') == version:
+            # Versioned URL: this exact content will never change
+            response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def calendar_feed(self, request):
+        """Return the personal iCalendar feed URL of the current user"""
+        # The cached user may predate a regeneration
+        request.user.refresh_from_db(fields=['calendar_feed_version'])
+        url = reverse('appointments:appointment-ics-feed', kwargs={'token': make_feed_token(request.user)})
+        return Response({"url": request.build_absolute_uri(url)})
+
+    @action(detail=False, methods=['post'])
+    def regenerate_calendar_feed(self, request):
+        """Replace the calendar feed URL of the current user; the previous one stops working"""
+        token = regenerate_feed_token(request.user)
+        url = reverse('appointments:appointment-ics-feed', kwargs={'token': token})
+        return Response({"url": request.build_absolute_uri(url)})
+
+    @action(
+        detail=False, methods=['get'], url_path=r'feed/(?P<token>[^/]+)', url_name='ics-feed',
+        permission_classes=[AllowAny], authentication_classes=[]
+    )
+    def ics_feed(self, request, token=None):
+        """iCalendar feed of upcoming appointments, authenticated by its signed token"""
+        user_id = read_feed_token(token)
+        if user_id is None:
+            return Response({"error": "Lien de calendrier invalide."}, status=status.HTTP_404_NOT_FOUND)
+
+        body, etag, last_modified = get_feed(user_id)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            return not_modified
+
+        response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+        response['ETag'] = etag
+        if timestamp:
+            response['Last-Modified'] = http_date(timestamp)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsAgent])
     def send_reminder(self, request, pk=None):
         """Agent: Send appointment reminder (email/SMS if configured)"""
@@ -220,20 +287,41 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         appointments = self.get_queryset().filter(
             appointment_date__gte=today,
             status__in=['PENDING', 'CONFIRMED']
-        ).order_by('appointment_date', 'appointment_time')
+        ).order_by('appointment_date', 'appointment_time', 'id')
         
-        serializer = self.get_serializer(appointments, many=True)
-        return Response(serializer.data)
+        return self.paginated_list(appointments)
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Full-text search: reference, name or email, service, office"""
+        query = request.query_params.get('q', '').strip()
+        if len(query) < 2:
+            return Response(
+                {"error": "La recherche doit contenir au moins 2 caractères."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        user = request.user
+        owner = None if user.role in ['ADMIN', 'SUPERADMIN', 'AGENT_CONSULAIRE'] else user
+        appointments = search_objects(
+            self.get_queryset(), query, owner=owner, limit=settings.SEARCH_MAX_RESULTS
+        ).order_by('-id')
+        return self.paginated_list(appointments)
     
     @action(detail=False, methods=['get'])
     def history(self, request):
-        """Get user's past appointments"""
+        """Get user's past appointments, archived ones included"""
         today = timezone.now().date()
-        appointments = self.get_queryset().filter(
-            appointment_date__lt=today
-        ).order_by('-appointment_date', '-appointment_time')
+        rows = history_rows(
+            self.get_queryset().filter(appointment_date__lt=today),
+            self.get_archived_queryset()
+        )
         
-        serializer = self.get_serializer(appointments, many=True)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(rows, many=True)
         return Response(serializer.data)
 
 
@@ -284,6 +372,42 @@ class AppointmentSlotViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(available_slots, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """Remaining capacity per day for one office/service and month (YYYY-MM)"""
+        office_id = request.query_params.get('office')
+        service_id = request.query_params.get('service')
+        month = request.query_params.get('month')
+        
+        if not all([office_id, service_id, month]):
+            return Response(
+                {"error": "Les paramètres office, service et month sont requis."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            office_id, service_id = int(office_id), int(service_id)
+            first_day = datetime.strptime(month, '%Y-%m').date()
+        except ValueError:
+            return Response(
+                {"error": "Paramètres invalides (month attendu au format AAAA-MM)."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # The cached month is shared; past days are trimmed per request
+        today = timezone.now().date().isoformat()
+        days = [
+            day for day in get_month_availability(office_id, service_id, first_day.year, first_day.month)
+            if day['date'] >= today
+        ]
+        
+        return Response({
+            'office': office_id,
+            'service': service_id,
+            'month': first_day.strftime('%Y-%m'),
+            'days': days,
+        })
+
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsVigile])
     def today(self, request):
         """Vigile: List today's appointments for check-in"""
@@ -314,8 +438,10 @@ class AppointmentSlotViewSet(viewsets.ReadOnlyModelViewSet):
         if appointment.status not in ['PENDING', 'CONFIRMED']:
             return Response({"error": "Ce rendez-vous ne peut pas être enregistré."}, status=status.HTTP_400_BAD_REQUEST)
 
-        appointment.status = 'CHECKED_IN'
-        appointment.save()
+        try:
+            transition(appointment, Appointment.Status.CHECKED_IN, user=request.user, note='Check-in QR', notify=False)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=e.status_code)
 
         # Log the scan/check-in
         CheckInLog.objects.create(
@@ -326,14 +452,6 @@ class AppointmentSlotViewSet(viewsets.ReadOnlyModelViewSet):
             notes='QR check-in'
         )
 
-        AuditLog.objects.create(
-            user=request.user,
-            action='UPDATE',
-            description=f"Check-in RDV {appointment.reference_number}",
-            content_type=ContentType.objects.get_for_model(Appointment),
-            object_id=appointment.id
-        )
-
         serializer = AppointmentSerializer(appointment, context={'request': request})
         return Response({
             'appointment': serializer.data,
@@ -403,12 +521,14 @@ class AppointmentSlotViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsVigile])
     def complete_by_vigile(self, request, pk=None):
         """Vigile: marquer un rendez-vous comme terminé et notifier"""
-        appointment = self.get_object()
-        from django.utils import timezone as dj_timezone
+        # pk désigne le rendez-vous, pas un créneau de ce viewset
+        appointment = get_object_or_404(Appointment, pk=pk)
 
-        appointment.status = 'COMPLETED'
-        appointment.completed_at = dj_timezone.now()
-        appointment.save()
+        # Notifie l'usager (email/push) et journalise via la transition
+        try:
+            transition(appointment, Appointment.Status.COMPLETED, user=request.user, note='Terminé par le vigile')
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=e.status_code)
 
         CheckInLog.objects.create(
             appointment=appointment,
@@ -418,20 +538,6 @@ class AppointmentSlotViewSet(viewsets.ReadOnlyModelViewSet):
             notes='Completed by vigile'
         )
 
-        AuditLog.objects.create(
-            user=request.user,
-            action='UPDATE',
-            description=f"RDV terminé (vigile): {appointment.reference_number}",
-            content_type=ContentType.objects.get_for_model(Appointment),
-            object_id=appointment.id
-        )
-
-        # Notifier l'usager (email/push)
-        try:
-            notify_appointment_status_changed(appointment.id)
-        except Exception:
-            pass
-
         # Notifier l'admin par email si possible
         try:
             admin_email = getattr(settings, 'DEFAULT_FROM_EMAIL', None)
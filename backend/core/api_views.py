@@ -5,6 +5,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.views import APIView
 from .models import Feedback
 
 
@@ -63,3 +64,133 @@ class FeedbackViewSet(viewsets.ModelViewSet):
             ip = request.META.get('REMOTE_ADDR')
         return ip
 
+
+
+class ChunkedUploadViewSet(viewsets.ViewSet):
+    """
+    Resumable document uploads (tus 1.0 protocol, see core.uploads)
+
+    POST   uploads/        Upload-Length + Upload-Metadata -> 201 + Location
+    HEAD   uploads/<id>/   -> Upload-Offset (where to resume)
+    PATCH  uploads/<id>/   Upload-Offset + application/offset+octet-stream chunk
+    DELETE uploads/<id>/   abandon the upload
+    GET    uploads/<id>/   state, with the created document id once complete
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get_upload(self, pk):
+        from django.shortcuts import get_object_or_404
+        from .models import ChunkedUpload
+        return get_object_or_404(ChunkedUpload, pk=pk, user=self.request.user)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        from django.conf import settings
+        from .uploads import TUS_VERSION
+
+        response = super().finalize_response(request, response, *args, **kwargs)
+        response['Tus-Resumable'] = TUS_VERSION
+        if request.method == 'OPTIONS':
+            response['Tus-Version'] = TUS_VERSION
+            response['Tus-Max-Size'] = str(settings.MAX_UPLOAD_SIZE)
+            response['Tus-Extension'] = 'creation,termination'
+        return response
+
+    @staticmethod
+    def error_response(error):
+        response = Response({"error": str(error)}, status=error.status_code)
+        if getattr(error, 'expected', None) is not None:
+            response['Upload-Offset'] = str(error.expected)
+        return response
+
+    def create(self, request):
+        """Declare a new upload"""
+        from .uploads import UploadError, create_upload, parse_metadata
+
+        try:
+            upload_length = int(request.headers.get('Upload-Length', ''))
+        except ValueError:
+            return Response({"error": "En-tête Upload-Length requis."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            upload = create_upload(request.user, upload_length, parse_metadata(request.headers.get('Upload-Metadata')))
+        except UploadError as e:
+            return self.error_response(e)
+
+        response = Response(self.describe(upload), status=status.HTTP_201_CREATED)
+        response['Location'] = request.build_absolute_uri(f"{upload.pk}/")
+        response['Upload-Offset'] = '0'
+        return response
+
+    def retrieve(self, request, pk=None):
+        """Current offset (HEAD) or state (GET) of an upload"""
+        upload = self.get_upload(pk)
+        response = Response(self.describe(upload))
+        response['Upload-Offset'] = str(upload.offset)
+        response['Upload-Length'] = str(upload.upload_length)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def partial_update(self, request, pk=None):
+        """Append one chunk"""
+        from .uploads import UploadError, append_chunk
+
+        upload = self.get_upload(pk)
+        if request.content_type != 'application/offset+octet-stream':
+            return Response(
+                {"error": "Content-Type application/offset+octet-stream requis."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return Response({"error": "En-tête Upload-Offset requis."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            upload = append_chunk(upload, offset, request.stream)
+        except UploadError as e:
+            return self.error_response(e)
+
+        if upload.status == upload.Status.COMPLETE:
+            response = Response(self.describe(upload))
+        else:
+            response = Response(status=status.HTTP_204_NO_CONTENT)
+        response['Upload-Offset'] = str(upload.offset)
+        return response
+
+    def destroy(self, request, pk=None):
+        """Abandon an upload"""
+        from .uploads import delete_upload
+
+        delete_upload(self.get_upload(pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @staticmethod
+    def describe(upload):
+        return {
+            'id': str(upload.pk),
+            'target': upload.target,
+            'filename': upload.filename,
+            'offset': upload.offset,
+            'length': upload.upload_length,
+            'status': upload.status,
+            'document_id': upload.object_id,
+        }
+
+
+class ChangesView(APIView):
+    """
+    Delta sync: ids of the user's appointments, applications, payments and
+    notifications created, updated or deleted since ``?since=<token>``
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        from .sync import SyncTokenError, changes_since
+
+        try:
+            result = changes_since(request.user, request.query_params.get('since') or None)
+        except SyncTokenError as e:
+            return Response({"error": str(e)}, status=e.status_code)
+        response = Response(result)
+        response['Cache-Control'] = 'no-store'
+        return response
@@ -6,3 +6,6 @@ class CoreConfig(AppConfig):
     name = 'core'
     verbose_name = 'Core'
 
+    def ready(self):
+        from .sync import connect_tombstones
+        connect_tombstones()
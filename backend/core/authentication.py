@@ -0,0 +1,69 @@
+"""
+JWT authentication with a cached user
+
+simplejwt's JWTAuthentication reads the User row on every API call. Here the
+user is kept in the cache for JWT_USER_CACHE_TTL seconds, keyed by user id and
+token version (``User.auth_version``, copied into the ``ver`` claim when the
+token is issued). The tokens also carry the user's ``role`` so permission
+checks can read it from the token (see core.permissions.request_role).
+
+Any save or deletion of the user drops its cached copy (users.signals).
+Tokens are revoked by bumping ``auth_version``, which ``User.save`` does
+whenever the role or the active flag changes, whatever the path (API,
+admin, shell); there is no separate revocation call. Tokens issued before
+are refused, refresh tokens included, and the user must log in again.
+
+With a per-process cache (LocMemCache, the default) another worker may keep
+serving its copy until the TTL expires; use a shared cache in production.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+VERSION_CLAIM = 'ver'
+ROLE_CLAIM = 'role'
+
+
+def user_cache_key(user_id, version):
+    return f"jwt_user:{user_id}:{version}"
+
+
+def add_token_claims(token, user):
+    """Copy the token version and role of ``user`` into ``token``"""
+    token[VERSION_CLAIM] = user.auth_version
+    token[ROLE_CLAIM] = user.role
+    return token
+
+
+def token_is_current(token, user):
+    # Tokens issued before versioning carry no claim: version 0
+    return token.get(VERSION_CLAIM, 0) == user.auth_version
+
+
+def forget_cached_user(user):
+    """Drop the cached copy of ``user``"""
+    cache.delete(user_cache_key(user.pk, user.auth_version))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication reading the user from the cache first"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Le jeton ne contient pas d'identifiant utilisateur.")
+
+        key = user_cache_key(user_id, validated_token.get(VERSION_CLAIM, 0))
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            if not token_is_current(validated_token, user):
+                raise AuthenticationFailed(
+                    "Votre compte a été modifié. Veuillez vous reconnecter.", code='token_revoked'
+                )
+            cache.set(key, user, settings.JWT_USER_CACHE_TTL)
+        return user
@@ -0,0 +1,142 @@
+"""
+Batch endpoint: several API reads in one round trip
+
+POST /api/core/batch/ with::
+
+    {"requests": [
+        {"id": "profile", "path": "/api/auth/profile/"},
+        {"id": "unread", "path": "/api/notifications/unread_count/"},
+        {"path": "/api/appointments/upcoming/?page=1", "headers": {"If-None-Match": "\\"abc\\""}}
+    ]}
+
+answers ``{"responses": [{"id": ..., "status": 200, "headers": {...}, "body": ...}]}``
+in the same order. Each sub-request goes through the URL resolver and the
+existing view, in process, as the user authenticated on the batch request
+(the token is not decoded again): permissions, throttles and filters apply
+as for a direct call. Sub-requests may only set the conditional request and
+Accept-Language headers. Only GET sub-requests are accepted, at most
+BATCH_MAX_REQUESTS of them; a failing sub-request does not affect the
+others. The middleware stack runs once, for the batch request; each
+sub-request still goes through AuditLogMiddleware, so denied (401, 403)
+and throttled (429) sub-requests are audit-logged like direct calls.
+"""
+import json
+import logging
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .middleware import AuditLogMiddleware
+
+logger = logging.getLogger('embassy')
+
+BATCH_PATH_PREFIX = '/api/'
+# Headers of the batch request a sub-request must not inherit
+DROPPED_META = ('CONTENT_LENGTH', 'CONTENT_TYPE', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+# Headers a sub-request may set (conditional requests, language)
+SUB_REQUEST_HEADERS = ('if-none-match', 'if-modified-since', 'accept-language')
+# Headers of a sub-response passed back to the client
+FORWARDED_HEADERS = ('etag', 'last-modified', 'cache-control', 'location')
+
+
+def _sub_request(request, path, query_string, headers):
+    """A GET HttpRequest for ``path`` carrying the batch request's user and headers"""
+    parent = request._request
+    sub = HttpRequest()
+    sub.method = 'GET'
+    sub.path = sub.path_info = path
+    sub.META = {key: value for key, value in parent.META.items() if key not in DROPPED_META}
+    sub.META.update(REQUEST_METHOD='GET', PATH_INFO=path, QUERY_STRING=query_string)
+    for name, value in headers.items():
+        if name.lower() in SUB_REQUEST_HEADERS:
+            sub.META['HTTP_' + name.upper().replace('-', '_')] = str(value)
+    sub.GET = QueryDict(query_string)
+    sub.COOKIES = parent.COOKIES
+    for attribute in ('session', 'user'):
+        if hasattr(parent, attribute):
+            setattr(sub, attribute, getattr(parent, attribute))
+    if request.user.is_authenticated:
+        # Read by rest_framework.request.Request: reuse the batch request's authentication
+        sub._force_auth_user = request.user
+        sub._force_auth_token = request.auth
+    return sub
+
+
+def _run_view(sub):
+    match = sub.resolver_match
+    return match.func(sub, *match.args, **match.kwargs)
+
+
+_audited_view = AuditLogMiddleware(_run_view)
+
+
+def _response_body(response):
+    if hasattr(response, 'data'):
+        return response.data
+    if response.get('Content-Type', '').startswith('application/json') and not response.streaming:
+        return json.loads(response.content or b'null')
+    return None
+
+
+def dispatch_sub_request(request, spec):
+    """Run one sub-request through its view; returns its entry of the batch response"""
+    entry = {'id': spec.get('id')}
+    path = spec.get('path')
+    method = str(spec.get('method', 'GET')).upper()
+    headers = spec.get('headers') or {}
+    if method != 'GET':
+        return {**entry, 'status': status.HTTP_405_METHOD_NOT_ALLOWED,
+                'body': {'error': 'Seules les requêtes GET sont acceptées dans un lot.'}}
+    if not isinstance(path, str) or not isinstance(headers, dict):
+        return {**entry, 'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'error': 'Chaque requête doit avoir un chemin (path).'}}
+
+    url = urlsplit(path)
+    if not url.path.startswith(BATCH_PATH_PREFIX) or url.scheme or url.netloc:
+        return {**entry, 'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'error': f'Le chemin doit commencer par {BATCH_PATH_PREFIX}.'}}
+    try:
+        match = resolve(url.path)
+    except Resolver404:
+        return {**entry, 'status': status.HTTP_404_NOT_FOUND, 'body': {'error': 'Ressource introuvable.'}}
+    if getattr(match.func, 'view_class', None) is BatchView:
+        return {**entry, 'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'error': 'Un lot ne peut pas contenir de lot.'}}
+
+    sub = _sub_request(request, url.path, url.query, headers)
+    sub.resolver_match = match
+    try:
+        response = _audited_view(sub)
+    except Exception as e:
+        logger.error(f"Lot: erreur sur {url.path}: {e}", exc_info=True)
+        return {**entry, 'status': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                'body': {'error': 'Erreur interne du serveur.'}}
+
+    return {
+        **entry,
+        'status': response.status_code,
+        'headers': {name: value for name, value in response.items() if name.lower() in FORWARDED_HEADERS},
+        'body': _response_body(response),
+    }
+
+
+class BatchView(APIView):
+    """Plusieurs requêtes GET de l'API en un seul aller-retour"""
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        specs = request.data.get('requests') if isinstance(request.data, dict) else None
+        if not isinstance(specs, list) or not all(isinstance(spec, dict) for spec in specs):
+            return Response({"error": "Le champ 'requests' doit être une liste de requêtes."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(specs) > settings.BATCH_MAX_REQUESTS:
+            return Response({"error": f"Un lot est limité à {settings.BATCH_MAX_REQUESTS} requêtes."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'responses': [dispatch_sub_request(request, spec) for spec in specs]})
@@ -0,0 +1,86 @@
+"""
+Changed-field tracking for models
+
+``DirtyFieldsMixin`` remembers the value of every concrete field as it was
+loaded from (or last written to) the database. A ``save()`` without
+``update_fields`` then writes only the changed columns (plus the
+``auto_now`` ones) and skips the query, and the save signals, when nothing
+changed. Unchanged encrypted fields are thus neither re-encrypted nor
+rewritten, and ``has_changed`` lets a model skip derived values (blind
+indexes, completeness) whose inputs did not change.
+
+Changes made behind the instance's back (``QuerySet.update()``) are not
+seen: call ``refresh_from_db()`` before relying on them.
+"""
+import copy
+
+
+def _snapshot(value):
+    # JSON lists and dicts are modified in place: keep a copy to compare with
+    return copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+
+
+class DirtyFieldsMixin:
+    """Model mixin narrowing ``save()`` to the fields changed since loading"""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_fields()
+        return instance
+
+    def _remember_fields(self, attnames=None):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for field in self._meta.concrete_fields:
+            # Deferred fields are not in __dict__ until they are read
+            if field.attname in self.__dict__ and (attnames is None or field.attname in attnames):
+                loaded[field.attname] = _snapshot(self.__dict__[field.attname])
+
+    def get_dirty_fields(self):
+        """Names of the fields changed since the instance was loaded or saved"""
+        fields = [field for field in self._meta.concrete_fields if not field.primary_key]
+        loaded = self.__dict__.get('_loaded_values')
+        if self._state.adding or loaded is None:
+            return {field.name for field in fields}
+        return {
+            field.name for field in fields
+            if field.attname in self.__dict__
+            and (field.attname not in loaded or self.__dict__[field.attname] != loaded[field.attname])
+        }
+
+    def has_changed(self, *names):
+        dirty = self.get_dirty_fields()
+        return any(name in dirty for name in names)
+
+    def save(self, *args, **kwargs):
+        if (
+            not args
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+            and not self._state.adding
+            and '_loaded_values' in self.__dict__
+        ):
+            dirty = self.get_dirty_fields()
+            if dirty:
+                dirty |= {
+                    field.name for field in self._meta.concrete_fields if getattr(field, 'auto_now', False)
+                }
+            # An empty set makes Model.save() return without any query
+            kwargs['update_fields'] = dirty
+
+        super().save(*args, **kwargs)
+
+        self._remember_fields(self._attnames(kwargs.get('update_fields')))
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._remember_fields(self._attnames(fields))
+
+    def _attnames(self, names):
+        if names is None:
+            return None
+        names = set(names)
+        return {
+            field.attname for field in self._meta.concrete_fields
+            if field.name in names or field.attname in names
+        }
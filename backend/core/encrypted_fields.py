@@ -1,14 +1,25 @@
 """
 Encrypted model fields for sensitive data
 Uses Fernet symmetric encryption from cryptography library
+
+Fernet ciphertext is randomized, so an encrypted column can never be
+compared with a value. Identity numbers that must be found or kept unique
+have a companion ``<field>_hash`` column holding a blind index: a keyed
+HMAC-SHA256 of the normalized value (``blind_index``). The ``blind`` lookup
+queries that column: ``Profile.objects.filter(passport_number__blind='AB123456')``.
 """
 from cryptography.fernet import Fernet, InvalidToken
 from django.conf import settings
 from django.db import models
+from django.db.models import Lookup
+from django.db.models.expressions import Col
 from django.utils.functional import cached_property
 import base64
+import hashlib
+import hmac
 import os
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
@@ -172,3 +183,99 @@ class EncryptedTextField(models.TextField):
                 print(f"⚠️  Encryption error: {e}")
             raise ValueError(f"Failed to encrypt value: {e}")
 
+
+def get_blind_index_key():
+    """
+    HMAC key of the blind indexes (settings.BLIND_INDEX_KEY)
+    In development, a key derived from SECRET_KEY keeps indexes stable across restarts
+    """
+    key = getattr(settings, 'BLIND_INDEX_KEY', '')
+    if not key:
+        key = hashlib.sha256(f'blind-index:{settings.SECRET_KEY}'.encode()).hexdigest()
+    return key.encode() if isinstance(key, str) else key
+
+
+def normalize_identifier(value):
+    """Identity numbers are compared without spaces and case ("ab 123 456" == "AB123456")"""
+    return re.sub(r'\s+', '', str(value)).upper()
+
+
+def blind_index(value):
+    """Blind index (hex HMAC-SHA256) of an identity number, None for empty values"""
+    if value is None or not str(value).strip():
+        return None
+    return hmac.new(
+        get_blind_index_key(), normalize_identifier(value).encode('utf-8'), hashlib.sha256
+    ).hexdigest()
+
+
+def set_blind_indexes(instance, *field_names, update_fields=None):
+    """
+    Fill the ``<field>_hash`` column of each encrypted field before saving
+    Returns ``update_fields`` with the hash columns of the listed fields added
+    """
+    for name in field_names:
+        setattr(instance, f'{name}_hash', blind_index(getattr(instance, name)))
+    if update_fields is None:
+        return None
+    return {*update_fields, *(f'{name}_hash' for name in field_names if name in update_fields)}
+
+
+def rebuild_blind_indexes(model, field_names, batch_size=500):
+    """
+    Recompute the ``<field>_hash`` columns of every ``model`` row (after a
+    key change or for rows hashed before HMAC blind indexes)
+
+    The hash columns are unique: when two rows hold the same normalized
+    number, the later one is left without index and reported. Returns
+    ``(rows, duplicates)`` where duplicates is a list of ``(pk, field)``.
+    """
+    hash_fields = [f'{name}_hash' for name in field_names]
+    seen = {name: set() for name in field_names}
+    duplicates = []
+    count = 0
+    batch = []
+
+    def flush():
+        model.objects.bulk_update(batch, hash_fields)
+        batch.clear()
+
+    for instance in model.objects.only('pk', *field_names).order_by('pk').iterator(chunk_size=batch_size):
+        for name in field_names:
+            digest = blind_index(getattr(instance, name))
+            if digest is not None and digest in seen[name]:
+                duplicates.append((instance.pk, name))
+                digest = None
+            elif digest is not None:
+                seen[name].add(digest)
+            setattr(instance, f'{name}_hash', digest)
+        batch.append(instance)
+        count += 1
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return count, duplicates
+
+
+class BlindIndexLookup(Lookup):
+    """
+    ``<encrypted_field>__blind=value``: exact match through the indexed
+    ``<encrypted_field>_hash`` column
+    """
+    lookup_name = 'blind'
+    # The value is hashed here, never encrypted by the field
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        field = self.lhs.target
+        hash_field = field.model._meta.get_field(f'{field.name}_hash')
+        lhs_sql, params = compiler.compile(Col(self.lhs.alias, hash_field))
+        digest = blind_index(self.rhs)
+        if digest is None:
+            return f'{lhs_sql} IS NULL', params
+        return f'{lhs_sql} = %s', params + [digest]
+
+
+EncryptedCharField.register_lookup(BlindIndexLookup)
+EncryptedTextField.register_lookup(BlindIndexLookup)
@@ -0,0 +1,119 @@
+"""
+Management command comparing DRF's JSON renderer and parser with core.renderers
+Usage: python manage.py benchmark_json [--rows 20] [--repeat 200]
+
+The payloads have the shape of the heaviest responses: a page of the user
+list (AdminUserSerializer, nested profile), a page of audit logs and the
+day's roster (AppointmentSerializer), plus an APIView style payload of raw
+Decimal / date / datetime / UUID values. They are built from the
+serializers' fields, so no database rows are needed.
+"""
+import decimal
+import io
+import timeit
+import uuid
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONParser, FastJSONRenderer, orjson
+
+NOW = datetime(2024, 5, 17, 9, 30, 12, 345678)
+
+
+def sample_value(field, index):
+    """A representative value of ``field``'s output, as the serializer renders it"""
+    if isinstance(field, serializers.ListSerializer):
+        return [sample_value(field.child, i) for i in range(3)]
+    if isinstance(field, serializers.BaseSerializer):
+        return sample_record(field, index)
+    if isinstance(field, serializers.BooleanField):
+        return index % 2 == 0
+    if isinstance(field, serializers.DecimalField):
+        return f'{50000 + index}.00'
+    if isinstance(field, (serializers.IntegerField, serializers.PrimaryKeyRelatedField)):
+        return index + 1
+    if isinstance(field, serializers.FloatField):
+        return 14.6928 + index
+    if isinstance(field, serializers.DateTimeField):
+        return (NOW + timedelta(minutes=index)).isoformat() + 'Z'
+    if isinstance(field, serializers.DateField):
+        return (NOW.date() + timedelta(days=index)).isoformat()
+    if isinstance(field, serializers.TimeField):
+        return time(9 + index % 8, 15).isoformat()
+    if isinstance(field, (serializers.ListField, serializers.JSONField)):
+        return [f'Élément {index}', f'Élément {index + 1}']
+    if isinstance(field, serializers.SerializerMethodField):
+        return f'https://ambassade-congo.sn/api/ressource/{index}/?v=8a19a3b9'
+    return f'{field.field_name.replace("_", " ").capitalize()} {index} — Dakar'
+
+
+def sample_record(serializer, index):
+    return {name: sample_value(field, index) for name, field in serializer.fields.items()}
+
+
+def raw_record(index):
+    """Values of the hand-built APIView responses (reminders, statistics)"""
+    return {
+        'id': uuid.UUID(int=index),
+        'amount': decimal.Decimal(f'{15000 + index}.50'),
+        'expiry_date': date(2025, 1, 1) + timedelta(days=index),
+        'created_at': timezone.make_aware(NOW) + timedelta(hours=index),
+        'appointment_time': time(10, 30),
+        'message': f'Votre passeport expire dans {index} jours',
+        'priority': 'HIGH',
+    }
+
+
+def payloads(rows):
+    from appointments.serializers import AppointmentSerializer
+    from core.serializers import AuditLogSerializer
+    from users.serializers import AdminUserSerializer
+
+    def page(results):
+        return {'count': len(results) * 10, 'next': 'https://ambassade-congo.sn/api/?page=2',
+                'previous': None, 'results': results}
+
+    return {
+        'utilisateurs': page([sample_record(AdminUserSerializer(), i) for i in range(rows)]),
+        'journal d\'audit': page([sample_record(AuditLogSerializer(), i) for i in range(rows)]),
+        'rendez-vous du jour': [sample_record(AppointmentSerializer(), i) for i in range(rows * 5)],
+        'valeurs brutes': [raw_record(i) for i in range(rows * 5)],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare le rendu et l\'analyse JSON de DRF avec ceux de core.renderers (orjson)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20, help='Nombre d\'éléments par page')
+        parser.add_argument('--repeat', type=int, default=200, help='Nombre de mesures par charge')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson n\'est pas installé : core.renderers utilise le rendu de DRF.'))
+
+        repeat = options['repeat']
+        pairs = (
+            ('rendu', JSONRenderer(), FastJSONRenderer(), lambda renderer, data, body: renderer.render(data)),
+            ('analyse', JSONParser(), FastJSONParser(),
+             lambda parser, data, body: parser.parse(io.BytesIO(body), parser_context={})),
+        )
+        for name, data in payloads(options['rows']).items():
+            body = JSONRenderer().render(data)
+            if FastJSONParser().parse(io.BytesIO(FastJSONRenderer().render(data)), parser_context={}) != \
+                    JSONParser().parse(io.BytesIO(body), parser_context={}):
+                self.stdout.write(self.style.ERROR(f'{name} : les deux rendus diffèrent'))
+            for label, reference, fast, run in pairs:
+                timings = []
+                for implementation in (reference, fast):
+                    seconds = min(timeit.repeat(lambda: run(implementation, data, body), number=repeat, repeat=3))
+                    timings.append(seconds / repeat * 1e6)
+                self.stdout.write(
+                    f'{name} ({len(body) / 1024:.0f} Ko) {label} : DRF {timings[0]:.0f} µs, '
+                    f'orjson {timings[1]:.0f} µs (x{timings[0] / timings[1]:.1f})'
+                )
@@ -0,0 +1,38 @@
+"""
+Management command to build missing previews/thumbnails of image documents
+Usage: python manage.py generate_document_previews [--async]
+"""
+from django.core.management.base import BaseCommand
+from applications.models import Document
+from users.models import UserDocument
+from core.utils.images import generate_image_derivatives, needs_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Génère les aperçus et miniatures manquants des documents image'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--async',
+            action='store_true',
+            dest='use_async',
+            help='Confie la génération aux workers django-q au lieu de la faire ici',
+        )
+
+    def handle(self, *args, **options):
+        from django_q.tasks import async_task
+
+        count = 0
+        for model in (Document, UserDocument):
+            label = model._meta.label
+            for document in model.objects.filter(thumbnail__isnull=True).exclude(file='').iterator():
+                if not needs_derivatives(document):
+                    continue
+                if options['use_async']:
+                    async_task('core.utils.images.generate_image_derivatives', label, document.pk)
+                    count += 1
+                elif generate_image_derivatives(label, document.pk):
+                    count += 1
+
+        verb = 'planifié(s)' if options['use_async'] else 'généré(s)'
+        self.stdout.write(self.style.SUCCESS(f'{count} aperçu(s) {verb}.'))
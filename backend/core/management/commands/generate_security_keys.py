@@ -3,6 +3,7 @@ Django management command to generate security keys
 """
 from django.core.management.base import BaseCommand
 from django.core.management.utils import get_random_secret_key
+import secrets
 from cryptography.fernet import Fernet
 
 
@@ -22,9 +23,15 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('✅ ENCRYPTION_KEY générée:'))
         self.stdout.write(f'   {encryption_key}\n')
         
+        # Générer BLIND_INDEX_KEY pour les index aveugles (HMAC) des numéros chiffrés
+        blind_index_key = secrets.token_urlsafe(32)
+        self.stdout.write(self.style.SUCCESS('✅ BLIND_INDEX_KEY générée:'))
+        self.stdout.write(f'   {blind_index_key}\n')
+        
         # Instructions
         self.stdout.write(self.style.WARNING('\n⚠️  IMPORTANT: Ajoutez ces clés dans votre fichier .env:\n'))
         self.stdout.write(f'SECRET_KEY={django_secret_key}')
-        self.stdout.write(f'ENCRYPTION_KEY={encryption_key}\n')
+        self.stdout.write(f'ENCRYPTION_KEY={encryption_key}')
+        self.stdout.write(f'BLIND_INDEX_KEY={blind_index_key}\n')
         self.stdout.write(self.style.ERROR('⚠️  NE PARTAGEZ JAMAIS CES CLÉS !\n'))
 
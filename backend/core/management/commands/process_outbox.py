@@ -0,0 +1,24 @@
+"""
+Management command to deliver the outbox messages that are due (retries and lost tasks)
+Usage: python manage.py process_outbox [--limit 500]
+"""
+from django.core.management.base import BaseCommand
+from core.outbox import process_outbox
+
+
+class Command(BaseCommand):
+    help = 'Traite les messages sortants en attente (emails, notifications)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=500,
+            help='Nombre maximal de messages traités',
+        )
+
+    def handle(self, *args, **options):
+        delivered, not_delivered = process_outbox(options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{delivered} message(s) traité(s), {not_delivered} non traité(s).'
+        ))
@@ -0,0 +1,23 @@
+"""
+Management command to remove abandoned resumable uploads and their partial files
+Usage: python manage.py purge_chunked_uploads [--hours 24]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Supprime les téléversements fractionnés abandonnés et leurs fichiers partiels'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=settings.CHUNKED_UPLOAD_EXPIRY_HOURS,
+            help='Ancienneté minimale (en heures) depuis le dernier fragment reçu',
+        )
+
+    def handle(self, *args, **options):
+        count = purge_stale_uploads(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f'{count} téléversement(s) abandonné(s) supprimé(s).'))
@@ -0,0 +1,29 @@
+"""
+Management command to remove old and excess files of the rendered artefacts cache
+Usage: python manage.py purge_content_cache [--days 30] [--max-bytes 536870912]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.utils.content_cache import purge_content_cache
+
+
+class Command(BaseCommand):
+    help = 'Supprime les fichiers anciens ou excédentaires du cache des PDF et QR codes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.CONTENT_CACHE_MAX_AGE_DAYS,
+            help='Ancienneté maximale (en jours) depuis la dernière utilisation',
+        )
+        parser.add_argument(
+            '--max-bytes',
+            type=int,
+            default=settings.CONTENT_CACHE_MAX_BYTES,
+            help='Taille maximale de chaque espace du cache (en octets)',
+        )
+
+    def handle(self, *args, **options):
+        count = purge_content_cache(options['days'], options['max_bytes'])
+        self.stdout.write(self.style.SUCCESS(f'{count} fichier(s) du cache supprimé(s).'))
@@ -0,0 +1,23 @@
+"""
+Management command to remove the deletion records of the delta sync API past their retention
+Usage: python manage.py purge_tombstones [--days 90]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Supprime les traces de suppression de la synchronisation incrémentale au-delà de leur durée de conservation'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.SYNC_TOMBSTONE_DAYS,
+            help='Durée de conservation (en jours) des suppressions',
+        )
+
+    def handle(self, *args, **options):
+        count = purge_tombstones(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'{count} trace(s) de suppression supprimée(s).'))
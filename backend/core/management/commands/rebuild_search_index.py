@@ -0,0 +1,32 @@
+"""
+Management command to rebuild the full-text search index
+Usage: python manage.py rebuild_search_index [--batch-size 500]
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection
+from core.search import SEARCH_SOURCES, purge_stale_entries, reindex
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit l\'index de recherche plein texte des demandes et rendez-vous'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Nombre d\'objets indexés par lot',
+        )
+
+    def handle(self, *args, **options):
+        for label in SEARCH_SOURCES:
+            model = apps.get_model(label)
+            purged = purge_stale_entries(model)
+            indexed = reindex(model, batch_size=options['batch_size'])
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {indexed} indexé(s), {purged} obsolète(s) supprimé(s)')
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("INSERT INTO core_searchentry_fts(core_searchentry_fts) VALUES ('rebuild')")
+        self.stdout.write(self.style.SUCCESS('Index de recherche reconstruit.'))
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0004_sitesettings_auditlog_core_auditl_ip_addr_71e206_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChunkedUpload",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "target",
+                    models.CharField(
+                        choices=[
+                            ("DOCUMENT", "Document de demande"),
+                            ("USER_DOCUMENT", "Document utilisateur"),
+                        ],
+                        max_length=20,
+                        verbose_name="Destination",
+                    ),
+                ),
+                (
+                    "filename",
+                    models.CharField(max_length=255, verbose_name="Nom du fichier"),
+                ),
+                (
+                    "upload_length",
+                    models.BigIntegerField(verbose_name="Taille totale (octets)"),
+                ),
+                (
+                    "offset",
+                    models.BigIntegerField(default=0, verbose_name="Octets reçus"),
+                ),
+                (
+                    "metadata",
+                    models.JSONField(
+                        blank=True, default=dict, verbose_name="Métadonnées"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("UPLOADING", "En cours"), ("COMPLETE", "Terminé")],
+                        default="UPLOADING",
+                        max_length=20,
+                        verbose_name="Statut",
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chunked_uploads",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Utilisateur",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Téléversement fractionné",
+                "verbose_name_plural": "Téléversements fractionnés",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "updated_at"],
+                        name="core_chunke_status_aaa89a_idx",
+                    )
+                ],
+            },
+        ),
+    ]
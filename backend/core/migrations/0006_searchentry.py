@@ -0,0 +1,106 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Full-text index on SearchEntry.document, see core.search
+POSTGRES_INDEX = [
+    "CREATE INDEX core_searchentry_document_fts ON core_searchentry "
+    "USING GIN (to_tsvector('simple', document))",
+]
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE core_searchentry_fts USING fts5("
+    "document, content='core_searchentry', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER core_searchentry_fts_insert AFTER INSERT ON core_searchentry BEGIN "
+    "INSERT INTO core_searchentry_fts(rowid, document) VALUES (new.id, new.document); END",
+    "CREATE TRIGGER core_searchentry_fts_delete AFTER DELETE ON core_searchentry BEGIN "
+    "INSERT INTO core_searchentry_fts(core_searchentry_fts, rowid, document) "
+    "VALUES ('delete', old.id, old.document); END",
+    "CREATE TRIGGER core_searchentry_fts_update AFTER UPDATE ON core_searchentry BEGIN "
+    "INSERT INTO core_searchentry_fts(core_searchentry_fts, rowid, document) "
+    "VALUES ('delete', old.id, old.document); "
+    "INSERT INTO core_searchentry_fts(rowid, document) VALUES (new.id, new.document); END",
+]
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_INDEX, 'sqlite': SQLITE_INDEX}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS core_searchentry_document_fts")
+    elif vendor == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS core_searchentry_fts_{trigger}")
+        schema_editor.execute("DROP TABLE IF EXISTS core_searchentry_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0005_chunkedupload"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                ("document", models.TextField(verbose_name="Texte indexé")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Propriétaire",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Entrée de recherche",
+                "verbose_name_plural": "Entrées de recherche",
+                "indexes": [
+                    models.Index(
+                        fields=["content_type", "owner"],
+                        name="core_search_content_9f46bd_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="searchentry",
+            constraint=models.UniqueConstraint(
+                fields=("content_type", "object_id"),
+                name="core_searchentry_object_unique",
+            ),
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:49
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_sequence"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "handler",
+                    models.CharField(max_length=200, verbose_name="Traitement"),
+                ),
+                (
+                    "payload",
+                    models.JSONField(blank=True, default=dict, verbose_name="Données"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("PENDING", "En attente"), ("FAILED", "Échec")],
+                        default="PENDING",
+                        max_length=20,
+                        verbose_name="Statut",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="Tentatives"
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(blank=True, verbose_name="Dernière erreur"),
+                ),
+                (
+                    "available_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Disponible à partir de",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Message sortant",
+                "verbose_name_plural": "Messages sortants",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "available_at"],
+                        name="core_outbox_status_79e487_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.11 on 2026-10-19 15:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0008_outboxmessage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveBigIntegerField()),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Supprimé le"
+                    ),
+                ),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Propriétaire",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Suppression synchronisée",
+                "verbose_name_plural": "Suppressions synchronisées",
+                "indexes": [
+                    models.Index(
+                        fields=["owner", "deleted_at"],
+                        name="core_tombst_owner_i_3c53a8_idx",
+                    ),
+                    models.Index(
+                        fields=["deleted_at"], name="core_tombst_deleted_51085d_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
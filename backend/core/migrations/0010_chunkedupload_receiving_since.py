@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-19 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_tombstone"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chunkedupload",
+            name="receiving_since",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,12 +1,15 @@
 """
-Core models: ConsularOffice, ServiceType, Announcement, AuditLog, FAQ, Feedback
+Core models: ConsularOffice, ServiceType, Announcement, AuditLog, FAQ, Feedback, ChunkedUpload,
+SearchEntry, Sequence, OutboxMessage, Tombstone
 Essential infrastructure for the Embassy PWA
 """
+import uuid
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.conf import settings
+from django.utils import timezone
 
 
 class ConsularOffice(models.Model):
@@ -457,3 +460,171 @@ class Feedback(models.Model):
     def __str__(self):
         user_str = self.user.get_full_name() if self.user else 'Anonyme'
         return f"{user_str} - {self.get_rating_display()} - {self.page}"
+
+
+class ChunkedUpload(models.Model):
+    """
+    Resumable (tus-style) upload in progress, see core.uploads
+    Chunks are appended to a partial file; once complete the file becomes a
+    Document or UserDocument
+    """
+    class Target(models.TextChoices):
+        DOCUMENT = 'DOCUMENT', _('Document de demande')
+        USER_DOCUMENT = 'USER_DOCUMENT', _('Document utilisateur')
+
+    class Status(models.TextChoices):
+        UPLOADING = 'UPLOADING', _('En cours')
+        COMPLETE = 'COMPLETE', _('Terminé')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='chunked_uploads',
+        verbose_name=_('Utilisateur')
+    )
+    target = models.CharField(max_length=20, choices=Target.choices, verbose_name=_('Destination'))
+    filename = models.CharField(max_length=255, verbose_name=_('Nom du fichier'))
+    upload_length = models.BigIntegerField(verbose_name=_('Taille totale (octets)'))
+    offset = models.BigIntegerField(default=0, verbose_name=_('Octets reçus'))
+    metadata = models.JSONField(default=dict, blank=True, verbose_name=_('Métadonnées'))
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.UPLOADING,
+        verbose_name=_('Statut')
+    )
+    # Id of the Document/UserDocument created on completion
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    # Set while a request is receiving a chunk; stale after core.uploads.CHUNK_LEASE
+    receiving_since = models.DateTimeField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Téléversement fractionné')
+        verbose_name_plural = _('Téléversements fractionnés')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.upload_length})"
+
+
+class SearchEntry(models.Model):
+    """
+    Denormalized full-text search document of an Application or Appointment
+    Kept up to date by core.search; ``document`` is indexed with a GIN
+    tsvector index on PostgreSQL and an FTS5 table on SQLite (migration 0006)
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    # Owner of the indexed object, so citizens only search their own records
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='+',
+        verbose_name=_('Propriétaire')
+    )
+    document = models.TextField(verbose_name=_('Texte indexé'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Entrée de recherche')
+        verbose_name_plural = _('Entrées de recherche')
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'object_id'], name='core_searchentry_object_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['content_type', 'owner']),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type.model} #{self.object_id}"
+
+
+class Sequence(models.Model):
+    """
+    Named database counter handing out blocks of consecutive values
+    (core.sequences), e.g. consular card numbers
+    """
+    name = models.CharField(max_length=50, unique=True, verbose_name=_('Nom'))
+    # First value not yet handed out
+    next_value = models.BigIntegerField(verbose_name=_('Prochaine valeur'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Séquence')
+        verbose_name_plural = _('Séquences')
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+class OutboxMessage(models.Model):
+    """
+    Side effect saved in the transaction that caused it and carried out
+    afterwards by a worker (core.outbox), e.g. the registration emails
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', _('En attente')
+        FAILED = 'FAILED', _('Échec')
+
+    # Dotted path of the function called with ``payload`` as keyword arguments
+    handler = models.CharField(max_length=200, verbose_name=_('Traitement'))
+    payload = models.JSONField(default=dict, blank=True, verbose_name=_('Données'))
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name=_('Statut')
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name=_('Tentatives'))
+    last_error = models.TextField(blank=True, verbose_name=_('Dernière erreur'))
+    # Not retried before this time (backoff after a failure)
+    available_at = models.DateTimeField(default=timezone.now, verbose_name=_('Disponible à partir de'))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Message sortant')
+        verbose_name_plural = _('Messages sortants')
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.handler} #{self.pk} ({self.get_status_display()})"
+
+
+class Tombstone(models.Model):
+    """
+    Trace of a deleted Appointment, Application, Payment or Notification,
+    so the delta sync API (core.sync) can report the deletion to its owner
+    Purged after SYNC_TOMBSTONE_DAYS
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    # No database constraint: deleting a user first deletes (and records) their rows
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name=_('Propriétaire')
+    )
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name=_('Supprimé le'))
+
+    class Meta:
+        verbose_name = _('Suppression synchronisée')
+        verbose_name_plural = _('Suppressions synchronisées')
+        indexes = [
+            models.Index(fields=['owner', 'deleted_at']),
+            models.Index(fields=['deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type.model} #{self.object_id}"
@@ -0,0 +1,83 @@
+"""
+Transactional outbox
+
+A request that must trigger slow side effects (emails, notifications to
+many recipients) records them as OutboxMessage rows in its own transaction
+and returns. Once the transaction commits, one django-q task per message
+calls its handler; a message is thus never lost when the request fails
+after the insert, and never sent for a rolled back change.
+
+Delivered messages are deleted. A failing handler is retried with an
+exponential backoff by ``process_outbox`` (manage.py process_outbox, to be
+run every few minutes), which also picks up messages whose task was lost;
+after OUTBOX_MAX_ATTEMPTS attempts the message is kept as FAILED.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxMessage
+
+logger = logging.getLogger('embassy')
+
+
+def enqueue(handler, **payload):
+    """Record a call of ``handler`` (dotted path) to run after the current transaction commits"""
+    message = OutboxMessage.objects.create(handler=handler, payload=payload)
+
+    def queue_delivery():
+        from django_q.tasks import async_task
+        async_task('core.outbox.deliver', message.pk)
+
+    transaction.on_commit(queue_delivery)
+    return message
+
+
+def _retry_delay(attempts):
+    return timedelta(minutes=2 ** min(attempts, 10))
+
+
+def deliver(message_id):
+    """Run one pending message (django-q task); returns True once delivered"""
+    with transaction.atomic():
+        message = OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+            pk=message_id, status=OutboxMessage.Status.PENDING
+        ).first()
+        if message is None:
+            # Already delivered, given up, or being delivered by another worker
+            return False
+
+        try:
+            # Savepoint: a failing handler leaves no partial rows behind
+            with transaction.atomic():
+                import_string(message.handler)(**message.payload)
+        except Exception as e:
+            message.attempts += 1
+            message.last_error = f"{type(e).__name__}: {e}"
+            if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                message.status = OutboxMessage.Status.FAILED
+            message.available_at = timezone.now() + _retry_delay(message.attempts)
+            message.save(update_fields=['attempts', 'last_error', 'status', 'available_at'])
+            logger.error(f"Message sortant {message} en échec (tentative {message.attempts}): {e}")
+            return False
+
+        message.delete()
+    return True
+
+
+def process_outbox(limit=500):
+    """Deliver the pending messages that are due; returns ``(delivered, not_delivered)``"""
+    due = OutboxMessage.objects.filter(
+        status=OutboxMessage.Status.PENDING, available_at__lte=timezone.now()
+    ).values_list('pk', flat=True)[:limit]
+    delivered = not_delivered = 0
+    for message_id in list(due):
+        if deliver(message_id):
+            delivered += 1
+        else:
+            not_delivered += 1
+    return delivered, not_delivered
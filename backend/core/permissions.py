@@ -4,12 +4,22 @@ Role-Based Access Control (RBAC)
 """
 from rest_framework import permissions
 
+from .authentication import ROLE_CLAIM
+
+
+def request_role(request):
+    """Role of the authenticated user, from the JWT claim when the token has one"""
+    token = request.auth
+    if token is not None and hasattr(token, 'get') and token.get(ROLE_CLAIM):
+        return token[ROLE_CLAIM]
+    return request.user.role
+
 
 class IsCitizen(permissions.BasePermission):
     """Permission for citizen users"""
     
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.role == 'CITIZEN'
+        return request.user and request.user.is_authenticated and request_role(request) == 'CITIZEN'
 
 
 class IsAgent(permissions.BasePermission):
@@ -18,7 +28,7 @@ class IsAgent(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
-        return request.user.role in ['AGENT_RDV', 'AGENT_CONSULAIRE', 'ADMIN', 'SUPERADMIN']
+        return request_role(request) in ['AGENT_RDV', 'AGENT_CONSULAIRE', 'ADMIN', 'SUPERADMIN']
 
 
 class IsAgentRDV(permissions.BasePermission):
@@ -27,7 +37,7 @@ class IsAgentRDV(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
-        return request.user.role in ['AGENT_RDV', 'ADMIN', 'SUPERADMIN']
+        return request_role(request) in ['AGENT_RDV', 'ADMIN', 'SUPERADMIN']
 
 
 class IsAgentConsulaire(permissions.BasePermission):
@@ -36,7 +46,7 @@ class IsAgentConsulaire(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
-        return request.user.role in ['AGENT_CONSULAIRE', 'ADMIN', 'SUPERADMIN']
+        return request_role(request) in ['AGENT_CONSULAIRE', 'ADMIN', 'SUPERADMIN']
 
 
 class IsVigile(permissions.BasePermission):
@@ -45,7 +55,7 @@ class IsVigile(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
-        return request.user.role in ['VIGILE', 'ADMIN', 'SUPERADMIN']
+        return request_role(request) in ['VIGILE', 'ADMIN', 'SUPERADMIN']
 
 
 class IsAdmin(permissions.BasePermission):
@@ -54,14 +64,14 @@ class IsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
-        return request.user.role in ['ADMIN', 'SUPERADMIN']
+        return request_role(request) in ['ADMIN', 'SUPERADMIN']
 
 
 class IsSuperAdmin(permissions.BasePermission):
     """Permission for super admin only"""
     
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.role == 'SUPERADMIN'
+        return request.user and request.user.is_authenticated and request_role(request) == 'SUPERADMIN'
 
 
 class IsOwnerOrAgent(permissions.BasePermission):
@@ -72,7 +82,7 @@ class IsOwnerOrAgent(permissions.BasePermission):
     
     def has_object_permission(self, request, view, obj):
         # Agents can access all objects
-        if request.user.role in ['ADMIN', 'SUPERADMIN', 'AGENT_CONSULAIRE']:
+        if request_role(request) in ['ADMIN', 'SUPERADMIN', 'AGENT_CONSULAIRE']:
             return True
         
         # Citizens can only access their own objects
@@ -0,0 +1,75 @@
+"""
+Fast JSON renderer and parser for the API
+
+Both are drop-in replacements for DRF's JSONRenderer / JSONParser backed by
+orjson, which encodes the large payloads (user lists with their profiles,
+audit logs, the day's roster) several times faster than the standard
+library. ``date``, ``datetime``, ``time`` and UUID values are encoded
+natively; everything else orjson does not know (Decimal, lazy translations,
+querysets...) goes through DRF's own JSONEncoder, so the output matches
+DRF's: datetimes in UTC end with ``Z``, Decimals become numbers.
+
+When orjson is not installed, or for what it cannot handle (an indented
+rendering, integers over 64 bits, a non UTF-8 body), both fall back to the
+DRF implementation. ``manage.py benchmark_json`` compares the two.
+"""
+import io
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_ORJSON_OPTIONS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+# Same escaping as DRF: these are valid JSON but end lines in JavaScript
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+_drf_encoder = JSONEncoder()
+
+
+def dumps(data):
+    """Encode ``data`` to compact UTF-8 JSON bytes, like the API responses"""
+    if orjson is not None:
+        try:
+            ret = orjson.dumps(data, default=_drf_encoder.default, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # orjson.JSONEncodeError, e.g. an integer over 64 bits
+            pass
+        else:
+            for separator, escaped in _LINE_SEPARATORS:
+                if separator in ret:
+                    ret = ret.replace(separator, escaped)
+            return ret
+    return JSONRenderer().render(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer encoding with orjson"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser decoding with orjson"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # Let DRF report the error (or parse what orjson refuses, like big integers)
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,206 @@
+"""
+Full-text search over applications and appointments
+
+Each Application and Appointment has one SearchEntry holding a denormalized
+text: reference number, applicant name and email, office, service and, for
+visas, the destination. The text is normalized (lower case, accents and
+punctuation removed) before it is stored, so every backend sees plain words.
+
+The column is indexed by migration core.0006: a GIN ``tsvector`` expression
+index on PostgreSQL, an FTS5 table (with 2 and 3 letter prefix indexes) kept
+in sync by triggers on SQLite. Every query word is matched as a prefix, so
+``dup 8a19`` finds ``Dupont``'s ``APP-8A19A3B9``. Entries are refreshed when their object (or the related
+visa details / user) is saved, see the signals of each app, and can be
+rebuilt with ``manage.py rebuild_search_index``.
+"""
+import re
+import unicodedata
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .models import SearchEntry
+
+MAX_QUERY_TERMS = 8
+TOKEN_RE = re.compile(r'[0-9a-z]+')
+
+
+def normalize(text):
+    """Lower case, accent-free words separated by single spaces"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(TOKEN_RE.findall(text.lower()))
+
+
+def _document(*parts):
+    return normalize(' '.join(str(part) for part in parts if part))
+
+
+def _reference_terms(reference):
+    # "APP-8A19A3B9" is also indexed as "app8a19a3b9" for searches typed without the dash
+    return [reference, re.sub(r'[^0-9A-Za-z]', '', reference or '')]
+
+
+def application_document(application):
+    visa = getattr(application, 'visa_details', None)
+    return _document(
+        *_reference_terms(application.reference_number),
+        application.applicant.get_full_name(),
+        application.applicant.email,
+        application.office.name,
+        application.office.city,
+        application.service_type.name,
+        application.get_application_type_display(),
+        visa.destination_city if visa else '',
+    )
+
+
+def appointment_document(appointment):
+    return _document(
+        *_reference_terms(appointment.reference_number),
+        appointment.user.get_full_name(),
+        appointment.user.email,
+        appointment.office.name,
+        appointment.office.city,
+        appointment.service_type.name,
+    )
+
+
+# model label -> (related objects to load, owner attribute, text builder)
+SEARCH_SOURCES = {
+    'applications.Application': (
+        ('applicant', 'office', 'service_type', 'visa_details'), 'applicant_id', application_document
+    ),
+    'appointments.Appointment': (
+        ('user', 'office', 'service_type'), 'user_id', appointment_document
+    ),
+}
+
+
+def reindex(model, pks=None, batch_size=500):
+    """
+    Rebuild the entries of ``model`` objects (all of them when ``pks`` is
+    None); returns the number of objects indexed
+    """
+    related, owner_attr, build = SEARCH_SOURCES[model._meta.label]
+    content_type = ContentType.objects.get_for_model(model)
+    queryset = model.objects.select_related(*related).order_by('pk')
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+
+    count = 0
+    batch = []
+    for instance in queryset.iterator(chunk_size=batch_size):
+        batch.append(instance)
+        if len(batch) >= batch_size:
+            count += _write_entries(content_type, batch, owner_attr, build)
+            batch = []
+    if batch:
+        count += _write_entries(content_type, batch, owner_attr, build)
+    return count
+
+
+def _write_entries(content_type, instances, owner_attr, build):
+    existing = dict(
+        SearchEntry.objects.filter(
+            content_type=content_type, object_id__in=[instance.pk for instance in instances]
+        ).values_list('object_id', 'id')
+    )
+    created, updated = [], []
+    for instance in instances:
+        entry = SearchEntry(
+            id=existing.get(instance.pk),
+            content_type=content_type,
+            object_id=instance.pk,
+            owner_id=getattr(instance, owner_attr),
+            document=build(instance),
+        )
+        (updated if entry.id else created).append(entry)
+    with transaction.atomic():
+        # A concurrent refresh may have created the entry first; it holds the same text
+        SearchEntry.objects.bulk_create(created, ignore_conflicts=True)
+        SearchEntry.objects.bulk_update(updated, ['owner', 'document'])
+    return len(instances)
+
+
+def schedule_reindex(model, pk):
+    """Refresh one object's entry once the current transaction commits"""
+    transaction.on_commit(lambda: reindex(model, [pk]))
+
+
+def reindex_owner(user_id):
+    """Refresh every entry of a user's records, e.g. after a name or email change"""
+    for label, (related, owner_attr, build) in SEARCH_SOURCES.items():
+        model = apps.get_model(label)
+        reindex(model, model.objects.filter(**{owner_attr: user_id}).values('pk'))
+
+
+def remove_from_index(model, pks):
+    SearchEntry.objects.filter(
+        content_type=ContentType.objects.get_for_model(model), object_id__in=pks
+    ).delete()
+
+
+def _indexed_object_ids(content_type, terms, limit):
+    """Most recent matching object ids, through the backend's full-text index"""
+    vendor = connection.vendor
+    limit_clause = ' LIMIT %s' if limit else ''
+    if vendor == 'postgresql':
+        # Same expression as the GIN index so PostgreSQL can use it
+        sql = (
+            "SELECT object_id FROM core_searchentry WHERE content_type_id = %s "
+            "AND to_tsvector('simple', document) @@ to_tsquery('simple', %s) ORDER BY id DESC"
+        )
+        params = [content_type.pk, ' & '.join(f"{term}:*" for term in terms)]
+    elif vendor == 'sqlite':
+        # FTS5 walks its matches by descending rowid, so LIMIT stops the scan early
+        sql = (
+            "SELECT e.object_id FROM core_searchentry_fts f JOIN core_searchentry e ON e.id = f.rowid "
+            "WHERE core_searchentry_fts MATCH %s AND e.content_type_id = %s ORDER BY f.rowid DESC"
+        )
+        params = [' '.join(f'"{term}"*' for term in terms), content_type.pk]
+    else:
+        return None
+    return RawSQL(sql + limit_clause, params + ([limit] if limit else []))
+
+
+def _scanned_entries(entries, terms):
+    for term in terms:
+        entries = entries.filter(document__regex=rf'(^| ){term}')
+    return entries
+
+
+def search_objects(queryset, query, owner=None, limit=None):
+    """
+    Restrict ``queryset`` to the objects whose entry matches every word of
+    ``query`` as a prefix; ``limit`` keeps only the most recent matches
+
+    With ``owner``, only that user's entries are searched: they are few, so
+    they are read through the (content type, owner) index and scanned rather
+    than going through the full-text index, where a common word ("dakar")
+    would match every record.
+    """
+    terms = normalize(query).split()[:MAX_QUERY_TERMS]
+    if not terms:
+        return queryset.none()
+
+    content_type = ContentType.objects.get_for_model(queryset.model)
+    object_ids = None if owner is not None else _indexed_object_ids(content_type, terms, limit)
+    if object_ids is None:
+        entries = SearchEntry.objects.filter(content_type=content_type)
+        if owner is not None:
+            entries = entries.filter(owner=owner)
+        object_ids = _scanned_entries(entries, terms).order_by('-id').values('object_id')
+        if limit:
+            object_ids = object_ids[:limit]
+    return queryset.filter(pk__in=object_ids)
+
+
+def purge_stale_entries(model):
+    """Delete entries whose object no longer exists; returns the count"""
+    deleted, _ = SearchEntry.objects.filter(
+        content_type=ContentType.objects.get_for_model(model)
+    ).exclude(object_id__in=model.objects.values('pk')).delete()
+    return deleted
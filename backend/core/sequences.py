@@ -0,0 +1,57 @@
+"""
+Block (hi/lo) allocation of numbers from named database sequences
+
+``allocate_block`` reserves ``size`` consecutive values of a sequence with a
+single ``UPDATE ... RETURNING``: concurrent callers get disjoint blocks
+without locking anything beyond that row or probing for free values.
+Callers may keep a block in memory and hand its values out one by one
+(hi/lo); values of a block that is never used up are skipped, not reused.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import Sequence
+
+
+def _increment_returning(name, size):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE core_sequence SET next_value = next_value + %s, updated_at = %s "
+            "WHERE name = %s RETURNING next_value",
+            [size, timezone.now(), name],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _increment_locked(name, size):
+    with transaction.atomic():
+        sequence = Sequence.objects.select_for_update().filter(name=name).first()
+        if sequence is None:
+            return None
+        sequence.next_value += size
+        sequence.save(update_fields=['next_value', 'updated_at'])
+    return sequence.next_value
+
+
+def allocate_block(name, size, start=1):
+    """
+    Reserve ``size`` consecutive values of sequence ``name`` (created at
+    ``start`` on first use) and return them as a ``range``
+    """
+    # UPDATE ... RETURNING: PostgreSQL, and SQLite from 3.35 (same feature flag)
+    returning = connection.vendor == 'postgresql' or (
+        connection.vendor == 'sqlite' and connection.features.can_return_rows_from_bulk_insert
+    )
+    increment = _increment_returning if returning else _increment_locked
+
+    end = increment(name, size)
+    if end is None:
+        try:
+            with transaction.atomic():
+                Sequence.objects.create(name=name, next_value=start)
+        except IntegrityError:
+            pass  # Created concurrently
+        end = increment(name, size)
+    return range(end - size, end)
+
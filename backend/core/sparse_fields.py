@@ -0,0 +1,162 @@
+"""
+Sparse fieldsets for the API: ``?fields=`` and ``?expand=``
+
+``?fields=id,status,office_name`` keeps only the listed fields of a
+response (unknown names are ignored) and ``?expand=office`` replaces the
+primary key of a relation by the nested object, for the relations listed
+in the serializer's ``EXPANDABLE_FIELDS``. Without parameters the output is
+unchanged. Both only apply to reads (GET, HEAD, OPTIONS) of the top level
+serializer: writes keep every field.
+
+The queryset follows the fields that are kept (``SparseFieldsViewMixin``):
+relations they traverse are loaded with ``select_related`` (or
+``prefetch_related`` for lists), computed values with the serializer's
+``QUERY_ANNOTATIONS`` instead of one query per object, and, when
+``?fields=`` is given, ``only()`` restricts the columns read. The columns of
+a field are derived from its ``source``; method fields and properties name
+theirs in ``FIELD_COLUMNS``, otherwise the whole row is read.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _param_names(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+
+def _all_columns(model, prefix=''):
+    return {prefix + field.name for field in model._meta.concrete_fields}
+
+
+class QueryPlan:
+    """Relations, columns and annotations needed by a set of serializer fields"""
+
+    def __init__(self):
+        self.select_related = set()
+        self.prefetch_related = set()
+        self.columns = set()
+        self.annotations = {}
+
+    def add_path(self, model, parts, prefix='', nested=False):
+        """
+        Record what reading ``parts`` (a field source split on dots) from
+        ``model`` needs; ``nested`` when the last relation is serialized as
+        an object rather than a primary key
+        """
+        name = parts[0]
+        if name.startswith('get_') and name.endswith('_display'):
+            name = name[len('get_'):-len('_display')]
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Method or property: its inputs are unknown, read the whole row
+            self.columns |= _all_columns(model, prefix)
+            return
+
+        path = prefix + field.name
+        if not field.is_relation:
+            self.columns.add(path)
+        elif field.one_to_many or field.many_to_many:
+            if not prefix:
+                self.prefetch_related.add(path)
+        elif len(parts) > 1 or nested:
+            self.select_related.add(path)
+            if field.concrete:
+                self.columns.add(path)
+            if len(parts) > 1:
+                self.add_path(field.related_model, parts[1:], f'{path}__')
+            else:
+                self.columns |= _all_columns(field.related_model, f'{path}__')
+        elif field.concrete:
+            self.columns.add(path)
+
+    def apply(self, queryset, restrict_columns):
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(self.prefetch_related))
+        if self.annotations:
+            queryset = queryset.annotate(**{name: build() for name, build in self.annotations.items()})
+        if restrict_columns:
+            queryset = queryset.only(*sorted(self.columns | {'pk'}))
+        return queryset
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin honouring ``?fields=`` and ``?expand=``
+
+    EXPANDABLE_FIELDS maps a relation field to the serializer class (and
+    its keyword arguments) used when it is expanded, QUERY_ANNOTATIONS a
+    field to a callable building the annotation it reads, FIELD_COLUMNS a
+    method field to the columns (``__`` paths) it reads.
+    """
+    EXPANDABLE_FIELDS = {}
+    QUERY_ANNOTATIONS = {}
+    FIELD_COLUMNS = {}
+
+    def _is_sparse_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS or not self._is_sparse_root():
+            return fields
+
+        for name in (_param_names(request, EXPAND_PARAM) or set()) & set(self.EXPANDABLE_FIELDS):
+            if name in fields:
+                serializer_class, kwargs = self.EXPANDABLE_FIELDS[name]
+                fields[name] = serializer_class(read_only=True, **kwargs)
+
+        wanted = _param_names(request, FIELDS_PARAM)
+        if wanted:
+            fields = {name: field for name, field in fields.items() if name in wanted}
+        return fields
+
+    @classmethod
+    def setup_sparse_queryset(cls, queryset, context):
+        """Prepare ``queryset`` for the fields this request will emit"""
+        serializer = cls(context=context)
+        model = cls.Meta.model
+        plan = QueryPlan()
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in cls.QUERY_ANNOTATIONS:
+                plan.annotations[name] = cls.QUERY_ANNOTATIONS[name]
+            elif name in cls.FIELD_COLUMNS:
+                for column in cls.FIELD_COLUMNS[name]:
+                    plan.add_path(model, column.split('__'))
+            elif field.source == '*':
+                plan.columns |= _all_columns(model)
+            else:
+                plan.add_path(model, field.source.split('.'), nested=isinstance(field, serializers.BaseSerializer))
+
+        request = context.get('request')
+        return plan.apply(queryset, bool(request and _param_names(request, FIELDS_PARAM)))
+
+
+class SparseFieldsViewMixin:
+    """
+    ViewSet mixin preparing the queryset of ``list`` and ``retrieve`` for
+    the fields requested, when the serializer uses SparseFieldsMixin
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if self.action in self.sparse_actions and issubclass(serializer_class, SparseFieldsMixin):
+            queryset = serializer_class.setup_sparse_queryset(queryset, self.get_serializer_context())
+        return queryset
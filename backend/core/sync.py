@@ -0,0 +1,202 @@
+"""
+Delta sync of a user's appointments, applications, payments and notifications
+
+``GET /api/core/changes/`` lists the ids of every row the user owns, as
+created; ``GET /api/core/changes/?since=<token>`` lists only the ids
+created, updated or deleted since the call that returned ``token``. Rows
+are read through their ``(owner, updated_at)`` index, deletions from the
+Tombstone table filled by a post_delete receiver (connected in
+CoreConfig.ready). Clients fetch the changed rows themselves, e.g. with one
+batch call, so unchanged rows are never serialized again.
+
+The token is signed and holds, per source, the ``(updated_at, id)`` of the
+last row returned: a sync larger than SYNC_MAX_CHANGES rows per source is
+continued by calling again while ``has_more`` is true. Once caught up the
+cursor is set a few seconds in the past, since a row saved just before the
+sync may commit after it: the same id can then be reported twice, clients
+apply changes idempotently. Tombstones are purged after
+SYNC_TOMBSTONE_DAYS (manage.py purge_tombstones); tokens issued before are
+refused and the client starts over with a full sync. Rows moved elsewhere
+rather than deleted (appointment archival) are deleted inside
+``suppress_tombstones()``: they still exist for the user, so no tombstone is
+written.
+
+``update()`` does not touch ``auto_now`` fields: code updating these models
+in bulk sets ``updated_at`` itself (see core.transitions).
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core import signing
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Tombstone
+
+# source -> (model label, owner field, filters of the rows the user sees)
+SYNC_SOURCES = {
+    'appointments': ('appointments.Appointment', 'user', {}),
+    'applications': ('applications.Application', 'applicant', {}),
+    'payments': ('payments.Payment', 'user', {}),
+    'notifications': ('notifications.Notification', 'recipient', {'channel': 'IN_APP'}),
+}
+DELETED_CURSOR = 'deleted'
+TOKEN_SALT = 'core.sync'
+# Rows saved just before a sync may commit after it: read this window again
+SAFETY_MARGIN = timedelta(seconds=5)
+
+_state = threading.local()
+
+
+class SyncTokenError(Exception):
+    """The ``since`` token cannot be used"""
+    status_code = 400
+
+
+class ExpiredSyncToken(SyncTokenError):
+    """Deletions older than the tombstone retention are lost: a full sync is needed"""
+    status_code = 410
+
+
+def _source_of(model):
+    for name, (label, owner_field, filters) in SYNC_SOURCES.items():
+        if model._meta.label == label:
+            return name, owner_field, filters
+    return None
+
+
+@contextmanager
+def suppress_tombstones():
+    """Deletions in this block, on this thread, write no Tombstone"""
+    previous = getattr(_state, 'suppressed', False)
+    _state.suppressed = True
+    try:
+        yield
+    finally:
+        _state.suppressed = previous
+
+
+def record_deletion(sender, instance, **kwargs):
+    """post_delete receiver writing the Tombstone of a synced row"""
+    if getattr(_state, 'suppressed', False):
+        return
+    source = _source_of(sender)
+    if source is None:
+        return
+    name, owner_field, filters = source
+    if all(getattr(instance, field) == value for field, value in filters.items()):
+        Tombstone.objects.create(
+            content_type=ContentType.objects.get_for_model(sender),
+            object_id=instance.pk,
+            owner_id=getattr(instance, f'{owner_field}_id'),
+        )
+
+
+def connect_tombstones():
+    for label, owner_field, filters in SYNC_SOURCES.values():
+        post_delete.connect(record_deletion, sender=apps.get_model(label), dispatch_uid=f'sync_tombstone_{label}')
+
+
+def make_token(user, cursors):
+    return signing.dumps(
+        {'u': user.pk, 'c': {name: [moment.isoformat(), pk] for name, (moment, pk) in cursors.items()}},
+        salt=TOKEN_SALT,
+    )
+
+
+def read_token(token, user):
+    """Cursors of a token issued to ``user``; raises SyncTokenError"""
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=timedelta(days=settings.SYNC_TOMBSTONE_DAYS))
+        if data['u'] != user.pk:
+            raise ValueError
+        cursors = {name: (parse_datetime(moment), pk) for name, (moment, pk) in data['c'].items()}
+        if any(moment is None for moment, pk in cursors.values()):
+            raise ValueError
+    except signing.SignatureExpired:
+        raise ExpiredSyncToken("Jeton de synchronisation expiré : une synchronisation complète est nécessaire.")
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise SyncTokenError("Jeton de synchronisation invalide.")
+    return cursors
+
+
+def _after(cursor, date_field):
+    """Rows after ``cursor`` in (date, id) order"""
+    moment, pk = cursor
+    return Q(**{f'{date_field}__gt': moment}) | Q(**{date_field: moment, 'pk__gt': pk})
+
+
+def _page(rows, limit):
+    rows = list(rows[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def _next_cursor(rows, more, cursor, caught_up):
+    if more:
+        return rows[-1]
+    return max(cursor, caught_up) if cursor else caught_up
+
+
+def changes_since(user, token=None, limit=None):
+    """
+    Ids created, updated and deleted since ``token`` (every id when None),
+    with the token of the next call; raises SyncTokenError
+    """
+    limit = limit or settings.SYNC_MAX_CHANGES
+    cursors = read_token(token, user) if token else {}
+    caught_up = (timezone.now() - SAFETY_MARGIN, 0)
+    changes = {}
+    next_cursors = {}
+    has_more = False
+
+    for name, (label, owner_field, filters) in SYNC_SOURCES.items():
+        cursor = cursors.get(name)
+        rows = apps.get_model(label).objects.filter(**{owner_field: user}, **filters)
+        if cursor:
+            rows = rows.filter(_after(cursor, 'updated_at'))
+        rows, more = _page(rows.order_by('updated_at', 'pk').values_list('pk', 'created_at', 'updated_at'), limit)
+
+        created = [pk for pk, created_at, updated_at in rows if not cursor or created_at > cursor[0]]
+        created_set = set(created)
+        changes[name] = {
+            'created': created,
+            'updated': [pk for pk, created_at, updated_at in rows if pk not in created_set],
+            'deleted': [],
+        }
+        positions = [(updated_at, pk) for pk, created_at, updated_at in rows]
+        next_cursors[name] = _next_cursor(positions, more, cursor, caught_up)
+        has_more = has_more or more
+
+    cursor = cursors.get(DELETED_CURSOR)
+    if cursor:
+        # A first sync has no cached rows to remove
+        sources = {
+            ContentType.objects.get_for_model(apps.get_model(label)).pk: name
+            for name, (label, owner_field, filters) in SYNC_SOURCES.items()
+        }
+        tombstones = Tombstone.objects.filter(_after(cursor, 'deleted_at'), owner=user, content_type__in=sources)
+        tombstones, more = _page(
+            tombstones.order_by('deleted_at', 'pk').values_list('pk', 'content_type_id', 'object_id', 'deleted_at'),
+            limit,
+        )
+        for pk, content_type_id, object_id, deleted_at in tombstones:
+            changes[sources[content_type_id]]['deleted'].append(object_id)
+        positions = [(deleted_at, pk) for pk, content_type_id, object_id, deleted_at in tombstones]
+        cursor = _next_cursor(positions, more, cursor, caught_up)
+        has_more = has_more or more
+    next_cursors[DELETED_CURSOR] = cursor or caught_up
+
+    return {'changes': changes, 'has_more': has_more, 'next': make_token(user, next_cursors)}
+
+
+def purge_tombstones(days=None):
+    """Delete the tombstones older than the retention; returns the count"""
+    horizon = timezone.now() - timedelta(days=days or settings.SYNC_TOMBSTONE_DAYS)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=horizon).delete()
+    return deleted
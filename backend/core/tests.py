@@ -96,3 +96,410 @@ class FAQModelTest(TestCase):
         self.assertIn("VISA", str(self.faq))
         self.assertIn("How long", str(self.faq))
 
+
+
+class PDFRenderServiceTest(TestCase):
+    """Test the out-of-process PDF rendering service"""
+
+    context = {
+        'receipt_number': 'RCP-TEST',
+        'transaction_id': 'TXN-TEST',
+        'completed_at': '01/01/2026 10:00',
+        'application_reference': 'APP-TEST',
+        'beneficiary': 'Test User',
+        'payment_method': 'Stripe',
+        'amount': '50000 XOF',
+    }
+
+    def test_render_in_pool(self):
+        """Test a receipt is rendered by a worker process"""
+        import os
+        from core.utils.pdf_service import PDFRenderService
+
+        service = PDFRenderService(workers=1, max_queue=4, timeout=30)
+        try:
+            pdf = service.render('receipt', self.context)
+        finally:
+            service.shutdown()
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        stats = service.stats()
+        self.assertEqual(stats['completed'], 1)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual((stats['scope'], stats['pid']), ('process', os.getpid()))
+
+    def test_full_queue_is_refused(self):
+        """Test renders beyond the queue limit are refused with a 503"""
+        from core.utils.pdf_service import PDFRenderService, PDFRenderUnavailable
+
+        service = PDFRenderService(workers=1, max_queue=0, timeout=30)
+        with self.assertRaises(PDFRenderUnavailable) as ctx:
+            service.render('receipt', self.context)
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(service.stats()['rejected'], 1)
+
+    def test_slow_render_times_out(self):
+        """Test the request stops waiting after the timeout"""
+        from core.utils.pdf_service import PDFRenderService, PDFRenderUnavailable
+
+        service = PDFRenderService(workers=1, max_queue=4, timeout=0.001)
+        try:
+            with self.assertRaises(PDFRenderUnavailable):
+                service.render('receipt', self.context)
+        finally:
+            service.shutdown()
+        self.assertEqual(service.stats()['timeouts'], 1)
+
+    def test_render_many_respects_queue_limit(self):
+        """Test a batch is submitted in chunks that fit in the queue"""
+        from core.utils.pdf_service import PDFRenderService
+
+        service = PDFRenderService(workers=2, max_queue=2, timeout=30)
+        try:
+            pdfs = service.render_many('receipt', [self.context] * 5)
+        finally:
+            service.shutdown()
+        self.assertEqual(len(pdfs), 5)
+        self.assertTrue(all(pdf.startswith(b'%PDF') for pdf in pdfs))
+        stats = service.stats()
+        self.assertEqual((stats['submitted'], stats['completed']), (5, 5))
+        self.assertLessEqual(stats['peak_in_flight'], 2)
+
+    def test_render_many_timeout_is_counted(self):
+        """Test a slow batch raises PDFRenderUnavailable like a single render"""
+        from core.utils.pdf_service import PDFRenderService, PDFRenderUnavailable
+
+        service = PDFRenderService(workers=1, max_queue=4, timeout=0.001)
+        try:
+            with self.assertRaises(PDFRenderUnavailable):
+                service.render_many('receipt', [self.context] * 3)
+        finally:
+            service.shutdown()
+        self.assertEqual(service.stats()['timeouts'], 1)
+
+
+class ContentCachePurgeTest(TestCase):
+    """Test the disk tier of the content cache is bounded"""
+
+    def test_purge_by_age_and_size(self):
+        """Test stale files go first, then the least recently used until under the size limit"""
+        import os
+        import tempfile
+        import time
+        from django.test import override_settings
+        from core.utils.content_cache import ContentCache, content_hash, purge_content_cache
+
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CONTENT_CACHE_DIR=cache_dir):
+            cache = ContentCache('pdfs', max_items=0)
+            keys = [content_hash(f'reçu {i}') for i in range(4)]
+            for age, key in zip((40, 3, 2, 1), keys):
+                cache.set(key, b'x' * 100)
+                moment = time.time() - age * 86400
+                os.utime(cache._path(key), (moment, moment))
+            # A disk hit marks the entry as used
+            self.assertEqual(cache.get(keys[1]), b'x' * 100)
+
+            self.assertEqual(purge_content_cache(max_age_days=30, max_bytes=250), 2)
+            self.assertEqual([cache.get(key) is not None for key in keys], [False, True, False, True])
+
+
+class ChunkedUploadTest(TestCase):
+    """Test resumable chunked uploads"""
+
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        from rest_framework.test import APIClient
+
+        self.user = User.objects.create_user(
+            username="uploader",
+            email="uploader@example.com",
+            password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.tmp.name,
+            CHUNKED_UPLOAD_DIR=f"{self.tmp.name}/partial",
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tmp.cleanup()
+
+    def create_upload(self, length, filename='passeport.pdf'):
+        import base64
+
+        def encode(value):
+            return base64.b64encode(value.encode()).decode()
+
+        metadata = f"filename {encode(filename)},target {encode('DOCUMENT')},document_type {encode('PASSPORT')}"
+        return self.client.post('/api/core/uploads/', HTTP_UPLOAD_LENGTH=str(length), HTTP_UPLOAD_METADATA=metadata)
+
+    def send(self, upload_id, offset, data):
+        return self.client.patch(
+            f'/api/core/uploads/{upload_id}/', data, content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def test_resumable_upload_creates_document(self):
+        """Test a file sent in chunks, with a resume, becomes a Document"""
+        from applications.models import Document
+
+        content = b'%PDF-1.4\n' + b'x' * 1000
+        response = self.create_upload(len(content))
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.data['id']
+        self.assertTrue(response['Location'].endswith(f'/api/core/uploads/{upload_id}/'))
+
+        self.assertEqual(self.send(upload_id, 0, content[:400]).status_code, 204)
+
+        # Client lost track: ask where to resume, a stale offset is refused
+        self.assertEqual(self.client.head(f'/api/core/uploads/{upload_id}/')['Upload-Offset'], '400')
+        self.assertEqual(self.send(upload_id, 0, content[:400]).status_code, 409)
+
+        response = self.send(upload_id, 400, content[400:])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'COMPLETE')
+
+        document = Document.objects.get(pk=response.data['document_id'])
+        self.assertEqual(document.owner, self.user)
+        self.assertEqual(document.file_size, len(content))
+        with document.file.open('rb') as stored:
+            self.assertEqual(stored.read(), content)
+
+    def test_upload_is_validated_incrementally(self):
+        """Test size, extension and magic bytes are checked before the whole file is sent"""
+        self.assertEqual(self.create_upload(100, filename='script.exe').status_code, 400)
+        self.assertEqual(self.create_upload(10 * 1024 * 1024 + 1).status_code, 400)
+
+        upload_id = self.create_upload(1000).data['id']
+        response = self.send(upload_id, 0, b'MZ' + b'\x00' * 100)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(f'/api/core/uploads/{upload_id}/').data['offset'], 0)
+
+    def test_concurrent_chunk_is_refused(self):
+        """Test a chunk is refused while another request receives one, unless its claim is stale"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import ChunkedUpload
+
+        content = b'%PDF-1.4\n' + b'x' * 100
+        upload_id = self.create_upload(len(content)).data['id']
+        uploads = ChunkedUpload.objects.filter(pk=upload_id)
+
+        uploads.update(receiving_since=timezone.now())
+        self.assertEqual(self.send(upload_id, 0, content[:50]).status_code, 423)
+
+        uploads.update(receiving_since=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(self.send(upload_id, 0, content[:50]).status_code, 204)
+        self.assertEqual(uploads.values_list('offset', 'receiving_since').get(), (50, None))
+
+    def test_failed_completion_removes_stored_file(self):
+        """Test a completion that rolls back leaves no file in storage and restarts the upload"""
+        import os
+        from unittest import mock
+        from applications.models import Document
+        from .models import ChunkedUpload
+
+        content = b'%PDF-1.4\n' + b'y' * 100
+        upload_id = self.create_upload(len(content)).data['id']
+        with mock.patch('core.models.AuditLog.objects.create', side_effect=RuntimeError('panne')):
+            with self.assertRaises(RuntimeError):
+                self.send(upload_id, 0, content)
+
+        self.assertFalse(Document.objects.exists())
+        stored = [name for _, _, names in os.walk(os.path.join(self.tmp.name, 'documents')) for name in names]
+        self.assertEqual(stored, [])
+        upload = ChunkedUpload.objects.get(pk=upload_id)
+        self.assertEqual((upload.status, upload.offset, upload.receiving_since), ('UPLOADING', 0, None))
+
+        # The client starts over and succeeds
+        self.assertEqual(self.send(upload_id, 0, content).status_code, 200)
+
+
+class FastJSONTest(TestCase):
+    """Test the orjson renderer and parser match DRF's"""
+
+    def test_renders_like_drf(self):
+        """Test raw Decimal, date, datetime and UUID values render as DRF renders them"""
+        import decimal
+        import io
+        import uuid
+        from datetime import date, datetime, timezone as dt_timezone
+        from rest_framework.parsers import JSONParser
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONParser, FastJSONRenderer
+
+        data = {
+            'id': uuid.UUID(int=1),
+            'amount': decimal.Decimal('15000.50'),
+            'expiry_date': date(2025, 1, 31),
+            'created_at': datetime(2024, 5, 17, 9, 30, 12, 345678, tzinfo=dt_timezone.utc),
+            'message': 'Échéance proche',
+            7: None,
+        }
+        expected = JSONRenderer().render(data)
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+        self.assertEqual(
+            FastJSONRenderer().render(data, renderer_context={'indent': 2}),
+            JSONRenderer().render(data, renderer_context={'indent': 2}),
+        )
+
+        parsed = FastJSONParser().parse(io.BytesIO(expected), parser_context={})
+        self.assertEqual(parsed, JSONParser().parse(io.BytesIO(expected), parser_context={}))
+        # Beyond 64 bits orjson gives up, DRF's parser takes over
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(b'{"n": 18446744073709551616}'), parser_context={}),
+                         {'n': 18446744073709551616})
+
+
+class BatchEndpointTest(TestCase):
+    """Test several API reads answered in one call"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="batchuser",
+            email="batch@example.com",
+            password="testpass123",
+            consular_card_number="SN1234567",
+        )
+
+    def test_batch_dispatches_through_existing_views(self):
+        """Test sub-requests share the batch request's JWT authentication"""
+        from unittest import mock
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from .authentication import CachedJWTAuthentication
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        with mock.patch.object(
+            CachedJWTAuthentication, 'get_validated_token', wraps=CachedJWTAuthentication().get_validated_token
+        ) as validate:
+            response = client.post('/api/core/batch/', {'requests': [
+                {'id': 'profile', 'path': '/api/auth/profile/'},
+                {'id': 'unread', 'path': '/api/notifications/notifications/unread_count/'},
+                {'id': 'upcoming', 'path': '/api/appointments/upcoming/?page=1'},
+                {'id': 'missing', 'path': '/api/nothing-here/'},
+                {'id': 'write', 'method': 'POST', 'path': '/api/core/feedback/'},
+                {'id': 'nested', 'path': '/api/core/batch/'},
+            ]}, format='json')
+        self.assertEqual(validate.call_count, 1)
+        self.assertEqual(response.status_code, 200)
+        results = {entry['id']: entry for entry in response.data['responses']}
+        self.assertEqual(list(results), ['profile', 'unread', 'upcoming', 'missing', 'write', 'nested'])
+        self.assertEqual(results['profile']['status'], 200)
+        self.assertEqual(results['unread']['body'], {'count': 0})
+        self.assertEqual(results['upcoming']['body']['count'], 0)
+        self.assertEqual(results['missing']['status'], 404)
+        self.assertEqual(results['write']['status'], 405)
+        self.assertEqual(results['nested']['status'], 400)
+
+    def test_anonymous_batch_and_limit(self):
+        """Test anonymous sub-requests keep their own permissions and the size limit applies"""
+        from django.test import override_settings
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        response = client.post('/api/core/batch/', {'requests': [{'path': '/api/auth/profile/'}]}, format='json')
+        self.assertEqual(response.data['responses'][0]['status'], 401)
+
+        with override_settings(BATCH_MAX_REQUESTS=1):
+            response = client.post('/api/core/batch/', {'requests': [{'path': '/api/core/faq/'}] * 2}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_denied_sub_requests_are_audit_logged(self):
+        """Test 401/403 sub-responses are audit-logged as the middleware logs direct calls"""
+        from rest_framework.test import APIClient
+        from .models import AuditLog
+
+        client = APIClient()
+        client.post('/api/core/batch/', {'requests': [{'path': '/api/auth/profile/'}]}, format='json')
+        client.force_authenticate(self.user)
+        client.post('/api/core/batch/', {'requests': [
+            {'path': '/api/core/faq/'},
+            {'path': '/api/core/admin/exports/pdf_rendering/'},
+        ]}, format='json')
+
+        logs = AuditLog.objects.order_by('id')
+        self.assertEqual(
+            [(log.user, log.metadata['path'], log.metadata['status_code']) for log in logs],
+            [(None, '/api/auth/profile/', 401), (self.user, '/api/core/admin/exports/pdf_rendering/', 403)]
+        )
+
+
+class DeltaSyncTest(TestCase):
+    """Test the changes?since= delta sync API"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.user = User.objects.create_user(
+            username="syncuser",
+            email="sync@example.com",
+            password="testpass123",
+            consular_card_number="SN7654321",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def notify(self, title):
+        from notifications.models import Notification
+        return Notification.objects.create(
+            recipient=self.user, channel=Notification.Channel.IN_APP, title=title, message=title,
+        )
+
+    def sync(self, since=None):
+        response = self.client.get('/api/core/changes/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_since_token(self):
+        """Test created, updated and deleted ids are reported to the next sync"""
+        from datetime import timedelta
+        from unittest import mock
+        from notifications.models import Notification
+
+        # No re-read window: each sync only sees what happened after the previous one
+        with mock.patch('core.sync.SAFETY_MARGIN', timedelta(0)):
+            first = self.notify("Premier")
+            data = self.sync()
+            self.assertEqual(data['changes']['notifications']['created'], [first.pk])
+            self.assertEqual(data['changes']['appointments'], {'created': [], 'updated': [], 'deleted': []})
+
+            second = self.notify("Second")
+            first.status = Notification.Status.READ
+            first.save()
+            data = self.sync(data['next'])
+            self.assertEqual(data['changes']['notifications']['created'], [second.pk])
+            self.assertEqual(data['changes']['notifications']['updated'], [first.pk])
+            self.assertFalse(data['has_more'])
+
+            first_id = first.pk
+            first.delete()
+            data = self.sync(data['next'])
+            self.assertEqual(data['changes']['notifications'], {'created': [], 'updated': [], 'deleted': [first_id]})
+
+            data = self.sync(data['next'])
+            self.assertEqual(data['changes']['notifications'], {'created': [], 'updated': [], 'deleted': []})
+
+    def test_continuation_and_invalid_tokens(self):
+        """Test large syncs are paged and foreign or tampered tokens refused"""
+        from django.test import override_settings
+
+        ids = [self.notify(f"Notification {i}").pk for i in range(3)]
+        with override_settings(SYNC_MAX_CHANGES=2):
+            data = self.sync()
+            self.assertTrue(data['has_more'])
+            received = data['changes']['notifications']['created']
+            data = self.sync(data['next'])
+        received += data['changes']['notifications']['created']
+        self.assertEqual(sorted(set(received)), ids)
+
+        self.assertEqual(self.client.get('/api/core/changes/', {'since': 'abc'}).status_code, 400)
+        other = User.objects.create_user(username="other", email="other@example.com", password="testpass123")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get('/api/core/changes/', {'since': data['next']}).status_code, 400)
@@ -0,0 +1,154 @@
+"""
+Status transition service for Appointments and Applications
+
+Each model declares its legal state graph in ``STATUS_TRANSITIONS`` and the
+timestamp column stamped when a status is reached in ``STATUS_TIMESTAMPS``.
+Transitions are written with a conditional UPDATE keyed on the expected prior
+status: if another agent changed the row in the meantime, nothing is written
+and ``ConcurrentTransition`` is raised instead of silently overwriting it.
+
+A single ``status_changed`` signal is sent per successful transition, in
+the transaction of the UPDATE; the apps hook their audit log and
+notifications on it, so a failing receiver rolls the transition back. Bulk transitions (admin
+actions) are written with one UPDATE and announced once through
+``statuses_changed`` so receivers can batch their work too.
+"""
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+from rest_framework import status as http_status
+
+
+# Arguments: instance, old_status, new_status, user, note, notify
+status_changed = Signal()
+
+# Arguments: changes ({pk: old_status}), new_status, user, note, notify
+statuses_changed = Signal()
+
+
+class TransitionError(Exception):
+    """Base class for refused status transitions"""
+    status_code = http_status.HTTP_400_BAD_REQUEST
+
+
+class InvalidTransition(TransitionError):
+    """The requested transition is not part of the model's state graph"""
+
+    def __init__(self, old_status, new_status):
+        self.old_status = old_status
+        self.new_status = new_status
+        super().__init__(f"Transition de statut invalide de {old_status} vers {new_status}.")
+
+
+class ConcurrentTransition(TransitionError):
+    """The row no longer has the status the caller based its decision on"""
+    status_code = http_status.HTTP_409_CONFLICT
+
+    def __init__(self, expected_status, current_status):
+        self.expected_status = expected_status
+        self.current_status = current_status
+        super().__init__(
+            f"Le statut a été modifié entre-temps ({expected_status} → {current_status}). "
+            f"Veuillez recharger et réessayer."
+        )
+
+
+def allowed_transitions(model, from_status):
+    """Return the statuses reachable from ``from_status`` for ``model``"""
+    return model.STATUS_TRANSITIONS.get(from_status, [])
+
+
+def can_transition(instance, new_status):
+    """Check whether ``instance`` may move to ``new_status``"""
+    return new_status in allowed_transitions(type(instance), instance.status)
+
+
+def transition(instance, new_status, user=None, fields=None, note='', notify=True):
+    """
+    Move ``instance`` to ``new_status``.
+
+    ``fields`` are extra column values written in the same UPDATE. The
+    instance is updated in place and returned. Raises ``InvalidTransition``
+    when the graph forbids the move and ``ConcurrentTransition`` when the
+    stored status no longer matches ``instance.status``. The UPDATE and
+    the ``status_changed`` receivers run in one transaction.
+    """
+    model = type(instance)
+    old_status = instance.status
+
+    if new_status not in allowed_transitions(model, old_status):
+        raise InvalidTransition(old_status, new_status)
+
+    now = timezone.now()
+    values = {'status': new_status, 'updated_at': now}
+    timestamp_field = model.STATUS_TIMESTAMPS.get(new_status)
+    if timestamp_field and getattr(instance, timestamp_field) is None:
+        values[timestamp_field] = now
+    if fields:
+        values.update(fields)
+
+    previous = {field_name: getattr(instance, field_name) for field_name in values}
+    try:
+        with transaction.atomic():
+            updated = model._default_manager.filter(pk=instance.pk, status=old_status).update(**values)
+            if not updated:
+                current_status = model._default_manager.filter(pk=instance.pk).values_list('status', flat=True).first()
+                raise ConcurrentTransition(old_status, current_status)
+
+            for field_name, value in values.items():
+                setattr(instance, field_name, value)
+
+            status_changed.send(
+                sender=model,
+                instance=instance,
+                old_status=old_status,
+                new_status=new_status,
+                user=user,
+                note=note,
+                notify=notify,
+            )
+    except Exception:
+        # Rolled back: leave the instance as stored
+        for field_name, value in previous.items():
+            setattr(instance, field_name, value)
+        raise
+    return instance
+
+
+def bulk_transition(queryset, new_status, user=None, note='', notify=True):
+    """
+    Move every row of ``queryset`` that may reach ``new_status`` with a single
+    UPDATE, then send one ``statuses_changed`` signal for all of them.
+
+    Rows whose status does not allow the move are skipped. No per-row
+    ``status_changed`` (nor save signal) is sent. Returns ``(updated, skipped)``.
+    """
+    model = queryset.model
+    sources = [status for status, targets in model.STATUS_TRANSITIONS.items() if new_status in targets]
+    pks = list(queryset.order_by().values_list('pk', flat=True))
+
+    with transaction.atomic():
+        changes = dict(
+            model._default_manager.select_for_update()
+            .filter(pk__in=pks, status__in=sources)
+            .values_list('pk', 'status')
+        )
+        if changes:
+            now = timezone.now()
+            values = {'status': new_status, 'updated_at': now}
+            timestamp_field = model.STATUS_TIMESTAMPS.get(new_status)
+            if timestamp_field:
+                values[timestamp_field] = Coalesce(F(timestamp_field), Value(now))
+            model._default_manager.filter(pk__in=list(changes)).update(**values)
+
+            statuses_changed.send(
+                sender=model,
+                changes=changes,
+                new_status=new_status,
+                user=user,
+                note=note,
+                notify=notify,
+            )
+    return len(changes), len(pks) - len(changes)
@@ -0,0 +1,375 @@
+"""
+Resumable chunked uploads (tus 1.0 core protocol, creation and termination)
+
+The client declares the file size and metadata once (POST), then sends the
+file in chunks (PATCH), each tagged with the offset it starts at. After a
+dropped connection it asks for the current offset (HEAD) and resumes from
+there, so only the interrupted chunk is sent again; bytes of that chunk that
+did arrive are kept.
+
+Chunks are appended to a partial file as they are read, without buffering
+the request. Size, extension and magic bytes are checked as the data comes
+in, so a bad file is refused at its first chunk. The completed file is then
+moved into the storage of the target model (Document or UserDocument).
+
+No lock or transaction is held while a chunk streams in. A request claims
+the upload with a conditional UPDATE (expected offset, no other request
+receiving), which sets ``receiving_since``, and publishes the new offset
+with another conditional UPDATE once the chunk is written. The claim of a
+request that died goes stale after CHUNK_LEASE; a long chunk renews it as it
+goes. Completion runs in one transaction: if it rolls back, the file it
+moved into storage is deleted and the client starts over.
+"""
+import base64
+import binascii
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.http import UnreadablePostError
+from django.utils import timezone
+
+from .models import ChunkedUpload
+
+logger = logging.getLogger('embassy')
+
+TUS_VERSION = '1.0.0'
+READ_SIZE = 64 * 1024
+# A chunk claim not renewed for this long belongs to a request that died
+CHUNK_LEASE = timedelta(minutes=5)
+LEASE_RENEW_SECONDS = 60
+
+# Leading bytes of each accepted file type
+FILE_SIGNATURES = {
+    'pdf': b'%PDF-',
+    'jpg': b'\xff\xd8\xff',
+    'jpeg': b'\xff\xd8\xff',
+    'png': b'\x89PNG\r\n\x1a\n',
+}
+SIGNATURE_LENGTH = max(len(signature) for signature in FILE_SIGNATURES.values())
+
+
+class UploadError(Exception):
+    """The upload request is refused"""
+    status_code = 400
+
+
+class OffsetMismatch(UploadError):
+    """The chunk does not start where the previous one ended"""
+    status_code = 409
+
+    def __init__(self, expected, received):
+        self.expected = expected
+        super().__init__(f"Décalage invalide: {received} reçu, {expected} attendu.")
+
+
+class UploadBusy(UploadError):
+    """Another request is receiving a chunk of this upload"""
+    status_code = 423
+
+    def __init__(self, message="Un fragment de ce téléversement est déjà en cours de réception."):
+        super().__init__(message)
+
+
+def parse_metadata(header):
+    """Decode a tus ``Upload-Metadata`` header (``key base64value,...``)"""
+    metadata = {}
+    for pair in filter(None, (item.strip() for item in (header or '').split(','))):
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode('utf-8') if value else ''
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(f"Métadonnée invalide: {key}")
+    return metadata
+
+
+def partial_path(upload):
+    return Path(settings.CHUNKED_UPLOAD_DIR) / f"{upload.pk}.part"
+
+
+def file_extension(filename):
+    return os.path.splitext(filename)[1][1:].lower()
+
+
+def _clean_metadata(target, metadata):
+    """Check the target-specific fields up front so the client fails fast"""
+    from applications.models import Document
+    from users.models import UserDocument
+
+    document_type = metadata.get('document_type', '')
+    if target == ChunkedUpload.Target.DOCUMENT:
+        if document_type not in Document.DocumentType.values:
+            raise UploadError("Type de document invalide.")
+        return {'document_type': document_type, 'description': metadata.get('description', '')[:500]}
+
+    if document_type not in dict(UserDocument.DOCUMENT_TYPES):
+        raise UploadError("Type de document invalide.")
+    cleaned = {
+        'document_type': document_type,
+        'name': metadata.get('name', '')[:255],
+        'notes': metadata.get('notes', ''),
+        'expiry_date': metadata.get('expiry_date') or None,
+    }
+    if cleaned['expiry_date']:
+        try:
+            datetime.strptime(cleaned['expiry_date'], '%Y-%m-%d')
+        except ValueError:
+            raise UploadError("Date d'expiration invalide (AAAA-MM-JJ).")
+    return cleaned
+
+
+def create_upload(user, upload_length, metadata):
+    """Register a new upload of ``upload_length`` bytes"""
+    filename = os.path.basename(metadata.get('filename', '')).strip()
+    target = metadata.get('target', ChunkedUpload.Target.DOCUMENT)
+
+    if target not in ChunkedUpload.Target.values:
+        raise UploadError("Destination de téléversement invalide.")
+    if not filename:
+        raise UploadError("Le nom du fichier est requis (métadonnée filename).")
+    if upload_length <= 0:
+        raise UploadError("La taille du fichier est invalide.")
+
+    max_size = settings.MAX_UPLOAD_SIZE
+    if upload_length > max_size:
+        raise UploadError(f"La taille du fichier ne doit pas dépasser {max_size / (1024*1024):.1f} MB.")
+
+    allowed_types = settings.ALLOWED_DOCUMENT_TYPES
+    if file_extension(filename) not in allowed_types or file_extension(filename) not in FILE_SIGNATURES:
+        raise UploadError(f"Type de fichier non autorisé. Types acceptés: {', '.join(allowed_types)}")
+
+    return ChunkedUpload.objects.create(
+        user=user,
+        target=target,
+        filename=filename,
+        upload_length=upload_length,
+        metadata=_clean_metadata(target, metadata),
+    )
+
+
+def _check_signature(path, filename):
+    signature = FILE_SIGNATURES[file_extension(filename)]
+    with open(path, 'rb') as partial:
+        head = partial.read(len(signature))
+    # A first chunk shorter than the signature is checked as far as it goes
+    if head != signature[:len(head)]:
+        raise UploadError("Le contenu du fichier ne correspond pas à son extension.")
+
+
+def _claim(upload, offset):
+    """Mark the upload as receiving the chunk at ``offset``; returns the claim's timestamp"""
+    now = timezone.now()
+    claimed = ChunkedUpload.objects.filter(
+        Q(receiving_since__isnull=True) | Q(receiving_since__lt=now - CHUNK_LEASE),
+        pk=upload.pk, status=ChunkedUpload.Status.UPLOADING, offset=offset,
+    ).update(receiving_since=now)
+    if claimed:
+        return now
+
+    current = ChunkedUpload.objects.filter(pk=upload.pk).first()
+    if current is None or current.status != ChunkedUpload.Status.UPLOADING:
+        raise UploadError("Ce téléversement est déjà terminé.")
+    if offset != current.offset:
+        raise OffsetMismatch(current.offset, offset)
+    raise UploadBusy()
+
+
+def _renew(upload, claim):
+    """Extend the claim of a chunk still streaming in; returns the new timestamp"""
+    now = timezone.now()
+    if not ChunkedUpload.objects.filter(pk=upload.pk, receiving_since=claim).update(receiving_since=now):
+        raise UploadBusy("Ce fragment a été repris par une autre requête.")
+    return now
+
+
+def append_chunk(upload, offset, stream):
+    """
+    Append the bytes of ``stream`` at ``offset`` and return the updated upload
+
+    The upload is completed (and its document created) with the last chunk.
+    """
+    claim = _claim(upload, offset)
+    try:
+        path = partial_path(upload)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        remaining = upload.upload_length - offset
+        written = 0
+        renewed = time.monotonic()
+        with open(path, 'r+b' if path.exists() else 'wb') as partial:
+            # Drop whatever a refused or interrupted request left past the offset
+            partial.seek(offset)
+            partial.truncate()
+            while True:
+                try:
+                    data = stream.read(min(READ_SIZE, remaining - written + 1))
+                except (UnreadablePostError, OSError):
+                    # Connection dropped: keep what arrived, the client resumes from there
+                    logger.info(f"Téléversement {upload.pk} interrompu à {offset + written} octets")
+                    break
+                if not data:
+                    break
+                if written + len(data) > remaining:
+                    raise UploadError("Le fragment dépasse la taille annoncée du fichier.")
+                partial.write(data)
+                written += len(data)
+                if time.monotonic() - renewed > LEASE_RENEW_SECONDS:
+                    claim = _renew(upload, claim)
+                    renewed = time.monotonic()
+
+        if offset < SIGNATURE_LENGTH and written:
+            _check_signature(path, upload.filename)
+
+        if offset + written == upload.upload_length:
+            upload = complete_upload(upload, claim)
+        else:
+            published = ChunkedUpload.objects.filter(pk=upload.pk, receiving_since=claim, offset=offset).update(
+                offset=offset + written, receiving_since=None, updated_at=timezone.now()
+            )
+            if not published:
+                raise UploadBusy("Ce fragment a été repris par une autre requête.")
+            upload.refresh_from_db()
+        claim = None
+    finally:
+        if claim is not None:
+            # Refused or failed chunk: the offset stays where it was
+            ChunkedUpload.objects.filter(pk=upload.pk, receiving_since=claim).update(receiving_since=None)
+    return upload
+
+
+class _PartialFile(File):
+    """Lets FileSystemStorage move the partial file instead of copying it"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def complete_upload(upload, claim):
+    """
+    Turn the assembled partial file into the target document and return
+    the completed upload
+
+    Runs in one transaction. The partial file is moved into storage on the
+    way, so when the transaction rolls back the stored file is deleted and
+    the upload restarts from offset 0.
+    """
+    document = None
+    try:
+        with transaction.atomic():
+            locked = ChunkedUpload.objects.select_for_update().filter(pk=upload.pk, receiving_since=claim).first()
+            if locked is None:
+                raise UploadBusy("Ce fragment a été repris par une autre requête.")
+            upload = locked
+            with open(partial_path(upload), 'rb') as partial:
+                document = _build_document(upload, partial)
+                document.save()
+            _log_document(upload, document)
+
+            upload.status = ChunkedUpload.Status.COMPLETE
+            upload.offset = upload.upload_length
+            upload.object_id = document.pk
+            upload.receiving_since = None
+            upload.save()
+    except Exception:
+        if document is not None:
+            _discard_stored_file(document.file)
+        if not partial_path(upload).exists():
+            ChunkedUpload.objects.filter(pk=upload.pk, status=ChunkedUpload.Status.UPLOADING).update(
+                offset=0, updated_at=timezone.now()
+            )
+        raise
+
+    partial_path(upload).unlink(missing_ok=True)
+    return upload
+
+
+def _build_document(upload, partial):
+    """Unsaved target document holding the partial file"""
+    from applications.models import Document
+    from users.models import UserDocument
+
+    metadata = upload.metadata
+    content = _PartialFile(partial, name=upload.filename)
+    if upload.target == ChunkedUpload.Target.DOCUMENT:
+        document = Document(
+            owner=upload.user,
+            document_type=metadata['document_type'],
+            description=metadata.get('description', ''),
+            original_filename=upload.filename,
+            file_size=upload.upload_length,
+        )
+        # Stored once per content by Document.save (applications.blobs)
+        document.file = content
+    else:
+        document = UserDocument(
+            user=upload.user,
+            document_type=metadata['document_type'],
+            name=metadata.get('name') or upload.filename,
+            notes=metadata.get('notes', ''),
+            expiry_date=metadata.get('expiry_date'),
+        )
+        document.file.save(upload.filename, content, save=False)
+    return document
+
+
+def _log_document(upload, document):
+    if upload.target == ChunkedUpload.Target.DOCUMENT:
+        from django.contrib.contenttypes.models import ContentType
+        from .models import AuditLog
+
+        AuditLog.objects.create(
+            user=upload.user,
+            action='CREATE',
+            description=f"Document téléversé: {document.get_document_type_display()}",
+            content_type=ContentType.objects.get_for_model(document),
+            object_id=document.id
+        )
+
+
+def _discard_stored_file(field_file):
+    """Delete a file stored by a rolled back completion, unless a committed row uses it"""
+    from applications.models import Document, DocumentBlob
+    from users.models import UserDocument
+
+    name = field_file.name
+    if not name or not field_file._committed:
+        return
+    for model in (DocumentBlob, Document, UserDocument):
+        if model.objects.filter(file=name).exists():
+            # Deduplicated content already stored for another document
+            return
+    try:
+        field_file.storage.delete(name)
+    except OSError as e:
+        logger.warning(f"Fichier {name} non supprimé après échec du téléversement: {e}")
+
+
+def delete_upload(upload):
+    """Abandon an upload and remove its partial file"""
+    partial_path(upload).unlink(missing_ok=True)
+    upload.delete()
+
+
+def purge_stale_uploads(hours=None):
+    """Remove unfinished uploads untouched for ``hours`` hours; returns the count"""
+    if hours is None:
+        hours = settings.CHUNKED_UPLOAD_EXPIRY_HOURS
+    stale = ChunkedUpload.objects.filter(
+        status=ChunkedUpload.Status.UPLOADING,
+        updated_at__lt=timezone.now() - timedelta(hours=hours),
+    )
+    count = 0
+    for upload in stale.iterator():
+        delete_upload(upload)
+        count += 1
+    # Finished uploads only keep the id of their document for the client
+    ChunkedUpload.objects.filter(
+        status=ChunkedUpload.Status.COMPLETE,
+        updated_at__lt=timezone.now() - timedelta(hours=hours),
+    ).delete()
+    return count
@@ -8,7 +8,8 @@ from .views import (
     AnnouncementViewSet, FAQViewSet, AdminExportViewSet, VigileStatisticsViewSet, QRCodeScanViewSet,
     AuditLogViewSet, SiteSettingsViewSet
 )
-from .api_views import FeedbackViewSet
+from .api_views import FeedbackViewSet, ChunkedUploadViewSet, ChangesView
+from .batch import BatchView
 
 app_name = 'core'
 
@@ -18,6 +19,7 @@ router.register(r'service-types', ServiceTypeViewSet, basename='service-type')
 router.register(r'announcements', AnnouncementViewSet, basename='announcement')
 router.register(r'faq', FAQViewSet, basename='faq')
 router.register(r'feedback', FeedbackViewSet, basename='feedback')
+router.register(r'uploads', ChunkedUploadViewSet, basename='upload')
 router.register(r'admin/exports', AdminExportViewSet, basename='admin-exports')
 router.register(r'vigile/stats', VigileStatisticsViewSet, basename='vigile-stats')
 router.register(r'vigile/qr-scan', QRCodeScanViewSet, basename='qr-scan')
@@ -25,5 +27,7 @@ router.register(r'audit-logs', AuditLogViewSet, basename='audit-log')
 router.register(r'site-settings', SiteSettingsViewSet, basename='site-settings')
 
 urlpatterns = [
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('changes/', ChangesView.as_view(), name='changes'),
     path('', include(router.urls)),
 ]
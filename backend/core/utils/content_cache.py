@@ -0,0 +1,155 @@
+"""
+Content-addressed cache for rendered artefacts (QR codes, PDFs)
+
+Entries are keyed by a hash of the content they were rendered from, so an
+entry never needs invalidating: when the source changes, the key changes.
+Lookups hit a bounded in-process LRU first, then a sharded directory on
+disk shared by all workers.
+
+The disk tier holds personal data: receipts and certificates (names,
+amounts, references) under CONTENT_CACHE_DIR/pdfs, appointment QR codes
+under CONTENT_CACHE_DIR/qrcodes. The directory must stay outside
+MEDIA_ROOT and any web-served path, with the same access rights and backup
+policy as the database. ``purge_content_cache`` (manage.py
+purge_content_cache, to be run daily) removes the files unused for
+CONTENT_CACHE_MAX_AGE_DAYS, then the least recently used ones until each
+namespace fits in CONTENT_CACHE_MAX_BYTES. A disk hit refreshes the file's
+modification time, which is what "used" means here.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger('embassy')
+
+
+def content_hash(data):
+    """Return the SHA-256 hex digest of ``data`` (bytes, str or JSON-serializable)"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    elif not isinstance(data, bytes):
+        data = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+class ContentCache:
+    """Two-level (memory LRU + disk) cache of bytes keyed by content hash"""
+
+    def __init__(self, namespace, max_items=128):
+        self.namespace = namespace
+        self.max_items = max_items
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return Path(settings.CONTENT_CACHE_DIR) / self.namespace
+
+    def _path(self, key):
+        return self.directory / key[:2] / key
+
+    def get(self, key):
+        """Return cached bytes for ``key`` or None"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            # Purged meanwhile
+            pass
+
+        self._remember(key, data)
+        return data
+
+    def set(self, key, data):
+        """Store ``data`` under ``key`` in memory and on disk"""
+        self._remember(key, data)
+
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Content cache {self.namespace}: could not write {key}: {e}")
+
+    def get_or_render(self, key, render):
+        """Return cached bytes for ``key``, calling ``render()`` on a miss"""
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.set(key, data)
+        return data
+
+    def clear_memory(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+
+def purge_content_cache(max_age_days=None, max_bytes=None):
+    """
+    Delete disk entries unused for ``max_age_days``, then the least recently
+    used ones until each namespace is under ``max_bytes``; returns the count
+    """
+    if max_age_days is None:
+        max_age_days = settings.CONTENT_CACHE_MAX_AGE_DAYS
+    if max_bytes is None:
+        max_bytes = settings.CONTENT_CACHE_MAX_BYTES
+    horizon = time.time() - max_age_days * 86400
+    root = Path(settings.CONTENT_CACHE_DIR)
+    if not root.is_dir():
+        return 0
+
+    count = 0
+    for namespace in root.iterdir():
+        if not namespace.is_dir():
+            continue
+        entries = []
+        for path in namespace.glob('*/*'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort(key=lambda entry: entry[0])
+
+        size = sum(entry[1] for entry in entries)
+        for mtime, file_size, path in entries:
+            if mtime >= horizon and size <= max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            size -= file_size
+            count += 1
+
+    logger.info(f"Content cache: {count} fichier(s) supprimé(s)")
+    return count
@@ -0,0 +1,113 @@
+"""
+Image derivatives for uploaded documents
+
+Identity photos and scans arrive as multi-megabyte phone pictures. A
+background job builds two JPEG derivatives for every image document, stored
+next to the original: a size-capped ``preview`` and a small ``thumbnail``.
+Both are rotated upright from the EXIF orientation and saved without any
+metadata (EXIF, GPS, ICC). The original file is left untouched.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger('embassy')
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+
+
+def derivative_upload_path(instance, filename):
+    """Store derivatives in a ``derived/`` folder beside the original file"""
+    return os.path.join(os.path.dirname(instance.file.name), 'derived', filename)
+
+
+def is_image(name):
+    return os.path.splitext(name or '')[1][1:].lower() in IMAGE_EXTENSIONS
+
+
+def _stem(name):
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def needs_derivatives(instance):
+    """True when the document is an image whose derivatives are missing or stale"""
+    if not instance.file or not is_image(instance.file.name):
+        return False
+    thumbnail = instance.thumbnail.name or ''
+    return not os.path.basename(thumbnail).startswith(f"{_stem(instance.file.name)}_")
+
+
+def _to_jpeg(image, max_size, quality):
+    image = image.copy()
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    buffer = BytesIO()
+    # Saving without exif/icc_profile drops all metadata
+    image.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def render_derivatives(fileobj):
+    """Return ``(preview_jpeg, thumbnail_jpeg)`` for an image file object"""
+    with Image.open(fileobj) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        return (
+            _to_jpeg(image, settings.IMAGE_PREVIEW_MAX_SIZE, quality=82),
+            _to_jpeg(image, settings.IMAGE_THUMBNAIL_SIZE, quality=75),
+        )
+
+
+def generate_image_derivatives(model_label, pk):
+    """
+    Build the preview and thumbnail of one document (django-q task)
+
+    ``model_label`` is ``'applications.Document'`` or ``'users.UserDocument'``.
+    """
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not needs_derivatives(instance):
+        return False
+
+    try:
+        with instance.file.open('rb') as original:
+            preview, thumbnail = render_derivatives(original)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logger.warning(f"Aperçu impossible pour {model_label} {pk}: {e}")
+        return False
+
+    old_names = [name for name in (instance.preview.name, instance.thumbnail.name) if name]
+    stem = _stem(instance.file.name)
+    instance.preview.save(f"{stem}_preview.jpg", ContentFile(preview), save=False)
+    instance.thumbnail.save(f"{stem}_thumb.jpg", ContentFile(thumbnail), save=False)
+    # update() so the document's save signals do not fire again
+    model.objects.filter(pk=pk).update(preview=instance.preview.name, thumbnail=instance.thumbnail.name)
+
+    storage = instance.file.storage
+    for name in old_names:
+        storage.delete(name)
+    return True
+
+
+def schedule_image_derivatives(instance):
+    """Queue derivative generation after the current transaction commits"""
+    if not needs_derivatives(instance):
+        return
+    from django_q.tasks import async_task
+
+    label = instance._meta.label
+    pk = instance.pk
+    transaction.on_commit(
+        lambda: async_task('core.utils.images.generate_image_derivatives', label, pk)
+    )
@@ -1,257 +1,306 @@
 """
 PDF Generation utilities using ReportLab (FREE)
 Generate receipts, certificates, and official documents
+
+Each document is produced in two steps: a ``*_context`` function reads the
+model instance into a plain dict, and a ``render_*`` function turns that
+dict into PDF bytes. Styles are built once per process, and rendered PDFs
+are cached under a hash of their context (see core.utils.content_cache for
+where they are stored and purged), so a document whose source has not
+changed is never rendered twice.
 """
+from datetime import datetime
+from functools import lru_cache
 from io import BytesIO
+
+from django.conf import settings
 from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.pdfgen import canvas
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
-from django.conf import settings
-from datetime import datetime
-import qrcode
-from io import BytesIO as QRBytesIO
 
+from core.utils.content_cache import ContentCache, content_hash
+from core.utils.pdf_service import get_pdf_service
 
-def generate_receipt_pdf(payment):
-    """
-    Generate payment receipt PDF
-    """
+# Bump when a template below changes so cached PDFs are not reused
+PDF_TEMPLATE_VERSION = 2
+
+EMBASSY_GREEN = colors.HexColor('#009639')
+
+EMBASSY_INFO = [
+    "Ambassade de la République du Congo",
+    "Stèle Mermoz, Pyrotechnie",
+    "P.O. Box 5243, Dakar, Sénégal",
+    "Tél: +221 824 8398 / +221 649 3117",
+]
+
+_pdf_cache = ContentCache('pdfs', max_items=getattr(settings, 'PDF_CACHE_MAX_ITEMS', 64))
+
+
+@lru_cache(maxsize=None)
+def get_styles():
+    """Paragraph styles shared by every document (built once per process)"""
+    sample = getSampleStyleSheet()
+    return {
+        'normal': sample['Normal'],
+        'italic': sample['Italic'],
+        'body': sample['BodyText'],
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=sample['Heading1'],
+            fontSize=20,
+            textColor=EMBASSY_GREEN,
+            alignment=TA_CENTER,
+            spaceAfter=20,
+        ),
+        'title_large': ParagraphStyle(
+            'CustomTitleLarge',
+            parent=sample['Heading1'],
+            fontSize=24,
+            textColor=EMBASSY_GREEN,
+            alignment=TA_CENTER,
+            spaceAfter=30,
+        ),
+    }
+
+
+@lru_cache(maxsize=None)
+def get_table_styles():
+    """Table styles shared by every document (built once per process)"""
+    return {
+        'receipt': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -2), colors.lightgrey),
+            ('BACKGROUND', (0, -1), (-1, -1), EMBASSY_GREEN),
+            ('TEXTCOLOR', (0, -1), (-1, -1), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, -1), (-1, -1), 16),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('GRID', (0, 0), (-1, -2), 1, colors.black),
+            ('BOX', (0, -1), (-1, -1), 2, EMBASSY_GREEN),
+        ]),
+        'details': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('PADDING', (0, 0), (-1, -1), 10),
+        ]),
+    }
+
+
+def _build(elements, top_margin):
     buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm)
-    
-    # Container for elements
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#009639'),
-        alignment=TA_CENTER,
-        spaceAfter=30,
-    )
-    
-    # Title
-    elements.append(Paragraph("REÇU DE PAIEMENT", title_style))
-    elements.append(Spacer(1, 0.5*cm))
-    
-    # Embassy info
-    embassy_info = [
-        "Ambassade de la République du Congo",
-        "Stèle Mermoz, Pyrotechnie",
-        "P.O. Box 5243, Dakar, Sénégal",
-        "Tél: +221 824 8398 / +221 649 3117",
-    ]
-    
-    for line in embassy_info:
-        elements.append(Paragraph(line, styles['Normal']))
-    
-    elements.append(Spacer(1, 1*cm))
-    
-    # Receipt details
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=top_margin)
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+# Receipts
+
+def receipt_context(payment):
+    """Everything a payment receipt shows, as plain data"""
+    return {
+        'receipt_number': payment.receipt_number or 'N/A',
+        'transaction_id': payment.transaction_id,
+        'completed_at': payment.completed_at.strftime('%d/%m/%Y %H:%M') if payment.completed_at else 'N/A',
+        'application_reference': payment.application.reference_number,
+        'beneficiary': payment.user.get_full_name(),
+        'payment_method': str(payment.get_payment_method_display()),
+        'amount': f"{payment.amount} {payment.currency}",
+    }
+
+
+def render_receipt(context):
+    """Render a payment receipt from ``receipt_context`` data"""
+    styles = get_styles()
     data = [
-        ['Numéro de reçu:', payment.receipt_number or 'N/A'],
-        ['Transaction ID:', payment.transaction_id],
-        ['Date:', payment.completed_at.strftime('%d/%m/%Y %H:%M') if payment.completed_at else 'N/A'],
-        ['Demande:', payment.application.reference_number],
-        ['Bénéficiaire:', payment.user.get_full_name()],
-        ['Méthode:', payment.get_payment_method_display()],
+        ['Numéro de reçu:', context['receipt_number']],
+        ['Transaction ID:', context['transaction_id']],
+        ['Date:', context['completed_at']],
+        ['Demande:', context['application_reference']],
+        ['Bénéficiaire:', context['beneficiary']],
+        ['Méthode:', context['payment_method']],
         ['', ''],
-        ['MONTANT PAYÉ:', f"{payment.amount} {payment.currency}"],
+        ['MONTANT PAYÉ:', context['amount']],
     ]
-    
-    table = Table(data, colWidths=[8*cm, 8*cm])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -2), colors.lightgrey),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#009639')),
-        ('TEXTCOLOR', (0, -1), (-1, -1), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, -1), (-1, -1), 16),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -2), 1, colors.black),
-        ('BOX', (0, -1), (-1, -1), 2, colors.HexColor('#009639')),
-    ]))
-    
-    elements.append(table)
-    elements.append(Spacer(1, 1*cm))
-    
-    # Footer
-    elements.append(Paragraph("Ce reçu est valable comme preuve de paiement.", styles['Normal']))
-    elements.append(Paragraph("Document généré automatiquement.", styles['Italic']))
-    
-    # Build PDF
-    doc.build(elements)
-    
-    buffer.seek(0)
-    return buffer
+    table = Table(data, colWidths=[8 * cm, 8 * cm])
+    table.setStyle(get_table_styles()['receipt'])
+    elements = [
+        Paragraph("REÇU DE PAIEMENT", styles['title_large']),
+        Spacer(1, 0.5 * cm),
+        *[Paragraph(line, styles['normal']) for line in EMBASSY_INFO],
+        Spacer(1, 1 * cm),
+        table,
+        Spacer(1, 1 * cm),
+        Paragraph("Ce reçu est valable comme preuve de paiement.", styles['normal']),
+        Paragraph("Document généré automatiquement.", styles['italic']),
+    ]
+    return _build(elements, top_margin=2 * cm)
 
 
-def generate_certificate_pdf(application):
-    """
-    Generate attestation certificate PDF
-    """
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=3*cm)
-    
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.HexColor('#009639'),
-        alignment=TA_CENTER,
-        spaceAfter=20,
-    )
-    
-    elements.append(Paragraph("ATTESTATION CONSULAIRE", title_style))
-    elements.append(Spacer(1, 1*cm))
-    
-    # Content
+# Certificates
+
+def certificate_context(application):
+    """Everything an attestation shows, as plain data"""
+    profile = application.applicant.profile
+    return {
+        'applicant_name': application.applicant.get_full_name(),
+        'date_of_birth': str(profile.date_of_birth or '[DATE]'),
+        'nationality': str(profile.get_nationality_display()),
+        'application_type': str(application.get_application_type_display()),
+        'reference_number': application.reference_number,
+        'issued_on': datetime.now().strftime('%d/%m/%Y'),
+    }
+
+
+def render_certificate(context):
+    """Render an attestation certificate from ``certificate_context`` data"""
+    styles = get_styles()
     content = f"""
     <para alignment="justify">
     Le Consul de la République du Congo à Dakar atteste que
-    <b>{application.applicant.get_full_name()}</b>,
-    né(e) le {application.applicant.profile.date_of_birth or '[DATE]'},
-    de nationalité {application.applicant.profile.get_nationality_display()},
-    a déposé une demande de {application.get_application_type_display()}
-    sous la référence <b>{application.reference_number}</b>.
+    <b>{context['applicant_name']}</b>,
+    né(e) le {context['date_of_birth']},
+    de nationalité {context['nationality']},
+    a déposé une demande de {context['application_type']}
+    sous la référence <b>{context['reference_number']}</b>.
     </para>
     """
-    
-    elements.append(Paragraph(content, styles['BodyText']))
-    elements.append(Spacer(1, 2*cm))
-    
-    # Date and signature
-    date_text = f"Fait à Dakar, le {datetime.now().strftime('%d/%m/%Y')}"
-    elements.append(Paragraph(date_text, styles['Normal']))
-    elements.append(Spacer(1, 1*cm))
-    elements.append(Paragraph("Le Consul", styles['Normal']))
-    
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
+    elements = [
+        Paragraph("ATTESTATION CONSULAIRE", styles['title']),
+        Spacer(1, 1 * cm),
+        Paragraph(content, styles['body']),
+        Spacer(1, 2 * cm),
+        Paragraph(f"Fait à Dakar, le {context['issued_on']}", styles['normal']),
+        Spacer(1, 1 * cm),
+        Paragraph("Le Consul", styles['normal']),
+    ]
+    return _build(elements, top_margin=3 * cm)
 
 
-def generate_appointment_confirmation_pdf(appointment):
-    """
-    Generate appointment confirmation with QR code
-    """
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm)
-    
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.HexColor('#009639'),
-        alignment=TA_CENTER,
-        spaceAfter=20,
-    )
-    
-    elements.append(Paragraph("CONFIRMATION DE RENDEZ-VOUS", title_style))
-    elements.append(Spacer(1, 1*cm))
-    
-    # Appointment details
+# Appointment confirmations
+
+def appointment_confirmation_context(appointment):
+    """Everything a confirmation shows, as plain data (QR from the QR cache)"""
+    from appointments.qr import get_appointment_qr
+
+    qr_version, qr_png = get_appointment_qr(appointment)
+    return {
+        'reference_number': appointment.reference_number,
+        'service': appointment.service_type.name,
+        'office': appointment.office.name,
+        'date': appointment.appointment_date.strftime('%d/%m/%Y'),
+        'time': appointment.appointment_time.strftime('%H:%M'),
+        'beneficiary': appointment.user.get_full_name(),
+        'qr_version': qr_version,
+        # Identified by qr_version; left out of the cache key
+        '_qr_png': qr_png,
+    }
+
+
+def render_appointment_confirmation(context):
+    """Render an appointment confirmation from ``appointment_confirmation_context`` data"""
+    styles = get_styles()
     data = [
-        ['Référence:', appointment.reference_number],
-        ['Service:', appointment.service_type.name],
-        ['Bureau:', appointment.office.name],
-        ['Date:', appointment.appointment_date.strftime('%d/%m/%Y')],
-        ['Heure:', appointment.appointment_time.strftime('%H:%M')],
-        ['Bénéficiaire:', appointment.user.get_full_name()],
+        ['Référence:', context['reference_number']],
+        ['Service:', context['service']],
+        ['Bureau:', context['office']],
+        ['Date:', context['date']],
+        ['Heure:', context['time']],
+        ['Bénéficiaire:', context['beneficiary']],
     ]
-    
-    table = Table(data, colWidths=[6*cm, 10*cm])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('PADDING', (0, 0), (-1, -1), 10),
-    ]))
-    
-    elements.append(table)
-    elements.append(Spacer(1, 1*cm))
-    
-    # Generate QR code with complete appointment data
-    import json
-    from datetime import datetime, timedelta
-    
-    appointment_data = {
-        "type": "APPOINTMENT",
-        "reference": appointment.reference_number,
-        "appointment": {
-            "id": str(appointment.id),
-            "reference": appointment.reference_number,
-            "date": appointment.appointment_date.strftime("%Y-%m-%d"),
-            "time": appointment.appointment_time.strftime("%H:%M"),
-            "duration": appointment.duration_minutes,
-            "status": appointment.status,
-            "service": {
-                "id": appointment.service_type.id,
-                "name": appointment.service_type.name,
-                "description": appointment.service_type.description
-            },
-            "office": {
-                "id": appointment.office.id,
-                "name": appointment.office.name,
-                "address": appointment.office.full_address
-            },
-            "user": {
-                "id": str(appointment.user.id),
-                "name": appointment.user.get_full_name(),
-                "email": appointment.user.email,
-                "role": appointment.user.role
-            }
-        },
-        "embassy": {
-            "name": "Ambassade de la République du Congo - Sénégal",
-            "address": "Stèle Mermoz, Pyrotechnie, P.O. Box 5243, Dakar, Sénégal",
-            "phone": "+221 824 8398",
-            "email": "contact@ambassade-congo.sn"
-        },
-        "generatedAt": datetime.now().isoformat() + "Z",
-        "validUntil": (appointment.appointment_date + timedelta(days=1)).isoformat() + "Z",
-        "purpose": "Identification rendez-vous - Accès aux services consulaires"
-    }
-    
-    qr = qrcode.QRCode(version=1, box_size=8, border=5)
-    qr.add_data(json.dumps(appointment_data, ensure_ascii=False))
-    qr.make(fit=True)
-    qr_img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Save QR to buffer
-    qr_buffer = QRBytesIO()
-    qr_img.save(qr_buffer, format='PNG')
-    qr_buffer.seek(0)
-    
-    # Add QR code to PDF
-    qr_image = Image(qr_buffer, width=5*cm, height=5*cm)
-    elements.append(qr_image)
-    elements.append(Spacer(1, 0.5*cm))
-    
-    # Instructions
+    table = Table(data, colWidths=[6 * cm, 10 * cm])
+    table.setStyle(get_table_styles()['details'])
+
     instructions = """
     <para alignment="center">
     <b>Veuillez présenter ce QR code à votre arrivée</b><br/>
     Arrivez 15 minutes avant votre rendez-vous
     </para>
     """
-    elements.append(Paragraph(instructions, styles['BodyText']))
-    
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
+    elements = [
+        Paragraph("CONFIRMATION DE RENDEZ-VOUS", styles['title']),
+        Spacer(1, 1 * cm),
+        table,
+        Spacer(1, 1 * cm),
+        Image(BytesIO(context['_qr_png']), width=5 * cm, height=5 * cm),
+        Spacer(1, 0.5 * cm),
+        Paragraph(instructions, styles['body']),
+    ]
+    return _build(elements, top_margin=2 * cm)
+
+
+RENDERERS = {
+    'receipt': render_receipt,
+    'certificate': render_certificate,
+    'appointment_confirmation': render_appointment_confirmation,
+}
+
+
+def render_document(kind, context):
+    """Render a document of ``kind`` from its context (uncached)"""
+    return RENDERERS[kind](context)
+
+
+def pdf_cache_key(kind, context):
+    """Content address of a document: template version plus rendered data"""
+    data = {key: value for key, value in context.items() if not key.startswith('_')}
+    return content_hash({'kind': kind, 'version': PDF_TEMPLATE_VERSION, 'context': data})
+
+
+def get_cached_pdf(kind, context):
+    """
+    Return ``(key, pdf_bytes)``, rendering only on a cache miss
+
+    Misses are rendered in the PDF process pool and may raise
+    ``PDFRenderUnavailable`` when it is saturated or too slow.
+    """
+    key = pdf_cache_key(kind, context)
+    return key, _pdf_cache.get_or_render(key, lambda: get_pdf_service().render(kind, context))
+
+
+def get_cached_pdfs(kind, contexts, service=None):
+    """Batch variant of ``get_cached_pdf``; misses are rendered in parallel"""
+    keys = [pdf_cache_key(kind, context) for context in contexts]
+    pdfs = [_pdf_cache.get(key) for key in keys]
+    missing = [i for i, pdf in enumerate(pdfs) if pdf is None]
+    if missing:
+        rendered = (service or get_pdf_service()).render_many(kind, [contexts[i] for i in missing])
+        for i, pdf in zip(missing, rendered):
+            _pdf_cache.set(keys[i], pdf)
+            pdfs[i] = pdf
+    return list(zip(keys, pdfs))
 
+
+def get_receipt_pdf(payment):
+    return get_cached_pdf('receipt', receipt_context(payment))
+
+
+def get_certificate_pdf(application):
+    return get_cached_pdf('certificate', certificate_context(application))
+
+
+def get_appointment_confirmation_pdf(appointment):
+    return get_cached_pdf('appointment_confirmation', appointment_confirmation_context(appointment))
+
+
+def generate_receipt_pdf(payment):
+    """
+    Generate payment receipt PDF
+    """
+    return BytesIO(get_receipt_pdf(payment)[1])
+
+
+def generate_certificate_pdf(application):
+    """
+    Generate attestation certificate PDF
+    """
+    return BytesIO(get_certificate_pdf(application)[1])
+
+
+def generate_appointment_confirmation_pdf(appointment):
+    """
+    Generate appointment confirmation with QR code
+    """
+    return BytesIO(get_appointment_confirmation_pdf(appointment)[1])
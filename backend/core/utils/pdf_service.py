@@ -0,0 +1,202 @@
+"""
+Out-of-process PDF rendering
+
+ReportLab is CPU-bound and holds the GIL, so rendering in a request worker
+stalls every other request it serves. Renders are handed to a bounded
+ProcessPoolExecutor instead: the web worker only waits on the result, with a
+timeout, and throughput scales with the number of rendering processes.
+
+Each web worker process (e.g. each gunicorn worker) owns its own pool, so
+the machine runs up to PDF_RENDER_WORKERS times the number of web workers
+rendering processes, and the counters returned by ``stats()`` describe the
+pool of the process that answers, not the whole deployment.
+
+Settings:
+    PDF_RENDER_WORKERS      processes in the pool of each web worker (0 renders inline)
+    PDF_RENDER_MAX_QUEUE    renders in flight before new ones are refused
+    PDF_RENDER_TIMEOUT      seconds a request waits for its render
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+
+logger = logging.getLogger('embassy')
+
+
+class PDFRenderUnavailable(Exception):
+    """The PDF could not be rendered in time; the client should retry"""
+    status_code = 503
+
+    def __init__(self, message="Le service de génération PDF est momentanément surchargé. Veuillez réessayer."):
+        super().__init__(message)
+
+
+def _init_worker():
+    # No-op under fork; sets Django up under spawn/forkserver
+    django.setup()
+
+
+def _render(kind, context):
+    from core.utils.pdf_generator import render_document
+    return render_document(kind, context)
+
+
+class PDFRenderService:
+    """Bounded process pool with queue-depth and latency counters"""
+
+    def __init__(self, workers, max_queue, timeout):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'timeouts': 0,
+            'rejected': 0,
+            'peak_in_flight': 0,
+            'render_seconds': 0.0,
+        }
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return self._executor
+
+    def _done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _submit(self, kind, contexts):
+        """
+        Submit as many of ``contexts`` as the queue has room for (at least
+        one) and return their futures; raises PDFRenderUnavailable when full
+        """
+        with self._lock:
+            room = self.max_queue - self._in_flight
+            if room <= 0:
+                self._stats['rejected'] += 1
+                logger.warning(f"PDF render refusé ({kind}): {self._in_flight} rendus en attente")
+                raise PDFRenderUnavailable()
+            futures = []
+            for context in contexts[:room]:
+                try:
+                    future = self._get_executor().submit(_render, kind, context)
+                except BrokenProcessPool:
+                    # A worker died; start a fresh pool for this and later renders
+                    self._executor = None
+                    future = self._get_executor().submit(_render, kind, context)
+                futures.append(future)
+            self._in_flight += len(futures)
+            self._stats['submitted'] += len(futures)
+            self._stats['peak_in_flight'] = max(self._stats['peak_in_flight'], self._in_flight)
+        for future in futures:
+            future.add_done_callback(self._done)
+        return futures
+
+    def _result(self, kind, future):
+        """Wait for one render, at most ``timeout`` seconds, counting timeouts and failures"""
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # The render keeps running and still counts towards the queue until it ends
+            with self._lock:
+                self._stats['timeouts'] += 1
+            logger.warning(f"PDF render expiré ({kind}) après {self.timeout}s")
+            raise PDFRenderUnavailable()
+        except BrokenProcessPool:
+            with self._lock:
+                self._stats['failed'] += 1
+            logger.exception(f"PDF render échoué ({kind}): processus de rendu interrompu")
+            raise PDFRenderUnavailable()
+        except Exception:
+            with self._lock:
+                self._stats['failed'] += 1
+            logger.exception(f"PDF render échoué ({kind})")
+            raise
+
+    def render(self, kind, context):
+        """Render in the pool and wait for the bytes, at most ``timeout`` seconds"""
+        if not self.workers:
+            return _render(kind, context)
+
+        future, = self._submit(kind, [context])
+        started = time.monotonic()
+        pdf = self._result(kind, future)
+        with self._lock:
+            self._stats['completed'] += 1
+            self._stats['render_seconds'] += time.monotonic() - started
+        return pdf
+
+    def render_many(self, kind, contexts):
+        """
+        Render several documents in parallel and return the PDFs in order
+
+        Documents are submitted in chunks that fit in the free queue room,
+        so a batch never holds more than ``max_queue`` renders in flight.
+        Timeouts, failures and a full queue are handled as in ``render()``;
+        the renders of a failed chunk that have not started are cancelled.
+        """
+        if not self.workers:
+            return [_render(kind, context) for context in contexts]
+
+        contexts = list(contexts)
+        pdfs = []
+        while len(pdfs) < len(contexts):
+            futures = self._submit(kind, contexts[len(pdfs):])
+            started = time.monotonic()
+            try:
+                chunk = [self._result(kind, future) for future in futures]
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+            with self._lock:
+                self._stats['completed'] += len(chunk)
+                self._stats['render_seconds'] += time.monotonic() - started
+            pdfs.extend(chunk)
+        return pdfs
+
+    def stats(self):
+        """Snapshot of this process's pool counters, for monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = self._in_flight
+        stats.update(workers=self.workers, max_queue=self.max_queue, timeout=self.timeout)
+        # Per web worker: tells apart the processes answering successive calls
+        stats.update(scope='process', pid=os.getpid())
+        stats['render_seconds'] = round(stats['render_seconds'], 3)
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_pdf_service():
+    """Process-wide rendering service, created on first use"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = PDFRenderService(
+                    workers=settings.PDF_RENDER_WORKERS,
+                    max_queue=settings.PDF_RENDER_MAX_QUEUE,
+                    timeout=settings.PDF_RENDER_TIMEOUT,
+                )
+    return _service
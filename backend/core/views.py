@@ -235,6 +235,15 @@ class AdminExportViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['get'])
+    def pdf_rendering(self, request):
+        """PDF rendering pool counters (queue depth, timeouts, refusals) of the answering process"""
+        if not request.user or request.user.role not in ['ADMIN', 'SUPERADMIN']:
+            return Response({'error': 'Accès non autorisé'}, status=403)
+
+        from core.utils.pdf_service import get_pdf_service
+        return Response(get_pdf_service().stats())
+
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get general statistics for dashboard"""
@@ -176,7 +176,7 @@ AUTHENTICATION_BACKENDS = [
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -187,6 +187,16 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # orjson-backed JSON (core.renderers), falls back to DRF's when orjson is missing
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_THROTTLE_CLASSES': [
@@ -229,6 +239,17 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    # Resumable uploads (core.uploads)
+    'tus-resumable',
+    'upload-length',
+    'upload-metadata',
+    'upload-offset',
+]
+CORS_EXPOSE_HEADERS = [
+    'location',
+    'tus-resumable',
+    'upload-length',
+    'upload-offset',
 ]
 
 # CSRF Settings - Sécurité renforcée
@@ -313,10 +334,48 @@ STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
 # File Upload Settings
 MAX_UPLOAD_SIZE = config('MAX_UPLOAD_SIZE', default=10485760, cast=int)  # 10MB
 ALLOWED_DOCUMENT_TYPES = config('ALLOWED_DOCUMENT_TYPES', default='pdf,jpg,jpeg,png', cast=Csv())
+# Resumable uploads: partial files (same filesystem as MEDIA_ROOT) and their lifetime
+CHUNKED_UPLOAD_DIR = config('CHUNKED_UPLOAD_DIR', default=str(BASE_DIR / 'uploads_partial'))
+CHUNKED_UPLOAD_EXPIRY_HOURS = config('CHUNKED_UPLOAD_EXPIRY_HOURS', default=24, cast=int)
+# Document image derivatives (longest side, in pixels)
+IMAGE_PREVIEW_MAX_SIZE = config('IMAGE_PREVIEW_MAX_SIZE', default=1600, cast=int)
+IMAGE_THUMBNAIL_SIZE = config('IMAGE_THUMBNAIL_SIZE', default=320, cast=int)
 
 # Application Settings
 APPOINTMENT_SLOT_DURATION = config('APPOINTMENT_SLOT_DURATION', default=30, cast=int)
 MAX_APPOINTMENTS_PER_DAY = config('MAX_APPOINTMENTS_PER_DAY', default=50, cast=int)
+# Finished appointments older than this are moved to the archive tables
+APPOINTMENT_ARCHIVE_AFTER_DAYS = config('APPOINTMENT_ARCHIVE_AFTER_DAYS', default=180, cast=int)
+
+# Rendered artefacts cache (QR codes, PDFs), keyed by content hash. Holds personal
+# data (receipts, certificates): keep it outside MEDIA_ROOT, purged by purge_content_cache
+CONTENT_CACHE_DIR = config('CONTENT_CACHE_DIR', default=str(BASE_DIR / 'cache'))
+CONTENT_CACHE_MAX_AGE_DAYS = config('CONTENT_CACHE_MAX_AGE_DAYS', default=30, cast=int)
+CONTENT_CACHE_MAX_BYTES = config('CONTENT_CACHE_MAX_BYTES', default=512 * 1024 * 1024, cast=int)
+QR_CACHE_MAX_ITEMS = config('QR_CACHE_MAX_ITEMS', default=256, cast=int)
+PDF_CACHE_MAX_ITEMS = config('PDF_CACHE_MAX_ITEMS', default=64, cast=int)
+
+# Month-end receipt archives (generate_receipt_archive): personal data, never under MEDIA_ROOT
+RECEIPT_ARCHIVE_DIR = config('RECEIPT_ARCHIVE_DIR', default=str(BASE_DIR / 'receipt_archives'))
+
+# PDF rendering pool (core.utils.pdf_service), one per web worker process; 0 workers
+# renders in the request. Web workers x PDF_RENDER_WORKERS should not exceed the CPUs
+PDF_RENDER_WORKERS = config('PDF_RENDER_WORKERS', default=2, cast=int)
+PDF_RENDER_MAX_QUEUE = config('PDF_RENDER_MAX_QUEUE', default=32, cast=int)
+PDF_RENDER_TIMEOUT = config('PDF_RENDER_TIMEOUT', default=15, cast=float)
+# Consular card numbers reserved per process and per allocation (users.utils)
+CONSULAR_CARD_BLOCK_SIZE = config('CONSULAR_CARD_BLOCK_SIZE', default=20, cast=int)
+# Full-text search (core.search): most recent matches returned per query
+SEARCH_MAX_RESULTS = config('SEARCH_MAX_RESULTS', default=200, cast=int)
+# Seconds an authenticated user stays cached between API calls (core.authentication)
+JWT_USER_CACHE_TTL = config('JWT_USER_CACHE_TTL', default=60, cast=int)
+# Attempts before an outbox message (core.outbox) is left as failed
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+# Sub-requests accepted in one call of the batch endpoint (core.batch)
+BATCH_MAX_REQUESTS = config('BATCH_MAX_REQUESTS', default=20, cast=int)
+# Delta sync (core.sync): ids returned per source and call, days deletions are kept
+SYNC_MAX_CHANGES = config('SYNC_MAX_CHANGES', default=500, cast=int)
+SYNC_TOMBSTONE_DAYS = config('SYNC_TOMBSTONE_DAYS', default=90, cast=int)
 
 # Sentry (Monitoring)
 SENTRY_DSN = config('SENTRY_DSN', default='')
@@ -350,6 +409,13 @@ ENCRYPTION_KEY = config('ENCRYPTION_KEY', default='')
 if not ENCRYPTION_KEY and not DEBUG:
     raise ValueError("ENCRYPTION_KEY doit être défini en production")
 
+# Blind index key: HMAC of encrypted identity numbers for exact-match lookups
+# (core.encrypted_fields). Distinct from ENCRYPTION_KEY; changing it requires
+# manage.py rebuild_blind_indexes
+BLIND_INDEX_KEY = config('BLIND_INDEX_KEY', default='')
+if not BLIND_INDEX_KEY and not DEBUG:
+    raise ValueError("BLIND_INDEX_KEY doit être défini en production")
+
 # Permissions Policy (Feature Policy) - Headers de sécurité
 # Contrôle quelles fonctionnalités du navigateur peuvent être utilisées
 PERMISSIONS_POLICY = {
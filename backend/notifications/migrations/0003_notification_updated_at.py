@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-19 15:08
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Existing notifications last changed, at the latest, when they were read
+    Notification = apps.get_model("notifications", "Notification")
+    Notification.objects.update(
+        updated_at=Coalesce("read_at", "sent_at", "created_at")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["recipient", "updated_at"],
+                name="notificatio_recipie_96a518_idx",
+            ),
+        ),
+    ]
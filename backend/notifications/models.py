@@ -116,6 +116,7 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     sent_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Envoyé le'))
     read_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Lu le'))
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = _('Notification')
@@ -124,6 +125,7 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['recipient', 'status', '-created_at']),
             models.Index(fields=['channel', 'status']),
+            models.Index(fields=['recipient', 'updated_at']),
         ]
     
     def __str__(self):
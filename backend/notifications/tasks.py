@@ -321,6 +321,93 @@ def notify_application_status_changed(application_id):
         logger.error(f"Error in notify_application_status_changed: {e}")
 
 
+# Rows per batched notification job, so a job stays within the cluster timeout
+NOTIFICATION_BATCH_SIZE = 50
+
+
+def enqueue_in_batches(task, ids):
+    """Queue ``task`` once per NOTIFICATION_BATCH_SIZE ids"""
+    ids = list(ids)
+    for start in range(0, len(ids), NOTIFICATION_BATCH_SIZE):
+        async_task(task, ids[start:start + NOTIFICATION_BATCH_SIZE])
+
+
+def notify_application_status_changed_batch(application_ids):
+    """Notify the applicants of many status changes at once (admin bulk actions)"""
+    from applications.models import Application
+
+    notifications = []
+    for application in Application.objects.filter(id__in=application_ids).select_related('applicant'):
+        user = application.applicant
+        context = {
+            'user': user,
+            'application': application,
+            'site_name': 'Ambassade du Congo'
+        }
+        send_email_notification(
+            user.email,
+            f'Mise à jour de votre demande {application.reference_number}',
+            'application_status_changed',
+            context
+        )
+        send_push_notification(
+            user,
+            'Mise à jour de demande',
+            f'Statut: {application.get_status_display()}',
+            {'type': 'application', 'id': str(application.id)}
+        )
+        notifications.append(Notification(
+            recipient=user,
+            channel='IN_APP',
+            title='Mise à jour de demande',
+            message=f'Votre demande {application.reference_number} a été mise à jour. Statut: {application.get_status_display()}',
+            notification_type='APPLICATION',
+            related_object_type='application',
+            related_object_id=str(application.id),
+            status='SENT'
+        ))
+    Notification.objects.bulk_create(notifications)
+    logger.info(f"{len(notifications)} notification(s) de changement de statut de demande envoyée(s)")
+
+
+def notify_appointment_status_changed_batch(appointment_ids):
+    """Notify the users of many appointment status changes at once (admin bulk actions)"""
+    from appointments.models import Appointment
+
+    notifications = []
+    for appointment in Appointment.objects.filter(id__in=appointment_ids).select_related('user'):
+        user = appointment.user
+        context = {
+            'user': user,
+            'appointment': appointment,
+            'site_name': 'Ambassade du Congo'
+        }
+        send_email_notification(
+            user.email,
+            f"Mise à jour de votre rendez-vous {appointment.reference_number}",
+            'appointment_status_changed',
+            context
+        )
+        send_push_notification(
+            user,
+            'Mise à jour de rendez-vous',
+            f"Statut: {appointment.get_status_display()}",
+            {'type': 'appointment', 'id': str(appointment.id)}
+        )
+        notifications.append(Notification(
+            recipient=user,
+            channel='IN_APP',
+            title='Mise à jour de rendez-vous',
+            message=f"Votre rendez-vous {appointment.reference_number} a été mis à jour. Statut: {appointment.get_status_display()}",
+            notification_type='APPOINTMENT',
+            related_object_type='appointment',
+            related_object_id=str(appointment.id),
+            status='SENT'
+        ))
+    Notification.objects.bulk_create(notifications)
+    logger.info(f"{len(notifications)} notification(s) de changement de statut de rendez-vous envoyée(s)")
+
+
 def notify_payment_received(payment_id):
     """Send notification for successful payment"""
     from payments.models import Payment
@@ -289,7 +289,9 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
             status__in=[Notification.Status.SENT, Notification.Status.DELIVERED]
         ).update(
             status=Notification.Status.READ,
-            read_at=timezone.now()
+            read_at=timezone.now(),
+            # update() skips auto_now: the delta sync API reads this column
+            updated_at=timezone.now()
         )
         return Response({
             'message': f'{count} notification(s) marquée(s) comme lue(s)',
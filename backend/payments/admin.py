@@ -1,10 +1,17 @@
 """
 Admin interface for Payments
 """
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
+from django.utils import timezone
+from django.http import FileResponse
+import os
+import shutil
+import tempfile
+from core.utils.pdf_service import PDFRenderUnavailable
 from .models import Payment, Refund
+from .receipts import write_receipt_archive
 
 
 @admin.register(Payment)
@@ -43,7 +50,7 @@ class PaymentAdmin(admin.ModelAdmin):
         }),
     )
     
-    actions = ['mark_as_completed', 'mark_as_failed']
+    actions = ['mark_as_completed', 'mark_as_failed', 'download_receipts_zip']
     
     def user_name(self, obj):
         return obj.user.get_full_name()
@@ -72,14 +79,36 @@ class PaymentAdmin(admin.ModelAdmin):
     
     @admin.action(description=_('Marquer comme terminé'))
     def mark_as_completed(self, request, queryset):
-        from django.utils import timezone
-        updated = queryset.update(status='COMPLETED', completed_at=timezone.now())
+        updated = queryset.update(status='COMPLETED', completed_at=timezone.now(), updated_at=timezone.now())
         self.message_user(request, f'{updated} paiement(s) terminé(s).')
     
     @admin.action(description=_('Marquer comme échoué'))
     def mark_as_failed(self, request, queryset):
-        updated = queryset.update(status='FAILED')
+        updated = queryset.update(status='FAILED', updated_at=timezone.now())
         self.message_user(request, f'{updated} paiement(s) échoué(s).')
+    
+    @admin.action(description=_('Télécharger les reçus (ZIP)'))
+    def download_receipts_zip(self, request, queryset):
+        payments = queryset.filter(status=Payment.Status.COMPLETED).select_related(
+            'application', 'user'
+        ).order_by('id')
+        if not payments.exists():
+            self.message_user(request, 'Aucun paiement terminé dans la sélection.', level=messages.WARNING)
+            return None
+
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'recus.zip')
+        try:
+            # Chunked through the shared pool's queue limit; a busy pool refuses the export
+            write_receipt_archive(path, payments)
+            archive = open(path, 'rb')
+        except PDFRenderUnavailable as e:
+            self.message_user(request, str(e), level=messages.ERROR)
+            return None
+        finally:
+            # The open handle keeps the data readable until the response is sent
+            shutil.rmtree(directory, ignore_errors=True)
+        return FileResponse(archive, as_attachment=True, filename='recus.zip')
 
 
 @admin.register(Refund)
@@ -0,0 +1,95 @@
+"""
+Management command to bundle a month's payment receipts into one ZIP
+Usage: python manage.py generate_receipt_archive [--month 2026-09 | --start 2026-09-01 --end 2026-09-30]
+                                                 [--output recus.zip] [--workers 2] [--chunk-size 100]
+
+The archives hold every beneficiary's name, transaction id and amount: they
+are written to RECEIPT_ARCHIVE_DIR and never under the publicly served
+MEDIA_ROOT.
+"""
+import calendar
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.utils.pdf_service import PDFRenderService
+from payments.receipts import RECEIPT_CHUNK_SIZE, completed_payments, write_receipt_archive
+
+
+class Command(BaseCommand):
+    help = 'Génère l\'archive ZIP des reçus des paiements terminés sur une période (mois précédent par défaut)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Mois à archiver (AAAA-MM)')
+        parser.add_argument('--start', help='Premier jour de la période (AAAA-MM-JJ)')
+        parser.add_argument('--end', help='Dernier jour de la période (AAAA-MM-JJ)')
+        parser.add_argument(
+            '--output',
+            help='Fichier ZIP à créer ou compléter, hors de MEDIA_ROOT '
+                 '(défaut: RECEIPT_ARCHIVE_DIR/recus_<période>.zip)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=max(settings.PDF_RENDER_WORKERS, 1),
+            help='Nombre de processus de rendu PDF (au plus le nombre de processeurs)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=RECEIPT_CHUNK_SIZE,
+            help='Nombre de reçus lus et rendus par lot',
+        )
+
+    def get_period(self, options):
+        try:
+            if options['month']:
+                first = datetime.strptime(options['month'], '%Y-%m').date()
+                return first, first.replace(day=calendar.monthrange(first.year, first.month)[1])
+            if options['start'] or options['end']:
+                if not (options['start'] and options['end']):
+                    raise CommandError('--start et --end doivent être fournis ensemble.')
+                return (
+                    datetime.strptime(options['start'], '%Y-%m-%d').date(),
+                    datetime.strptime(options['end'], '%Y-%m-%d').date(),
+                )
+        except ValueError:
+            raise CommandError('Format de date invalide.')
+
+        last = timezone.localdate().replace(day=1) - timedelta(days=1)
+        return last.replace(day=1), last
+
+    def handle(self, *args, **options):
+        start, end = self.get_period(options)
+        if start > end:
+            raise CommandError('La date de début doit précéder la date de fin.')
+
+        if options['output']:
+            path = Path(options['output'])
+        else:
+            label = f'{start:%Y-%m}' if (start.day == 1 and end == date(
+                start.year, start.month, calendar.monthrange(start.year, start.month)[1]
+            )) else f'{start:%Y%m%d}-{end:%Y%m%d}'
+            path = Path(settings.RECEIPT_ARCHIVE_DIR) / f'recus_{label}.zip'
+        media_root = Path(settings.MEDIA_ROOT).resolve()
+        if path.resolve() == media_root or media_root in path.resolve().parents:
+            raise CommandError('L\'archive ne peut pas être écrite sous MEDIA_ROOT, qui est servi publiquement.')
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Runs next to the web workers' own pools: never more processes than CPUs
+        workers = max(1, min(options['workers'], os.cpu_count() or 1))
+        service = PDFRenderService(workers=workers, max_queue=options['chunk_size'], timeout=None)
+        try:
+            added, skipped = write_receipt_archive(
+                path, completed_payments(start, end), chunk_size=options['chunk_size'], service=service
+            )
+        finally:
+            service.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{path}: {added} reçu(s) ajouté(s), {skipped} déjà présent(s).'
+        ))
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.11 on 2026-10-19 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["user", "updated_at"], name="payments_pa_user_id_0d5f4a_idx"
+            ),
+        ),
+    ]
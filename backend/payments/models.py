@@ -122,6 +122,7 @@ class Payment(models.Model):
             models.Index(fields=['status', '-created_at']),
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['transaction_id']),
+            models.Index(fields=['user', 'updated_at']),
         ]
     
     def __str__(self):
@@ -0,0 +1,76 @@
+"""
+Month-end receipt archives for accounting
+
+Receipts of COMPLETED payments are read in chunks, rendered in parallel by
+the PDF process pool (reusing any receipt already in the PDF cache) and
+appended to a ZIP file. The archive is closed after every chunk, so memory
+stays bounded by the chunk size and an interrupted run keeps what it wrote.
+Reruns skip receipts already present in the archive.
+"""
+import logging
+import zipfile
+
+from core.utils.pdf_generator import get_cached_pdfs, receipt_context
+
+from .models import Payment
+
+logger = logging.getLogger('embassy')
+
+RECEIPT_CHUNK_SIZE = 100
+
+
+def receipt_filename(payment):
+    return f"recu_{payment.receipt_number or payment.transaction_id}.pdf"
+
+
+def completed_payments(start, end):
+    """COMPLETED payments whose completion date falls in ``[start, end]``"""
+    return (
+        Payment.objects.filter(status=Payment.Status.COMPLETED, completed_at__date__range=(start, end))
+        .select_related('application', 'user')
+        .order_by('id')
+    )
+
+
+def _archived_names(path):
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return set(archive.namelist())
+    except FileNotFoundError:
+        return set()
+
+
+def write_receipt_archive(path, payments, chunk_size=RECEIPT_CHUNK_SIZE, service=None):
+    """
+    Append the receipts of ``payments`` missing from the ZIP at ``path``
+
+    Returns ``(added, skipped)``.
+    """
+    done = _archived_names(path)
+    added = skipped = 0
+    chunk = []
+
+    def flush():
+        nonlocal added
+        contexts = [receipt_context(payment) for payment in chunk]
+        rendered = get_cached_pdfs('receipt', contexts, service=service)
+        with zipfile.ZipFile(path, 'a', compression=zipfile.ZIP_DEFLATED) as archive:
+            for payment, (_, pdf) in zip(chunk, rendered):
+                archive.writestr(receipt_filename(payment), pdf)
+        added += len(chunk)
+        chunk.clear()
+
+    for payment in payments.iterator(chunk_size=chunk_size):
+        name = receipt_filename(payment)
+        if name in done:
+            skipped += 1
+            continue
+        done.add(name)
+        chunk.append(payment)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    logger.info(f"Archive des reçus {path}: {added} ajouté(s), {skipped} déjà présent(s)")
+    return added, skipped
@@ -1,7 +1,9 @@
 """
 Tests for Payments app
 """
-from django.test import TestCase
+import tempfile
+from unittest import mock
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from .models import Payment, Refund
 from applications.models import Application
@@ -79,6 +81,56 @@ class PaymentModelTest(TestCase):
         payment = Payment.objects.get(id=self.payment.id)
         self.assertTrue(payment.is_successful)
 
+    def test_download_receipt_is_rendered_once(self):
+        """Test repeat receipt downloads are served from the PDF cache"""
+        from rest_framework.test import APIClient
+        from core.utils import pdf_generator, pdf_service
+
+        self.payment.status = 'COMPLETED'
+        self.payment.save()
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = f'/api/payments/{self.payment.pk}/download_receipt/'
+        render = mock.Mock(wraps=pdf_generator.render_receipt)
+
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CONTENT_CACHE_DIR=cache_dir), \
+                mock.patch.dict(pdf_generator.RENDERERS, {'receipt': render}), \
+                mock.patch.object(pdf_service, '_service', pdf_service.PDFRenderService(0, 1, 5)):
+            pdf_generator._pdf_cache.clear_memory()
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.content.startswith(b'%PDF'))
+            etag = response['ETag']
+
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['ETag'], etag)
+            self.assertEqual(render.call_count, 1)
+
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+
+    def test_admin_status_actions(self):
+        """Test the admin actions mark payments and stamp updated_at"""
+        from django.contrib.admin.sites import site
+        from django.test import RequestFactory
+
+        payment_admin = site._registry[Payment]
+        request = RequestFactory().post('/admin/payments/payment/')
+        before = Payment.objects.get(pk=self.payment.pk).updated_at
+        with mock.patch.object(payment_admin, 'message_user'):
+            payment_admin.mark_as_failed(request, Payment.objects.filter(pk=self.payment.pk))
+            self.payment.refresh_from_db()
+            self.assertEqual(self.payment.status, 'FAILED')
+            self.assertGreater(self.payment.updated_at, before)
+
+            payment_admin.mark_as_completed(request, Payment.objects.filter(pk=self.payment.pk))
+            self.payment.refresh_from_db()
+            self.assertEqual(self.payment.status, 'COMPLETED')
+            self.assertIsNotNone(self.payment.completed_at)
+
 
 class RefundModelTest(TestCase):
     """Test Refund model"""
@@ -139,3 +191,91 @@ class RefundModelTest(TestCase):
         """Test __str__ method"""
         self.assertIn('XOF', str(self.refund))
 
+
+
+class ReceiptArchiveTest(TestCase):
+    """Test the month-end receipt archive"""
+
+    def setUp(self):
+        from django.utils import timezone
+
+        self.user = User.objects.create_user(
+            username="finance",
+            email="finance@example.com",
+            password="testpass123"
+        )
+        office = ConsularOffice.objects.create(
+            name="Test Embassy",
+            office_type="EMBASSY",
+            address_line1="123 Test St",
+            city="Dakar",
+            country="Sénégal",
+            phone_primary="+221123456789",
+            email="test@embassy.com",
+        )
+        service = ServiceType.objects.create(name="Test Service", category="VISA", base_fee=50000)
+        application = Application.objects.create(
+            application_type="VISA",
+            service_type=service,
+            applicant=self.user,
+            office=office,
+            base_fee=50000,
+        )
+        self.payments = [
+            Payment.objects.create(
+                application=application,
+                user=self.user,
+                amount=50000,
+                payment_method='CASH',
+                status='COMPLETED',
+                completed_at=timezone.now(),
+            )
+            for _ in range(3)
+        ]
+        Payment.objects.create(application=application, user=self.user, amount=50000, payment_method='CASH')
+        self.today = timezone.localdate()
+
+    def test_archive_is_incremental(self):
+        """Test reruns only add receipts missing from the archive"""
+        import os
+        import zipfile
+        from core.utils.pdf_service import PDFRenderService
+        from .receipts import completed_payments, receipt_filename, write_receipt_archive
+
+        service = PDFRenderService(workers=0, max_queue=1, timeout=None)
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CONTENT_CACHE_DIR=cache_dir):
+            path = os.path.join(cache_dir, 'recus.zip')
+            payments = completed_payments(self.today, self.today)
+            self.assertEqual(payments.count(), 3)
+
+            first = payments.filter(id=self.payments[0].id)
+            self.assertEqual(write_receipt_archive(path, first, service=service), (1, 0))
+            self.assertEqual(write_receipt_archive(path, payments, chunk_size=1, service=service), (2, 1))
+
+            with zipfile.ZipFile(path) as archive:
+                self.assertEqual(
+                    sorted(archive.namelist()),
+                    sorted(receipt_filename(payment) for payment in self.payments),
+                )
+                self.assertTrue(archive.read(receipt_filename(self.payments[0])).startswith(b'%PDF'))
+
+    def test_command_keeps_archives_out_of_media(self):
+        """Test the command writes to RECEIPT_ARCHIVE_DIR and refuses paths under MEDIA_ROOT"""
+        import io
+        import os
+        from django.core.management import CommandError, call_command
+
+        month = f'{self.today:%Y-%m}'
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            MEDIA_ROOT=os.path.join(root, 'media'),
+            RECEIPT_ARCHIVE_DIR=os.path.join(root, 'archives'),
+            CONTENT_CACHE_DIR=os.path.join(root, 'cache'),
+        ):
+            with self.assertRaises(CommandError):
+                call_command('generate_receipt_archive', month=month,
+                             output=os.path.join(root, 'media', 'receipts', 'recus.zip'))
+
+            call_command('generate_receipt_archive', month=month, workers=1, stdout=io.StringIO())
+            self.assertEqual(os.listdir(os.path.join(root, 'archives')), [f'recus_{month}.zip'])
+            self.assertFalse(os.path.exists(os.path.join(root, 'media')))
+
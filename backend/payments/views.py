@@ -9,15 +9,18 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.contenttypes.models import ContentType
 from django.conf import settings
 from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
 import stripe
 
 from .models import Payment, Refund
+from .receipts import receipt_filename
 from .serializers import (
     PaymentSerializer, PaymentCreateSerializer,
     RefundSerializer, RefundRequestSerializer
 )
 from core.models import AuditLog, SiteSettings
-from core.utils.pdf_generator import generate_receipt_pdf
+from core.utils.pdf_generator import get_receipt_pdf
+from core.utils.pdf_service import PDFRenderUnavailable
 
 # Configure Stripe
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -186,13 +189,24 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Generate PDF
-        pdf_buffer = generate_receipt_pdf(payment)
+        # Rendered once per receipt content, then served from the PDF cache
+        try:
+            key, pdf = get_receipt_pdf(payment)
+        except PDFRenderUnavailable as e:
+            response = Response({"error": str(e)}, status=e.status_code)
+            response['Retry-After'] = '5'
+            return response
+        etag = f'"{key}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
         
         # Create response
-        response = HttpResponse(pdf_buffer, content_type='application/pdf')
-        filename = f"recu_{payment.receipt_number or payment.transaction_id}.pdf"
+        response = HttpResponse(pdf, content_type='application/pdf')
+        filename = receipt_filename(payment)
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
         
         # Log download
         AuditLog.objects.create(
@@ -3,6 +3,7 @@ Admin interface for User management
 """
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse
 from django.utils.html import format_html
@@ -10,12 +11,32 @@ from django_otp import user_has_device
 from .models import User, Profile, EmailVerificationCode, UserDocument, DocumentReminder
 
 
+class BlindIndexSearchMixin:
+    """
+    Admin search that first tries the search term as an encrypted identity
+    number (exact match through its blind index, core.encrypted_fields)
+    """
+    blind_search_fields = ()
+    
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if term and self.blind_search_fields:
+            condition = Q()
+            for name in self.blind_search_fields:
+                condition |= Q(**{f'{name}__blind': term})
+            matches = queryset.filter(condition)
+            if matches.exists():
+                return matches, False
+        return super().get_search_results(request, queryset, search_term)
+
+
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(BlindIndexSearchMixin, BaseUserAdmin):
     """Custom User Admin with role management"""
     list_display = ['email', 'username', 'first_name', 'last_name', 'role', 'is_verified', 'is_active', 'date_joined', 'get_2fa_status']
     list_filter = ['role', 'is_verified', 'is_active', 'is_2fa_enabled', 'date_joined']
     search_fields = ['email', 'username', 'first_name', 'last_name']
+    blind_search_fields = ['consular_card_number']
     ordering = ['-date_joined']
     
     fieldsets = BaseUserAdmin.fieldsets + (
@@ -59,11 +80,13 @@ class UserAdmin(BaseUserAdmin):
 
 
 @admin.register(Profile)
-class ProfileAdmin(admin.ModelAdmin):
+class ProfileAdmin(BlindIndexSearchMixin, admin.ModelAdmin):
     """Profile Admin"""
     list_display = ['user', 'nationality', 'consular_number', 'passport_number', 'documents_complete', 'updated_at']
     list_filter = ['nationality', 'documents_complete', 'gender']
-    search_fields = ['user__email', 'user__first_name', 'user__last_name', 'consular_number', 'passport_number']
+    # Encrypted numbers cannot be matched with LIKE: they are searched through their blind index
+    search_fields = ['user__email', 'user__first_name', 'user__last_name']
+    blind_search_fields = Profile.BLIND_INDEXED_FIELDS
     readonly_fields = ['created_at', 'updated_at']
     
     fieldsets = (
@@ -105,12 +128,28 @@ class EmailVerificationCodeAdmin(admin.ModelAdmin):
 @admin.register(UserDocument)
 class UserDocumentAdmin(admin.ModelAdmin):
     """User Document Admin"""
-    list_display = ['name', 'user', 'document_type', 'upload_date', 'expiry_date', 'status', 'is_verified']
+    list_display = ['thumbnail_display', 'name', 'user', 'document_type', 'upload_date', 'expiry_date', 'status', 'is_verified']
     list_filter = ['document_type', 'is_verified', 'upload_date', 'expiry_date']
     search_fields = ['name', 'user__email', 'user__first_name', 'user__last_name']
-    readonly_fields = ['upload_date', 'status']
+    readonly_fields = ['upload_date', 'status', 'preview_display']
     ordering = ['-upload_date']
     
+    def thumbnail_display(self, obj):
+        if obj.thumbnail:
+            return format_html('<img src="{}" style="max-height: 48px;" loading="lazy" />', obj.thumbnail.url)
+        return '-'
+    thumbnail_display.short_description = _('Aperçu')
+    
+    def preview_display(self, obj):
+        """Size-capped preview instead of the full-size original"""
+        if obj.preview:
+            return format_html(
+                '<a href="{}" target="_blank"><img src="{}" style="max-width: 320px;" /></a>',
+                obj.preview.url, obj.thumbnail.url if obj.thumbnail else obj.preview.url
+            )
+        return _('Aperçu non disponible')
+    preview_display.short_description = _('Aperçu')
+    
     def status(self, obj):
         return obj.status
     status.short_description = 'Statut'
@@ -0,0 +1,227 @@
+"""
+Document expiry index
+
+Each dated document of a user (passport, ID card and driving license of the
+profile, every UserDocument with an expiry date) has one DocumentExpiry row
+holding its expiry date and bucket (expired, 3, 7, 30 days, later). Rows
+are written when the profile or the document is saved (users.signals) and
+moved between buckets every night by ``refresh_buckets``, one UPDATE per
+bucket.
+
+``document_reminders`` reads a user's rows due within 30 days in a single
+indexed query; the nightly sweep picks the documents due within 3 days by
+bucket instead of scanning every document.
+"""
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from .models import DocumentExpiry, Profile, UserDocument
+
+REMINDER_HORIZON_DAYS = 30
+
+# Bucket of the documents expiring within each number of days, from the nearest
+BUCKET_LIMITS = [
+    (DocumentExpiry.Bucket.EXPIRED, 0),
+    (DocumentExpiry.Bucket.DAYS_3, 3),
+    (DocumentExpiry.Bucket.DAYS_7, 7),
+    (DocumentExpiry.Bucket.DAYS_30, REMINDER_HORIZON_DAYS),
+]
+
+# Profile field -> (source, document name)
+PROFILE_SOURCES = {
+    'passport_expiry': (DocumentExpiry.Source.PASSPORT, 'Passeport'),
+    'id_card_expiry': (DocumentExpiry.Source.ID_CARD, 'Carte d\'identité'),
+    'driving_license_expiry': (DocumentExpiry.Source.DRIVING_LICENSE, 'Permis de conduire'),
+}
+
+PRIORITY_ORDER = {'URGENT': 0, 'HIGH': 1, 'MEDIUM': 2}
+
+
+def bucket_for(expiry_date, today=None):
+    days = (expiry_date - (today or date.today())).days
+    for bucket, limit in BUCKET_LIMITS:
+        if days <= limit:
+            return bucket
+    return DocumentExpiry.Bucket.LATER
+
+
+def _profile_entries(profile, today):
+    for field, (source, name) in PROFILE_SOURCES.items():
+        expiry_date = getattr(profile, field)
+        if expiry_date:
+            yield DocumentExpiry(
+                user_id=profile.user_id,
+                source=source,
+                name=name,
+                expiry_date=expiry_date,
+                bucket=bucket_for(expiry_date, today),
+            )
+
+
+def _document_entry(document, today):
+    return DocumentExpiry(
+        user_id=document.user_id,
+        source=DocumentExpiry.Source.USER_DOCUMENT,
+        user_document_id=document.pk,
+        name=document.name,
+        document_type=document.document_type,
+        expiry_date=document.expiry_date,
+        bucket=bucket_for(document.expiry_date, today),
+    )
+
+
+def sync_profile_expiries(profile):
+    """Bring the rows of the profile's three expiry dates in line with ``profile``"""
+    today = date.today()
+    existing = {
+        entry.source: entry
+        for entry in DocumentExpiry.objects.filter(user_id=profile.user_id, user_document__isnull=True)
+    }
+    created, updated = [], []
+    for entry in _profile_entries(profile, today):
+        current = existing.pop(entry.source, None)
+        if current is None:
+            created.append(entry)
+        elif (current.expiry_date, current.bucket) != (entry.expiry_date, entry.bucket):
+            current.expiry_date, current.bucket = entry.expiry_date, entry.bucket
+            updated.append(current)
+    if created:
+        DocumentExpiry.objects.bulk_create(created)
+    if updated:
+        DocumentExpiry.objects.bulk_update(updated, ['expiry_date', 'bucket'])
+    if existing:
+        # Dates cleared on the profile
+        DocumentExpiry.objects.filter(pk__in=[entry.pk for entry in existing.values()]).delete()
+
+
+def sync_document_expiry(document):
+    """Write (or remove) the row of a UserDocument"""
+    if not document.expiry_date:
+        DocumentExpiry.objects.filter(user_document_id=document.pk).delete()
+        return
+    entry = _document_entry(document, date.today())
+    DocumentExpiry.objects.update_or_create(
+        user_document_id=document.pk,
+        defaults={
+            field: getattr(entry, field)
+            for field in ('user_id', 'source', 'name', 'document_type', 'expiry_date', 'bucket')
+        },
+    )
+
+
+def refresh_buckets(today=None):
+    """Move the rows whose bucket changed since they were written; returns the count"""
+    today = today or date.today()
+    moved = 0
+    lower = None
+    for bucket, limit in BUCKET_LIMITS + [(DocumentExpiry.Bucket.LATER, None)]:
+        rows = DocumentExpiry.objects.exclude(bucket=bucket)
+        if lower is not None:
+            rows = rows.filter(expiry_date__gt=today + timedelta(days=lower))
+        if limit is not None:
+            rows = rows.filter(expiry_date__lte=today + timedelta(days=limit))
+        moved += rows.update(bucket=bucket)
+        lower = limit
+    return moved
+
+
+def rebuild_expiry_index(batch_size=1000):
+    """
+    Recreate every row from the profiles and documents; returns the count
+
+    Runs in one transaction, so a concurrent sweep never reads an empty or
+    partial index.
+    """
+    today = date.today()
+    count = 0
+    batch = []
+    profiles = Profile.objects.exclude(
+        passport_expiry=None, id_card_expiry=None, driving_license_expiry=None
+    ).only('user_id', *PROFILE_SOURCES)
+    documents = UserDocument.objects.exclude(expiry_date=None).only(
+        'user_id', 'name', 'document_type', 'expiry_date'
+    )
+    with transaction.atomic():
+        DocumentExpiry.objects.all().delete()
+        for entries in (
+            (entry for profile in profiles.iterator(chunk_size=batch_size)
+             for entry in _profile_entries(profile, today)),
+            (_document_entry(document, today) for document in documents.iterator(chunk_size=batch_size)),
+        ):
+            for entry in entries:
+                batch.append(entry)
+                if len(batch) >= batch_size:
+                    count += len(DocumentExpiry.objects.bulk_create(batch))
+                    batch = []
+        if batch:
+            count += len(DocumentExpiry.objects.bulk_create(batch))
+    return count
+
+
+def _profile_reminder(entry, days):
+    name = entry.name.lower()
+    if days <= 0:
+        return {
+            'type': f'{entry.source}_EXPIRED',
+            'message': f'Votre {name} a expiré le {entry.expiry_date.strftime("%d/%m/%Y")}',
+            'priority': 'URGENT',
+            'action_required': 'Renouveler immédiatement',
+        }
+    if days <= 7:
+        return {
+            'type': f'{entry.source}_EXPIRING_SOON',
+            'message': f'Votre {name} expire dans {days} jours',
+            'priority': 'HIGH',
+            'action_required': 'Renouveler rapidement',
+        }
+    return {
+        'type': f'{entry.source}_EXPIRING',
+        'message': f'Votre {name} expire dans {days} jours',
+        'priority': 'MEDIUM',
+        'action_required': 'Planifier le renouvellement',
+    }
+
+
+def _document_reminder(entry, days):
+    document_type = entry.document_type.upper()
+    name = entry.name.lower()
+    if days <= 0:
+        return {
+            'id': f'doc_{entry.user_document_id}_expired',
+            'type': f'DOCUMENT_EXPIRED_{document_type}',
+            'message': f'Votre {name} a expiré le {entry.expiry_date.strftime("%d/%m/%Y")}',
+            'priority': 'URGENT',
+            'action_required': 'Renouveler immédiatement',
+        }
+    if days <= 3:
+        reminder = {'type': f'DOCUMENT_EXPIRING_SOON_{document_type}', 'priority': 'URGENT',
+                    'action_required': 'Renouveler rapidement'}
+    elif days <= 7:
+        reminder = {'type': f'DOCUMENT_EXPIRING_HIGH_{document_type}', 'priority': 'HIGH',
+                    'action_required': 'Planifier le renouvellement'}
+    else:
+        reminder = {'type': f'DOCUMENT_EXPIRING_{document_type}', 'priority': 'MEDIUM',
+                    'action_required': 'Planifier le renouvellement'}
+    reminder['message'] = f'Votre {name} expire dans {days} jours'
+    return reminder
+
+
+def user_reminders(user, today=None):
+    """Reminders of the user's documents expiring within 30 days, most urgent first"""
+    today = today or date.today()
+    entries = DocumentExpiry.objects.filter(
+        user=user, expiry_date__lte=today + timedelta(days=REMINDER_HORIZON_DAYS)
+    ).order_by('expiry_date', 'id')
+    reminders = []
+    for entry in entries:
+        days = (entry.expiry_date - today).days
+        if entry.user_document_id:
+            reminder = _document_reminder(entry, days)
+            reminder['document_type'] = entry.document_type
+        else:
+            reminder = _profile_reminder(entry, days)
+        reminder.update(document=entry.name, expiry_date=entry.expiry_date, days_remaining=days)
+        reminders.append(reminder)
+    reminders.sort(key=lambda reminder: PRIORITY_ORDER[reminder['priority']])
+    return reminders
@@ -1,10 +1,10 @@
 """
 Management command to generate consular card numbers for existing users
-Usage: python manage.py generate_consular_numbers
+Usage: python manage.py generate_consular_numbers [--dry-run] [--batch-size 500]
 """
 from django.core.management.base import BaseCommand
 from users.models import User
-from users.utils import assign_consular_card_number
+from users.utils import assign_consular_card_numbers
 
 
 class Command(BaseCommand):
@@ -16,6 +16,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Affiche ce qui serait fait sans modifier la base de données',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Nombre de numéros alloués et enregistrés par lot',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
@@ -45,23 +51,27 @@ class Command(BaseCommand):
         generated_count = 0
         errors = []
         
-        for user in users_without_number:
-            try:
-                if not dry_run:
-                    consular_number = assign_consular_card_number(user)
+        user_ids = list(users_without_number.order_by('pk').values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        for offset in range(0, len(user_ids), batch_size):
+            batch = list(User.objects.filter(pk__in=user_ids[offset:offset + batch_size]).order_by('pk'))
+            if dry_run:
+                # En mode dry-run, ne rien réserver dans la séquence
+                for user in batch:
                     self.stdout.write(
-                        f'✓ Numéro {consular_number} assigné à {user.get_full_name()} ({user.email})'
+                        f'[DRY RUN] Un numéro serait assigné à {user.get_full_name()} ({user.email})'
                     )
-                else:
-                    # En mode dry-run, simuler la génération
-                    from users.utils import generate_consular_card_number
-                    consular_number = generate_consular_card_number()
+                generated_count += len(batch)
+                continue
+            try:
+                # Un bloc de numéros et une seule mise à jour par lot
+                for user in assign_consular_card_numbers(batch):
                     self.stdout.write(
-                        f'[DRY RUN] Numéro {consular_number} serait assigné à {user.get_full_name()} ({user.email})'
+                        f'✓ Numéro {user.consular_card_number} assigné à {user.get_full_name()} ({user.email})'
                     )
-                generated_count += 1
+                generated_count += len(batch)
             except Exception as e:
-                error_msg = f'Erreur pour {user.get_full_name()} ({user.email}): {str(e)}'
+                error_msg = f'Erreur pour le lot de {len(batch)} utilisateur(s): {str(e)}'
                 errors.append(error_msg)
                 self.stdout.write(self.style.ERROR(error_msg))
         
@@ -0,0 +1,30 @@
+"""
+Management command to recompute the blind indexes of encrypted identity numbers
+Run it once after deploying HMAC blind indexes, and after any change of BLIND_INDEX_KEY
+Usage: python manage.py rebuild_blind_indexes [--batch-size 500]
+"""
+from django.core.management.base import BaseCommand
+from core.encrypted_fields import rebuild_blind_indexes
+from users.models import User, Profile
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les index aveugles (HMAC) des numéros d\'identité chiffrés'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Nombre de lignes mises à jour par requête',
+        )
+
+    def handle(self, *args, **options):
+        for model, fields in ((User, ['consular_card_number']), (Profile, list(Profile.BLIND_INDEXED_FIELDS))):
+            count, duplicates = rebuild_blind_indexes(model, fields, batch_size=options['batch_size'])
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {count} ligne(s) indexée(s)')
+            for pk, field in duplicates:
+                self.stdout.write(self.style.WARNING(
+                    f'  {model._meta.verbose_name} {pk}: {field} en double, non indexé'
+                ))
+        self.stdout.write(self.style.SUCCESS('Index aveugles recalculés.'))
@@ -0,0 +1,24 @@
+"""
+Management command to rebuild the document expiry index from profiles and user documents
+Usage: python manage.py rebuild_expiry_index [--batch-size 1000]
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from users.expiry import rebuild_expiry_index
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index des échéances de documents (passeport, carte d'identité, permis, documents)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Nombre de lignes insérées par requête',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_expiry_index(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{count} échéance(s) indexée(s).'))
@@ -0,0 +1,35 @@
+# Recompute the *_hash columns as keyed HMAC blind indexes (core.encrypted_fields)
+
+import logging
+
+from django.db import migrations
+
+from core.encrypted_fields import rebuild_blind_indexes
+
+logger = logging.getLogger('embassy')
+
+PROFILE_FIELDS = [
+    'consular_number', 'passport_number', 'id_card_number',
+    'birth_certificate_number', 'driving_license_number',
+]
+
+
+def rebuild(apps, schema_editor):
+    for model, fields in (
+        (apps.get_model('users', 'User'), ['consular_card_number']),
+        (apps.get_model('users', 'Profile'), PROFILE_FIELDS),
+    ):
+        count, duplicates = rebuild_blind_indexes(model, fields)
+        for pk, field in duplicates:
+            logger.warning(f"{model.__name__} {pk}: {field} en double, non indexé")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0015_userdocument_preview_userdocument_thumbnail"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild, migrations.RunPython.noop),
+    ]
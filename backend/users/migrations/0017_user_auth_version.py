@@ -0,0 +1,20 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0016_hmac_blind_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="auth_version",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Version des jetons"
+            ),
+        ),
+    ]
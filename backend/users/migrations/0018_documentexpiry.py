@@ -0,0 +1,146 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:52
+
+from datetime import date
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+
+def build_index(apps, schema_editor):
+    from users.expiry import PROFILE_SOURCES, bucket_for
+
+    DocumentExpiry = apps.get_model('users', 'DocumentExpiry')
+    Profile = apps.get_model('users', 'Profile')
+    UserDocument = apps.get_model('users', 'UserDocument')
+    today = date.today()
+    entries = []
+    for profile in Profile.objects.exclude(
+        passport_expiry=None, id_card_expiry=None, driving_license_expiry=None
+    ).iterator():
+        for field, (source, name) in PROFILE_SOURCES.items():
+            expiry_date = getattr(profile, field)
+            if expiry_date:
+                entries.append(DocumentExpiry(
+                    user_id=profile.user_id, source=source, name=name,
+                    expiry_date=expiry_date, bucket=bucket_for(expiry_date, today),
+                ))
+    for document in UserDocument.objects.exclude(expiry_date=None).iterator():
+        entries.append(DocumentExpiry(
+            user_id=document.user_id, source='USER_DOCUMENT', user_document_id=document.pk,
+            name=document.name, document_type=document.document_type,
+            expiry_date=document.expiry_date, bucket=bucket_for(document.expiry_date, today),
+        ))
+    DocumentExpiry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0017_user_auth_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentExpiry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("PASSPORT", "Passeport"),
+                            ("ID_CARD", "Carte d'identité"),
+                            ("DRIVING_LICENSE", "Permis de conduire"),
+                            ("USER_DOCUMENT", "Document utilisateur"),
+                        ],
+                        max_length=20,
+                        verbose_name="Source",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=255, verbose_name="Nom du document"),
+                ),
+                (
+                    "document_type",
+                    models.CharField(
+                        blank=True, max_length=50, verbose_name="Type de document"
+                    ),
+                ),
+                ("expiry_date", models.DateField(verbose_name="Date d'expiration")),
+                (
+                    "bucket",
+                    models.CharField(
+                        choices=[
+                            ("EXPIRED", "Expiré"),
+                            ("DAYS_3", "Expire dans 3 jours ou moins"),
+                            ("DAYS_7", "Expire dans 7 jours ou moins"),
+                            ("DAYS_30", "Expire dans 30 jours ou moins"),
+                            ("LATER", "Plus tard"),
+                        ],
+                        max_length=10,
+                        verbose_name="Échéance",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="document_expiries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "user_document",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="expiry_entries",
+                        to="users.userdocument",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Échéance de document",
+                "verbose_name_plural": "Échéances de documents",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "expiry_date"],
+                        name="users_docum_user_id_b47c1e_idx",
+                    ),
+                    models.Index(
+                        fields=["bucket", "expiry_date"],
+                        name="users_docum_bucket_4e13da_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="documentexpiry",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("user_document__isnull", True)),
+                fields=("user", "source"),
+                name="users_documentexpiry_profile_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="documentexpiry",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("user_document__isnull", False)),
+                fields=("user_document",),
+                name="users_documentexpiry_document_unique",
+            ),
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
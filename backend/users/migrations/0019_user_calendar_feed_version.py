@@ -0,0 +1,20 @@
+# Generated by Django 4.2.11 on 2026-10-19 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0018_documentexpiry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="calendar_feed_version",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Version du lien calendrier"
+            ),
+        ),
+    ]
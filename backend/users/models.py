@@ -7,8 +7,9 @@ from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import RegexValidator, FileExtensionValidator
 from django.core.exceptions import ValidationError
-from core.encrypted_fields import EncryptedTextField
-import hashlib
+from core.dirty_fields import DirtyFieldsMixin
+from core.encrypted_fields import EncryptedTextField, set_blind_indexes
+from core.utils.images import derivative_upload_path
 from django.utils import timezone
 from datetime import timedelta
 import logging
@@ -16,7 +17,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-class User(AbstractUser):
+class User(DirtyFieldsMixin, AbstractUser):
     """
     Custom User model extending Django's AbstractUser
     Supports role-based access control
@@ -63,6 +64,12 @@ class User(AbstractUser):
     
     is_verified = models.BooleanField(default=False, verbose_name=_('Email vérifié'))
     is_2fa_enabled = models.BooleanField(default=False, verbose_name=_('2FA activé'))
+    # Incrémentée à chaque changement de rôle ou de statut: invalide les jetons émis avant
+    auth_version = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('Version des jetons'))
+    # Incrémentée pour régénérer le lien du calendrier: l'ancien lien cesse de fonctionner
+    calendar_feed_version = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name=_('Version du lien calendrier')
+    )
     
     username = models.CharField(
         _('username'),
@@ -109,14 +116,30 @@ class User(AbstractUser):
                     'consular_card_number': _('Une carte consulaire est requise pour ce rôle.')
                 })
     
+    # Changing one of these invalidates the tokens already issued (role claim, is_active)
+    TOKEN_FIELDS = ('role', 'is_active')
+    
     def save(self, *args, **kwargs):
-        """Override save pour générer le hash de la carte consulaire"""
-        if self.consular_card_number:
-            self.consular_card_number_hash = hashlib.sha256(
-                self.consular_card_number.encode('utf-8')
-            ).hexdigest()
-        else:
-            self.consular_card_number_hash = None
+        """Override save pour générer l'index aveugle (HMAC) de la carte consulaire"""
+        # Rôle ou statut modifié (API, admin, shell...): révoquer les jetons émis
+        update_fields = kwargs.get('update_fields')
+        if (
+            not self._state.adding
+            and self.has_changed(*self.TOKEN_FIELDS)
+            and (update_fields is None or set(update_fields) & set(self.TOKEN_FIELDS))
+        ):
+            from core.authentication import forget_cached_user
+            forget_cached_user(self)
+            self.auth_version += 1
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'auth_version'}
+        
+        # Seulement si le numéro a changé (DirtyFieldsMixin)
+        kwargs['update_fields'] = set_blind_indexes(
+            self,
+            *[name for name in ['consular_card_number'] if self.has_changed(name)],
+            update_fields=kwargs.get('update_fields')
+        )
 
         super().save(*args, **kwargs)
 
@@ -156,7 +179,7 @@ class EmailVerificationCode(models.Model):
         return not self.is_used and self.expires_at >= timezone.now()
 
 
-class Profile(models.Model):
+class Profile(DirtyFieldsMixin, models.Model):
     """
     Extended user profile with consular information
     Acts as a digital identity card
@@ -204,6 +227,12 @@ class Profile(models.Model):
         verbose_name=_('Noms de famille supplémentaires')
     )
     
+    # Encrypted numbers with a ``<field>_hash`` blind index (core.encrypted_fields)
+    BLIND_INDEXED_FIELDS = (
+        'consular_number', 'passport_number', 'id_card_number',
+        'birth_certificate_number', 'driving_license_number',
+    )
+    
     # Consular Information - ENCRYPTED avec hash pour unicité
     consular_number = EncryptedTextField(
         blank=True,
@@ -383,59 +412,32 @@ class Profile(models.Model):
         parts = [self.address_line1, self.address_line2, self.city, self.postal_code, self.country]
         return ', '.join(filter(None, parts))
     
+    # Fields counted by calculate_completeness
+    COMPLETENESS_FIELDS = (
+        'date_of_birth', 'place_of_birth', 'gender', 'nationality',
+        'address_line1', 'city', 'country',
+        'emergency_contact_name', 'emergency_contact_phone',
+    )
+    
     def calculate_completeness(self):
         """Calculate profile completeness percentage"""
-        required_fields = [
-            self.date_of_birth, self.place_of_birth, self.gender, self.nationality,
-            self.address_line1, self.city, self.country,
-            self.emergency_contact_name, self.emergency_contact_phone
-        ]
-        
-        filled_fields = sum(1 for field in required_fields if field)
-        return (filled_fields / len(required_fields)) * 100
+        filled_fields = sum(1 for name in self.COMPLETENESS_FIELDS if getattr(self, name))
+        return (filled_fields / len(self.COMPLETENESS_FIELDS)) * 100
     
     def save(self, *args, **kwargs):
         """Override save to update completeness and generate hashes"""
         try:
-            # Calculer la complétude
-            completeness = self.calculate_completeness()
-            self.is_profile_complete = completeness >= 80
-            
-            # Générer les hash pour l'unicité des documents chiffrés
-            if self.consular_number:
-                self.consular_number_hash = hashlib.sha256(
-                    self.consular_number.encode('utf-8')
-                ).hexdigest()
-            else:
-                self.consular_number_hash = None
-            
-            if self.passport_number:
-                self.passport_number_hash = hashlib.sha256(
-                    self.passport_number.encode('utf-8')
-                ).hexdigest()
-            else:
-                self.passport_number_hash = None
+            # Complétude et index aveugles ne sont recalculés que si leurs champs ont changé (DirtyFieldsMixin)
+            if self.has_changed(*self.COMPLETENESS_FIELDS):
+                completeness = self.calculate_completeness()
+                self.is_profile_complete = completeness >= 80
             
-            if self.id_card_number:
-                self.id_card_number_hash = hashlib.sha256(
-                    self.id_card_number.encode('utf-8')
-                ).hexdigest()
-            else:
-                self.id_card_number_hash = None
-            
-            if self.birth_certificate_number:
-                self.birth_certificate_number_hash = hashlib.sha256(
-                    self.birth_certificate_number.encode('utf-8')
-                ).hexdigest()
-            else:
-                self.birth_certificate_number_hash = None
-            
-            if self.driving_license_number:
-                self.driving_license_number_hash = hashlib.sha256(
-                    self.driving_license_number.encode('utf-8')
-                ).hexdigest()
-            else:
-                self.driving_license_number_hash = None
+            # Index aveugles (HMAC) pour l'unicité et la recherche des numéros chiffrés
+            kwargs['update_fields'] = set_blind_indexes(
+                self,
+                *[name for name in self.BLIND_INDEXED_FIELDS if self.has_changed(name)],
+                update_fields=kwargs.get('update_fields')
+            )
             
             super().save(*args, **kwargs)
         except Exception as e:
@@ -464,6 +466,15 @@ class UserDocument(models.Model):
         validators=[FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'pdf'])],
         verbose_name=_('Fichier')
     )
+    # Image derivatives built in the background (core.utils.images)
+    preview = models.ImageField(
+        upload_to=derivative_upload_path, blank=True, null=True, editable=False,
+        verbose_name=_('Aperçu')
+    )
+    thumbnail = models.ImageField(
+        upload_to=derivative_upload_path, blank=True, null=True, editable=False,
+        verbose_name=_('Miniature')
+    )
     expiry_date = models.DateField(null=True, blank=True, verbose_name=_('Date d\'expiration'))
     upload_date = models.DateTimeField(auto_now_add=True, verbose_name=_('Date d\'upload'))
     is_verified = models.BooleanField(default=False, verbose_name=_('Vérifié'))
@@ -558,4 +569,61 @@ class DocumentReminder(models.Model):
             self.status == 'PENDING' and
             self.days_until_expiry <= 3 and
             not self.email_sent
-        )
\ No newline at end of file
+        )
+
+class DocumentExpiry(models.Model):
+    """
+    Expiry index: one row per dated document of a user (profile passport,
+    ID card, driving license, or UserDocument), kept in sync on save and
+    re-bucketed every night by users.expiry
+    """
+    class Source(models.TextChoices):
+        PASSPORT = 'PASSPORT', _('Passeport')
+        ID_CARD = 'ID_CARD', _('Carte d\'identité')
+        DRIVING_LICENSE = 'DRIVING_LICENSE', _('Permis de conduire')
+        USER_DOCUMENT = 'USER_DOCUMENT', _('Document utilisateur')
+
+    class Bucket(models.TextChoices):
+        EXPIRED = 'EXPIRED', _('Expiré')
+        DAYS_3 = 'DAYS_3', _('Expire dans 3 jours ou moins')
+        DAYS_7 = 'DAYS_7', _('Expire dans 7 jours ou moins')
+        DAYS_30 = 'DAYS_30', _('Expire dans 30 jours ou moins')
+        LATER = 'LATER', _('Plus tard')
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='document_expiries')
+    source = models.CharField(max_length=20, choices=Source.choices, verbose_name=_('Source'))
+    user_document = models.ForeignKey(
+        UserDocument,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='expiry_entries'
+    )
+    # Copied from the document, so reading reminders needs no join
+    name = models.CharField(max_length=255, verbose_name=_('Nom du document'))
+    document_type = models.CharField(max_length=50, blank=True, verbose_name=_('Type de document'))
+    expiry_date = models.DateField(verbose_name=_('Date d\'expiration'))
+    bucket = models.CharField(max_length=10, choices=Bucket.choices, verbose_name=_('Échéance'))
+
+    class Meta:
+        verbose_name = _('Échéance de document')
+        verbose_name_plural = _('Échéances de documents')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'source'],
+                condition=models.Q(user_document__isnull=True),
+                name='users_documentexpiry_profile_unique'
+            ),
+            models.UniqueConstraint(
+                fields=['user_document'],
+                condition=models.Q(user_document__isnull=False),
+                name='users_documentexpiry_document_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'expiry_date']),
+            models.Index(fields=['bucket', 'expiry_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.expiry_date} ({self.get_bucket_display()})"
@@ -7,6 +7,26 @@ from django.utils.translation import gettext_lazy as _
 from .models import User, Profile, UserDocument
 from .validators import validate_strong_password
 from .utils import hashids_encode
+from core.sparse_fields import SparseFieldsMixin
+
+
+def _count_of(model_label, owner_field):
+    """Subquery counting the rows of ``model_label`` owned by the outer user"""
+    def build():
+        from django.apps import apps
+        from django.db.models import Count, IntegerField, OuterRef, Subquery
+        from django.db.models.functions import Coalesce
+        rows = apps.get_model(model_label).objects.filter(**{owner_field: OuterRef('pk')}).order_by()
+        counts = rows.values(owner_field).annotate(count=Count('pk')).values('count')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    return build
+
+
+# Counts computed by the list query instead of two queries per user
+USER_COUNT_ANNOTATIONS = {
+    'appointments_count': _count_of('appointments.Appointment', 'user'),
+    'applications_count': _count_of('applications.Application', 'applicant'),
+}
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -69,7 +89,7 @@ class ProfileSerializer(serializers.ModelSerializer):
         return obj.get_display_name() if obj else ''
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """User serializer with embedded profile"""
     profile = ProfileSerializer(read_only=True, required=False, allow_null=True)
     phone = serializers.CharField(source='phone_number', read_only=True)
@@ -77,6 +97,9 @@ class UserSerializer(serializers.ModelSerializer):
     applications_count = serializers.SerializerMethodField()
     hashed_id = serializers.SerializerMethodField()
     
+    QUERY_ANNOTATIONS = USER_COUNT_ANNOTATIONS
+    FIELD_COLUMNS = {'hashed_id': ['id']}
+    
     class Meta:
         model = User
         fields = [
@@ -94,6 +117,8 @@ class UserSerializer(serializers.ModelSerializer):
     
     def get_appointments_count(self, obj):
         """Compter les rendez-vous de l'utilisateur"""
+        if hasattr(obj, 'appointments_count'):
+            return obj.appointments_count
         try:
             from appointments.models import Appointment
             return Appointment.objects.filter(user=obj).count()
@@ -102,6 +127,8 @@ class UserSerializer(serializers.ModelSerializer):
     
     def get_applications_count(self, obj):
         """Compter les demandes de l'utilisateur"""
+        if hasattr(obj, 'applications_count'):
+            return obj.applications_count
         try:
             from applications.models import Application
             return Application.objects.filter(applicant=obj).count()
@@ -109,7 +136,7 @@ class UserSerializer(serializers.ModelSerializer):
             return 0
 
 
-class AdminUserSerializer(serializers.ModelSerializer):
+class AdminUserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Admin serializer for user management - allows modification of sensitive fields"""
     profile = ProfileSerializer(read_only=True, required=False, allow_null=True)
     phone = serializers.CharField(source='phone_number', read_only=True)
@@ -117,6 +144,9 @@ class AdminUserSerializer(serializers.ModelSerializer):
     applications_count = serializers.SerializerMethodField()
     hashed_id = serializers.SerializerMethodField()
     
+    QUERY_ANNOTATIONS = USER_COUNT_ANNOTATIONS
+    FIELD_COLUMNS = {'hashed_id': ['id']}
+    
     class Meta:
         model = User
         fields = [
@@ -134,6 +164,8 @@ class AdminUserSerializer(serializers.ModelSerializer):
     
     def get_appointments_count(self, obj):
         """Compter les rendez-vous de l'utilisateur"""
+        if hasattr(obj, 'appointments_count'):
+            return obj.appointments_count
         try:
             from appointments.models import Appointment
             return Appointment.objects.filter(user=obj).count()
@@ -142,6 +174,8 @@ class AdminUserSerializer(serializers.ModelSerializer):
     
     def get_applications_count(self, obj):
         """Compter les demandes de l'utilisateur"""
+        if hasattr(obj, 'applications_count'):
+            return obj.applications_count
         try:
             from applications.models import Application
             return Application.objects.filter(applicant=obj).count()
@@ -205,7 +239,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             )
         
         # Vérifier si le numéro existe déjà (pour éviter les doublons)
-        if User.objects.filter(consular_card_number=value_upper).exists():
+        if User.objects.filter(consular_card_number__blind=value_upper).exists():
             raise serializers.ValidationError(
                 "Ce numéro de carte consulaire est déjà utilisé. Si vous pensez qu'il s'agit d'une erreur, contactez l'ambassade."
             )
@@ -287,8 +321,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         )
         
         # Mettre à jour le profil avec les noms supplémentaires
-        # Le profil est créé automatiquement par le signal, on le rafraîchit et le met à jour
-        user.refresh_from_db()  # Rafraîchir pour avoir le profil créé par le signal
+        # Le profil est créé automatiquement par le signal (déjà rattaché à user, sans relecture)
         
         # Le profil devrait être créé par le signal, mais on vérifie quand même
         if hasattr(user, 'profile'):
@@ -376,13 +409,15 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
 class UserDocumentSerializer(serializers.ModelSerializer):
     """Serializer pour les documents utilisateur"""
     file_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
     status = serializers.ReadOnlyField()
     hashed_id = serializers.SerializerMethodField()
     
     class Meta:
         model = UserDocument
         fields = [
-            'id', 'hashed_id', 'document_type', 'name', 'file', 'file_url',
+            'id', 'hashed_id', 'document_type', 'name', 'file', 'file_url', 'preview_url', 'thumbnail_url',
             'expiry_date', 'upload_date', 'is_verified', 'notes', 'status'
         ]
         read_only_fields = ['id', 'hashed_id', 'upload_date', 'status']
@@ -398,4 +433,20 @@ class UserDocumentSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.file.url)
             return obj.file.url
         return None
+    
+    def get_preview_url(self, obj):
+        if obj.preview:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(obj.preview.url)
+            return obj.preview.url
+        return None
+    
+    def get_thumbnail_url(self, obj):
+        if obj.thumbnail:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(obj.thumbnail.url)
+            return obj.thumbnail.url
+        return None
 
@@ -3,10 +3,11 @@ Django signals for User app
 Auto-create Profile when User is created
 Désactiver automatiquement les utilisateurs sans carte consulaire
 """
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.db import transaction
-from .models import User, Profile
+from .models import User, Profile, UserDocument
 import logging
 
 logger = logging.getLogger(__name__)
@@ -39,7 +40,9 @@ def check_consular_card_and_deactivate(sender, instance, **kwargs):
         try:
             User.objects.filter(pk=instance.pk).update(
                 is_active=False,
-                is_verified=False
+                is_verified=False,
+                # Même effet qu'un save(): les jetons émis ne sont plus valides
+                auth_version=F('auth_version') + 1
             )
         except Exception as e:
             logger.warning(f"Erreur lors de la désactivation de l'utilisateur {instance.id}: {e}")
@@ -75,4 +78,46 @@ def save_user_profile(sender, instance, **kwargs):
         
     except Exception as e:
         # Logger l'erreur mais ne pas bloquer la sauvegarde de l'utilisateur
-        logger.warning(f"Erreur lors de la sauvegarde du profil pour l'utilisateur {instance.id}: {e}")
\ No newline at end of file
+        logger.warning(f"Erreur lors de la sauvegarde du profil pour l'utilisateur {instance.id}: {e}")
+
+@receiver(post_save, sender=UserDocument)
+def user_document_image_derivatives(sender, instance, **kwargs):
+    """Queue the preview/thumbnail build for image documents"""
+    from core.utils.images import schedule_image_derivatives
+    schedule_image_derivatives(instance)
+
+
+# Fields copied into the search entries of the user's applications and appointments
+SEARCH_INDEXED_FIELDS = {'first_name', 'last_name', 'email'}
+
+
+@receiver(post_save, sender=User)
+def user_search_entries(sender, instance, created, update_fields=None, **kwargs):
+    """Refresh the user's search entries when their name or email may have changed"""
+    if created or (update_fields is not None and not SEARCH_INDEXED_FIELDS & set(update_fields)):
+        return
+    from core.search import reindex_owner
+    user_id = instance.pk
+    transaction.on_commit(lambda: reindex_owner(user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    """Drop the user cached by the JWT authentication (core.authentication)"""
+    from core.authentication import forget_cached_user
+    forget_cached_user(instance)
+
+
+@receiver(post_save, sender=Profile)
+def profile_expiry_index(sender, instance, **kwargs):
+    """Keep the expiry index rows of the profile's documents up to date"""
+    from .expiry import sync_profile_expiries
+    sync_profile_expiries(instance)
+
+
+@receiver(post_save, sender=UserDocument)
+def user_document_expiry_index(sender, instance, **kwargs):
+    """Keep the expiry index row of the document up to date"""
+    from .expiry import sync_document_expiry
+    sync_document_expiry(instance)
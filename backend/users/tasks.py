@@ -7,8 +7,7 @@ from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.utils import timezone
 from django.conf import settings
-from datetime import timedelta
-from .models import UserDocument, DocumentReminder
+from .models import DocumentReminder
 from django_q.tasks import async_task
 
 logger = logging.getLogger(__name__)
@@ -49,50 +48,69 @@ def send_document_expiry_email(reminder):
 def check_and_send_document_expiry_reminders():
     """
     Vérifie les documents qui expirent bientôt et envoie des rappels par email
+
+    Les échéances sont d'abord recalculées dans l'index (users.expiry), puis
+    les rappels des documents expirant dans 3 jours (aujourd'hui compris) sont
+    créés et mis à jour en lot.
     """
+    from .expiry import refresh_buckets
+    from .models import DocumentExpiry
+
     try:
         today = timezone.now().date()
         logger.info(f"Démarrage de la vérification des documents expirant bientôt - {today}")
+        moved = refresh_buckets(today)
+        logger.info(f"{moved} échéance(s) de document recalculée(s)")
         
-        # Trouver tous les documents expirant dans 3 jours
-        documents_expiring = UserDocument.objects.filter(
-            expiry_date__isnull=False,
+        # Documents expirant dans 3 jours: ceux qui expirent aujourd'hui sont
+        # rangés parmi les expirés, ceux expirés avant sont exclus
+        entries = list(DocumentExpiry.objects.filter(
+            bucket__in=[DocumentExpiry.Bucket.EXPIRED, DocumentExpiry.Bucket.DAYS_3],
+            user_document__isnull=False,
             expiry_date__gte=today,
-            expiry_date__lte=today + timedelta(days=3)
-        )
-        
-        logger.info(f"{documents_expiring.count()} document(s) expirant dans 3 jours")
+        ).select_related('user_document', 'user'))
+        logger.info(f"{len(entries)} document(s) expirant dans 3 jours")
         
-        for document in documents_expiring:
-            try:
-                # Calculer les jours restants
-                days_remaining = (document.expiry_date - today).days
-                
-                # Déterminer la priorité
-                priority = 'URGENT' if days_remaining <= 3 else 'HIGH'
-                
-                # Créer ou obtenir un rappel
-                reminder, created = DocumentReminder.objects.get_or_create(
-                    document=document,
-                    user=document.user,
-                    defaults={
-                        'expiry_date': document.expiry_date,
-                        'days_until_expiry': days_remaining,
-                        'priority': priority,
-                    }
+        existing = {
+            reminder.document_id: reminder
+            for reminder in DocumentReminder.objects.filter(
+                document_id__in=[entry.user_document_id for entry in entries]
+            )
+        }
+        created, updated = [], []
+        for entry in entries:
+            days_remaining = (entry.expiry_date - today).days
+            reminder = existing.get(entry.user_document_id)
+            if reminder is None:
+                reminder = DocumentReminder(
+                    document=entry.user_document,
+                    user=entry.user,
+                    expiry_date=entry.expiry_date,
+                    days_until_expiry=days_remaining,
+                    priority='URGENT',
                 )
-                
-                # Envoyer l'email si pas déjà envoyé et si le document expire dans 3 jours
-                if not reminder.email_sent and days_remaining <= 3:
-                    success = send_document_expiry_email(reminder)
-                    if success:
-                        reminder.email_sent = True
-                        reminder.email_sent_at = timezone.now()
-                        reminder.save()
-                        logger.info(f"Rappel envoyé pour le document {document.name} de {document.user.email}")
-                
-            except Exception as e:
-                logger.error(f"Erreur lors du traitement du document {document.id}: {e}")
+                created.append(reminder)
+            else:
+                reminder.document = entry.user_document
+                reminder.user = entry.user
+                reminder.expiry_date = entry.expiry_date
+                reminder.days_until_expiry = days_remaining
+                reminder.priority = 'URGENT'
+                updated.append(reminder)
+        DocumentReminder.objects.bulk_create(created)
+        DocumentReminder.objects.bulk_update(updated, ['expiry_date', 'days_until_expiry', 'priority'])
+        
+        # Envoyer l'email si pas déjà envoyé
+        sent = []
+        for reminder in created + updated:
+            if reminder.email_sent:
+                continue
+            if send_document_expiry_email(reminder):
+                reminder.email_sent = True
+                reminder.email_sent_at = timezone.now()
+                sent.append(reminder)
+                logger.info(f"Rappel envoyé pour le document {reminder.document.name} de {reminder.user.email}")
+        DocumentReminder.objects.bulk_update(sent, ['email_sent', 'email_sent_at'])
         
         logger.info("Vérification des documents terminée")
         
@@ -104,3 +122,95 @@ def check_and_send_document_expiry_reminders():
 def schedule_document_expiry_check():
     """Planifier la vérification des documents expirant"""
     async_task('users.tasks.check_and_send_document_expiry_reminders')
+
+
+# Side effects of a registration, delivered through the outbox (core.outbox)
+
+def _registration_summary(user):
+    full_name = user.get_full_name() or user.email
+    has_consular_card = bool(user.consular_card_number and str(user.consular_card_number).strip())
+    return full_name, has_consular_card
+
+
+def send_registration_verification_email(user_id, password=None):
+    """Envoyer le code de vérification au nouvel inscrit (sans son mot de passe)"""
+    from .models import User
+    from .views import send_verification_email
+
+    # ``password``: ignoré, seuls les messages mis en file avant son retrait le portent
+    user = User.objects.filter(pk=user_id, is_verified=False).first()
+    if user is None:
+        return
+    send_verification_email(user)
+    logger.info(f"Verification email sent to {user.email}")
+
+
+def _registration_admins():
+    from .models import User
+    return User.objects.filter(role__in=['ADMIN', 'SUPERADMIN'], is_active=True)
+
+
+def notify_admins_of_registration(user_id):
+    """Notification in-app de la nouvelle inscription pour chaque admin"""
+    from notifications.models import Notification
+    from .models import User
+
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    full_name, has_consular_card = _registration_summary(user)
+    if not has_consular_card:
+        message = f'Nouvel utilisateur inscrit SANS numéro de carte consulaire: {full_name} ({user.email}). ACTION REQUISE: L\'utilisateur doit se rendre à l\'ambassade pour obtenir une carte consulaire.'
+    else:
+        message = f'Nouvel utilisateur inscrit: {full_name} ({user.email}). Numéro de carte consulaire: {user.consular_card_number}. Le compte est en attente de validation du numéro de carte.'
+
+    Notification.objects.bulk_create([
+        Notification(
+            recipient_id=admin_id,
+            channel=Notification.Channel.IN_APP,
+            title='Nouvelle inscription',
+            message=message,
+            notification_type='NEW_USER_REGISTRATION',
+            related_object_type='user',
+            related_object_id=str(user.id),
+            status=Notification.Status.SENT
+        )
+        for admin_id in _registration_admins().values_list('id', flat=True)
+    ])
+
+
+def email_admins_of_registration(user_id):
+    """Email aux admins pour la nouvelle inscription"""
+    from .models import User
+
+    user = User.objects.filter(pk=user_id).first()
+    admin_emails = [email for email in _registration_admins().values_list('email', flat=True) if email]
+    if user is None or not admin_emails:
+        return
+    full_name, has_consular_card = _registration_summary(user)
+    if not has_consular_card:
+        subject = f'[URGENT] Nouvelle inscription SANS carte consulaire - {full_name}'
+    else:
+        subject = f'[Ambassade] Nouvelle inscription - {full_name}'
+
+    message = f"""
+Nouvel utilisateur inscrit sur la plateforme de l'ambassade.
+
+Informations:
+- Nom: {full_name}
+- Email: {user.email}
+- Téléphone: {user.phone_number or 'Non fourni'}
+- Numéro de carte consulaire: {user.consular_card_number if has_consular_card else 'NON FOURNI - ACTION REQUISE'}
+
+Statut: Compte en attente de validation
+Action requise: {'Vérifier et valider le numéro de carte consulaire, puis activer le compte.' if has_consular_card else "L'utilisateur doit se rendre à l'ambassade pour obtenir une carte consulaire. Une fois la carte obtenue, vous pourrez modifier le numéro et activer le compte."}
+
+Accédez au dashboard admin pour gérer cet utilisateur.
+"""
+    send_mail(
+        subject=subject,
+        message=message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=admin_emails,
+        fail_silently=False
+    )
@@ -0,0 +1,58 @@
+import hashlib
+
+from django.contrib.admin.sites import AdminSite
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.encrypted_fields import blind_index, rebuild_blind_indexes
+from users.admin import ProfileAdmin
+from users.models import Profile, User
+
+
+class BlindIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='citizen',
+            email='citizen@example.com',
+            password='Str0ngP@ssw0rd!',
+            consular_card_number='SN1234567',
+        )
+        self.profile = self.user.profile
+        self.profile.passport_number = 'ab 123 456'
+        self.profile.save()
+
+    def test_hash_is_keyed_hmac(self):
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.passport_number_hash, blind_index('AB123456'))
+        self.assertNotEqual(self.profile.passport_number_hash, hashlib.sha256(b'ab 123 456').hexdigest())
+        with override_settings(BLIND_INDEX_KEY='another-key'):
+            self.assertNotEqual(blind_index('AB123456'), self.profile.passport_number_hash)
+
+    def test_blind_lookup_is_one_indexed_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            found = list(Profile.objects.filter(passport_number__blind='AB123456'))
+        self.assertEqual(found, [self.profile])
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"passport_number_hash" =', queries[0]['sql'])
+        self.assertTrue(User.objects.filter(consular_card_number__blind='sn1234567').exists())
+        self.assertFalse(Profile.objects.filter(passport_number__blind='AB123457').exists())
+
+    def test_update_fields_keeps_hash_in_sync(self):
+        self.user.consular_card_number = 'SN7654321'
+        self.user.save(update_fields=['consular_card_number'])
+        self.assertTrue(User.objects.filter(consular_card_number__blind='SN7654321').exists())
+
+    def test_admin_search_by_passport_number(self):
+        admin = ProfileAdmin(Profile, AdminSite())
+        results, _ = admin.get_search_results(None, Profile.objects.all(), ' AB123456 ')
+        self.assertEqual(list(results), [self.profile])
+        results, _ = admin.get_search_results(None, Profile.objects.all(), 'citizen@example.com')
+        self.assertEqual(list(results), [self.profile])
+
+    def test_rebuild_replaces_legacy_hashes(self):
+        Profile.objects.filter(pk=self.profile.pk).update(
+            passport_number_hash=hashlib.sha256(b'ab 123 456').hexdigest()
+        )
+        self.assertEqual(rebuild_blind_indexes(Profile, list(Profile.BLIND_INDEXED_FIELDS)), (1, []))
+        self.assertTrue(Profile.objects.filter(passport_number__blind='AB123456').exists())
@@ -0,0 +1,51 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Sequence
+from core.sequences import allocate_block
+from users import utils
+from users.models import User
+
+
+class ConsularCardAllocatorTests(TestCase):
+    def setUp(self):
+        utils._reserved_card_numbers.clear()
+        self.addCleanup(utils._reserved_card_numbers.clear)
+
+    def make_user(self, index, **kwargs):
+        return User.objects.create_user(
+            username=f'user{index}',
+            email=f'user{index}@example.com',
+            password='Str0ngP@ssw0rd!',
+            **kwargs
+        )
+
+    def test_blocks_are_disjoint(self):
+        self.assertEqual(allocate_block('test', 3, start=10), range(10, 13))
+        self.assertEqual(allocate_block('test', 2, start=10), range(13, 15))
+
+    def test_numbers_already_entered_are_skipped(self):
+        self.make_user(0, consular_card_number='SN1000001')
+        self.assertEqual(
+            utils.allocate_consular_card_numbers(3), ['SN1000000', 'SN1000002', 'SN1000003']
+        )
+
+    @override_settings(CONSULAR_CARD_BLOCK_SIZE=5)
+    def test_single_numbers_come_from_the_reserved_block(self):
+        first = utils.generate_consular_card_number()
+        with CaptureQueriesContext(connection) as queries:
+            others = [utils.generate_consular_card_number() for _ in range(4)]
+        self.assertEqual(len(queries), 0)
+        self.assertEqual([first] + others, [f'SN{1000000 + i}' for i in range(5)])
+
+    def test_batch_assignment_queries_per_block(self):
+        users = [self.make_user(i) for i in range(1, 6)]
+        Sequence.objects.create(name=utils.CONSULAR_CARD_SEQUENCE, next_value=utils.CONSULAR_CARD_FIRST)
+        with CaptureQueriesContext(connection) as queries:
+            utils.assign_consular_card_numbers(users)
+        # Sequence UPDATE ... RETURNING, hash check, bulk UPDATE
+        self.assertEqual(len(queries), 3)
+        for user in users:
+            self.assertTrue(User.objects.filter(consular_card_number__blind=user.consular_card_number).exists())
+        self.assertEqual(len({user.consular_card_number for user in users}), 5)
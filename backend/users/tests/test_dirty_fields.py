@@ -0,0 +1,57 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Profile, User
+
+
+class DirtyFieldsTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(
+            username='citizen',
+            email='citizen@example.com',
+            password='Str0ngP@ssw0rd!',
+            consular_card_number='SN1234567',
+        )
+        self.user = User.objects.get(email='citizen@example.com')
+
+    def test_save_writes_changed_columns_only(self):
+        self.user.is_active = False
+        with mock.patch('core.encrypted_fields.blind_index') as blind_index, \
+                CaptureQueriesContext(connection) as queries:
+            self.user.save()
+        blind_index.assert_not_called()
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "users_user"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"is_active"', updates[0])
+        self.assertNotIn('consular_card_number', updates[0])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save()
+        self.assertEqual(len(queries), 0)
+
+    def test_changed_number_is_rehashed(self):
+        self.user.consular_card_number = 'SN7654321'
+        self.user.save()
+        self.assertTrue(User.objects.filter(consular_card_number__blind='SN7654321').exists())
+
+    def test_profile_derived_values_follow_their_inputs(self):
+        profile = Profile.objects.get(user=self.user)
+        profile.city = 'Dakar'
+        with mock.patch('core.encrypted_fields.blind_index') as blind_index, \
+                mock.patch.object(Profile, 'calculate_completeness', return_value=0) as completeness:
+            profile.save()
+        blind_index.assert_not_called()
+        completeness.assert_called_once()
+
+        profile.passport_number = 'AB123456'
+        profile.additional_first_names.append('Marie')
+        with mock.patch.object(Profile, 'calculate_completeness') as completeness:
+            profile.save()
+        completeness.assert_not_called()
+
+        profile = Profile.objects.get(pk=profile.pk)
+        self.assertEqual(profile.additional_first_names, ['Marie'])
+        self.assertTrue(Profile.objects.filter(passport_number__blind='ab 123 456').exists())
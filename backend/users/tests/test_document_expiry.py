@@ -0,0 +1,103 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from users.expiry import rebuild_expiry_index, refresh_buckets
+from users.models import DocumentExpiry, DocumentReminder, User, UserDocument
+from users.tasks import check_and_send_document_expiry_reminders
+
+
+class DocumentExpiryIndexTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='citizen',
+            email='citizen@example.com',
+            password='Str0ngP@ssw0rd!',
+        )
+        self.today = date.today()
+
+    def add_document(self, name, days, document_type='other'):
+        return UserDocument.objects.create(
+            user=self.user,
+            document_type=document_type,
+            name=name,
+            file='user_documents/test.pdf',
+            expiry_date=self.today + timedelta(days=days),
+        )
+
+    def test_index_follows_profile_and_documents(self):
+        profile = self.user.profile
+        profile.passport_expiry = self.today + timedelta(days=5)
+        profile.save()
+        document = self.add_document('Acte de naissance', 60)
+        self.assertEqual(
+            sorted(DocumentExpiry.objects.values_list('source', 'bucket')),
+            [('PASSPORT', 'DAYS_7'), ('USER_DOCUMENT', 'LATER')],
+        )
+
+        profile.passport_expiry = None
+        profile.save()
+        document.delete()
+        self.assertFalse(DocumentExpiry.objects.exists())
+
+    def test_reminders_are_one_indexed_read(self):
+        profile = self.user.profile
+        profile.id_card_expiry = self.today + timedelta(days=20)
+        profile.save()
+        expired = self.add_document('Permis', -1, 'driving_license')
+        self.add_document('Acte de mariage', 2)
+        self.add_document('Autre', 90)
+
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('users:document_reminders'))
+        self.assertEqual(len(queries), 1)
+
+        reminders = response.data['reminders']
+        self.assertEqual(response.data['total_count'], 3)
+        self.assertEqual(response.data['urgent_count'], 2)
+        self.assertEqual([r['priority'] for r in reminders], ['URGENT', 'URGENT', 'MEDIUM'])
+        self.assertEqual(reminders[0]['id'], f'doc_{expired.id}_expired')
+        self.assertEqual(reminders[0]['type'], 'DOCUMENT_EXPIRED_DRIVING_LICENSE')
+        self.assertEqual(reminders[1]['type'], 'DOCUMENT_EXPIRING_SOON_OTHER')
+        self.assertEqual(reminders[2]['message'], "Votre carte d'identité expire dans 20 jours")
+
+    def test_nightly_sweep(self):
+        document = self.add_document('Passeport scanné', 5)
+        # Two days later the document enters the 3-day bucket
+        self.assertEqual(refresh_buckets(self.today + timedelta(days=2)), 1)
+        document.expiry_date = self.today + timedelta(days=3)
+        document.save()
+
+        check_and_send_document_expiry_reminders()
+        reminder = DocumentReminder.objects.get(document=document)
+        self.assertTrue(reminder.email_sent)
+        self.assertEqual(reminder.days_until_expiry, 3)
+        self.assertEqual(len(mail.outbox), 1)
+
+        check_and_send_document_expiry_reminders()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_nightly_sweep_includes_documents_expiring_today(self):
+        today = self.add_document('Visa', 0)
+        self.add_document('Carte de séjour', -1)
+
+        check_and_send_document_expiry_reminders()
+        reminder = DocumentReminder.objects.get()
+        self.assertEqual((reminder.document, reminder.days_until_expiry), (today, 0))
+        self.assertTrue(reminder.email_sent)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failed_rebuild_keeps_the_index(self):
+        self.add_document('Visa', 10)
+        with mock.patch.object(DocumentExpiry.objects, 'bulk_create', side_effect=RuntimeError('panne')):
+            with self.assertRaises(RuntimeError):
+                rebuild_expiry_index()
+        self.assertEqual(DocumentExpiry.objects.count(), 1)
+        self.assertEqual(rebuild_expiry_index(), 1)
+
@@ -0,0 +1,114 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from users.models import User
+from users.utils import hashids_encode
+from users.views import CustomTokenObtainPairSerializer
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(
+            username='agent',
+            email='agent@example.com',
+            password='Str0ngP@ssw0rd!',
+            role='AGENT_CONSULAIRE',
+            is_verified=True,
+        )
+        self.admin = User.objects.create_user(
+            username='admin',
+            email='admin@example.com',
+            password='Str0ngP@ssw0rd!',
+            role='ADMIN',
+            is_verified=True,
+        )
+
+    def tokens(self, user):
+        refresh = CustomTokenObtainPairSerializer.get_token(user)
+        return str(refresh), str(refresh.access_token)
+
+    def get_info(self, access):
+        return self.client.get(reverse('users:user_info'), HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def user_queries(self, queries):
+        return [q['sql'] for q in queries if 'FROM "users_user"' in q['sql']]
+
+    def test_user_is_read_once(self):
+        _, access = self.tokens(self.user)
+        self.assertEqual(self.get_info(access).status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_info(access)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.user_queries(queries.captured_queries), [])
+
+    def test_saving_the_user_drops_the_cached_copy(self):
+        _, access = self.tokens(self.user)
+        self.get_info(access)
+        self.user.first_name = 'Nouveau'
+        self.user.save()
+        self.assertEqual(self.get_info(access).data['first_name'], 'Nouveau')
+
+    def test_role_change_revokes_tokens(self):
+        refresh, access = self.tokens(self.user)
+        self.assertEqual(self.get_info(access).status_code, 200)
+
+        _, admin_access = self.tokens(self.admin)
+        response = self.client.post(
+            reverse('users:user-change-role', args=[hashids_encode(self.user.pk)]),
+            {'role': 'AGENT_RDV'},
+            HTTP_AUTHORIZATION=f'Bearer {admin_access}',
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.get_info(access).status_code, 401)
+        response = self.client.post(reverse('users:token_refresh'), {'refresh': refresh})
+        self.assertEqual(response.status_code, 401)
+
+        self.user.refresh_from_db()
+        _, access = self.tokens(self.user)
+        self.assertEqual(self.get_info(access).data['role'], 'AGENT_RDV')
+
+    def demoted_admin_tokens_are_refused(self, demote):
+        refresh, access = self.tokens(self.admin)
+        users_url = reverse('users:user-list')
+        self.assertEqual(self.client.get(users_url, HTTP_AUTHORIZATION=f'Bearer {access}').status_code, 200)
+
+        demote()
+
+        self.assertEqual(self.client.get(users_url, HTTP_AUTHORIZATION=f'Bearer {access}').status_code, 401)
+        response = self.client.post(reverse('users:token_refresh'), {'refresh': refresh})
+        self.assertEqual(response.status_code, 401)
+
+    def test_role_change_through_partial_update_revokes_tokens(self):
+        boss = User.objects.create_user(
+            username='boss', email='boss@example.com', password='Str0ngP@ssw0rd!', role='SUPERADMIN',
+        )
+        _, boss_access = self.tokens(boss)
+
+        def demote():
+            response = self.client.patch(
+                reverse('users:user-detail', args=[hashids_encode(self.admin.pk)]),
+                {'role': 'AGENT_RDV'},
+                HTTP_AUTHORIZATION=f'Bearer {boss_access}',
+            )
+            self.assertEqual(response.status_code, 200)
+
+        self.demoted_admin_tokens_are_refused(demote)
+
+    def test_role_change_through_django_admin_revokes_tokens(self):
+        from django.contrib.admin.sites import site
+        from django.test import RequestFactory
+
+        def demote():
+            admin = User.objects.get(pk=self.admin.pk)
+            admin.role = 'AGENT_RDV'
+            request = RequestFactory().post('/admin/users/user/')
+            request.user = User.objects.get(pk=self.user.pk)
+            site._registry[User].save_model(request, admin, form=None, change=True)
+
+        self.demoted_admin_tokens_are_refused(demote)
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from users.models import User
+from users.views import UserLoginView
+
+
+class LoginTests(APITestCase):
+    password = 'Str0ngP@ssw0rd!'
+
+    def setUp(self):
+        # The login rate limit is not under test
+        patcher = mock.patch.object(UserLoginView, 'throttle_classes', [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = reverse('users:login')
+        self.user = User.objects.create_user(
+            username='citizen',
+            email='citizen@example.com',
+            password=self.password,
+            consular_card_number='SN1234567',
+            is_verified=True,
+        )
+
+    def login(self, password, email='citizen@example.com'):
+        with mock.patch.object(
+            PBKDF2PasswordHasher, 'verify', autospec=True, side_effect=PBKDF2PasswordHasher.verify
+        ) as verify:
+            response = self.client.post(self.url, {'email': email, 'password': password}, format='json')
+        return response, verify.call_count
+
+    def test_success_hashes_once(self):
+        response, hashes = self.login(self.password)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        self.assertEqual(response.data['user']['email'], 'citizen@example.com')
+        self.assertEqual(hashes, 1)
+
+    def test_wrong_password_hashes_once(self):
+        response, hashes = self.login('wrong-password')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data['invalid_password'])
+        self.assertEqual(hashes, 1)
+
+    def test_inactive_account_is_classified_after_one_hash(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response, hashes = self.login('wrong-password')
+        self.assertTrue(response.data['invalid_credentials'])
+        self.assertEqual(hashes, 1)
+
+        response, hashes = self.login(self.password)
+        self.assertTrue(response.data['account_inactive'])
+        self.assertNotIn('no_consular_card', response.data)
+        self.assertEqual(hashes, 1)
+
+    def test_missing_card_and_unverified_email(self):
+        User.objects.filter(pk=self.user.pk).update(consular_card_number=None, consular_card_number_hash=None)
+        response, _ = self.login(self.password)
+        self.assertTrue(response.data['no_consular_card'])
+
+        User.objects.filter(pk=self.user.pk).update(consular_card_number='SN1234567', is_verified=False)
+        response, _ = self.login(self.password)
+        self.assertTrue(response.data['needs_verification'])
+
+    def test_unknown_email(self):
+        response, hashes = self.login(self.password, email='nobody@example.com')
+        self.assertTrue(response.data['account_not_found'])
+        self.assertEqual(hashes, 0)
+
+    def test_locked_out_attempts_are_not_hashed(self):
+        for _ in range(5):
+            self.login('wrong-password')
+        response, hashes = self.login(self.password)
+        self.assertTrue(response.data['invalid_password'])
+        self.assertEqual(hashes, 0)
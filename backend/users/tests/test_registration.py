@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.core import mail
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from core.models import OutboxMessage
+from core.outbox import deliver, process_outbox
+from notifications.models import Notification
+from users.models import User
+from users.views import UserRegistrationView
+
+
+class RegistrationOutboxTests(APITestCase):
+    password = 'Str0ngP@ssw0rd!'
+
+    def setUp(self):
+        patcher = mock.patch.object(UserRegistrationView, 'throttle_classes', [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for index in range(2):
+            User.objects.create_user(
+                username=f'admin{index}',
+                email=f'admin{index}@example.com',
+                password=self.password,
+                role='ADMIN',
+            )
+
+    def register(self):
+        with mock.patch('django_q.tasks.async_task') as async_task:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('users:register'), {
+                    'username': 'nouveau',
+                    'email': 'nouveau@example.com',
+                    'password': self.password,
+                    'password_confirm': self.password,
+                    'first_name': 'Awa',
+                    'last_name': 'Diop',
+                    'consular_card_number': 'SN1234567',
+                }, format='json')
+        return response, [call.args[1] for call in async_task.call_args_list]
+
+    def test_registration_only_records_its_side_effects(self):
+        response, queued = self.register()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        self.assertFalse(Notification.objects.exists())
+
+        messages = list(OutboxMessage.objects.all())
+        self.assertEqual(sorted(queued), [message.pk for message in messages])
+        verification = next(m for m in messages if m.handler.endswith('verification_email'))
+        self.assertEqual(verification.payload, {'user_id': User.objects.get(email='nouveau@example.com').pk})
+
+        for message_id in queued:
+            self.assertTrue(deliver(message_id))
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertEqual(Notification.objects.filter(notification_type='NEW_USER_REGISTRATION').count(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        verification_email = next(m for m in mail.outbox if m.to == ['nouveau@example.com'])
+        self.assertNotIn(self.password, verification_email.body + verification_email.alternatives[0][0])
+
+    def test_failed_delivery_is_retried_later(self):
+        self.register()
+        with mock.patch('users.tasks.send_mail', side_effect=OSError('SMTP indisponible')):
+            delivered, not_delivered = process_outbox()
+        self.assertEqual((delivered, not_delivered), (2, 1))
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.status, OutboxMessage.Status.PENDING)
+        self.assertIn('SMTP indisponible', message.last_error)
+        # Not due again before its backoff delay
+        self.assertEqual(process_outbox(), (0, 0))
@@ -0,0 +1,39 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from users.models import User
+
+
+class UserListSparseFieldsTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='Str0ngP@ssw0rd!', role='ADMIN',
+        )
+        for i in range(3):
+            User.objects.create_user(
+                username=f'citizen{i}', email=f'citizen{i}@example.com', password='Str0ngP@ssw0rd!',
+                consular_card_number=f'SN123456{i}',
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_counts_and_profiles_are_read_by_the_list_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/auth/users/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(response.data['results'][0]['appointments_count'], 0)
+        # Count + page, whatever the number of users
+        user_queries = [q['sql'] for q in queries if 'FROM "users_user"' in q['sql']]
+        self.assertEqual(len(user_queries), 2)
+        self.assertFalse([q['sql'] for q in queries if q['sql'].startswith('SELECT COUNT(*) AS "__count" FROM "appointments')])
+
+    def test_fields_restricts_output_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/auth/users/', {'fields': 'hashed_id,email'})
+        self.assertEqual(set(response.data['results'][0]), {'hashed_id', 'email'})
+        page = [q['sql'] for q in queries if 'FROM "users_user"' in q['sql']][-1]
+        self.assertNotIn('"password"', page)
+        self.assertNotIn('appointments_appointment', page)
@@ -3,9 +3,9 @@ URL configuration for User API
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenObtainPairView
 from .views import (
-    UserRegistrationView, UserLoginView, ProfileView, user_info,
+    UserRegistrationView, UserLoginView, UserTokenRefreshView, ProfileView, user_info,
     verify_email, resend_verification_code, document_reminders,
     UserDocumentViewSet, update_reminder_status, UserViewSet
 )
@@ -21,7 +21,7 @@ urlpatterns = [
     # Authentication
     path('login/', UserLoginView.as_view(), name='login'),
     path('token/obtain/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', UserTokenRefreshView.as_view(), name='token_refresh'),
     path('register/', UserRegistrationView.as_view(), name='register'),
     
     # Email verification
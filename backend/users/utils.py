@@ -1,10 +1,11 @@
 """
 Utility functions for User app
 """
-import random
-from django.db import IntegrityError
+import threading
 from django.conf import settings
 from hashids import Hashids
+from core.encrypted_fields import blind_index, set_blind_indexes
+from core.sequences import allocate_block
 from .models import User
 
 # Initialize Hashids with a salt from settings
@@ -38,39 +39,51 @@ def hashids_decode(hashed_id):
         return None
 
 
+# Consular card numbers: "SN" + 7 to 9 digits, issued in order from SN1000000
+CONSULAR_CARD_SEQUENCE = 'consular_card'
+CONSULAR_CARD_FIRST = 1_000_000
+CONSULAR_CARD_LAST = 999_999_999
+
+# Numbers reserved by this process and not yet handed out (hi/lo)
+_reserved_card_numbers = []
+_reserved_lock = threading.Lock()
+
+
+def allocate_consular_card_numbers(count):
+    """
+    Reserve ``count`` unused consular card numbers
+
+    Each block costs one sequence UPDATE and one query on
+    ``consular_card_number_hash`` to skip numbers already entered by
+    citizens; a new block is only needed to replace such numbers.
+    """
+    numbers = []
+    while len(numbers) < count:
+        block = allocate_block(CONSULAR_CARD_SEQUENCE, count - len(numbers), start=CONSULAR_CARD_FIRST)
+        if block[-1] > CONSULAR_CARD_LAST:
+            raise ValueError("Plus aucun numéro de carte consulaire disponible.")
+        candidates = {blind_index(f"SN{value}"): f"SN{value}" for value in block}
+        taken = set(
+            User.objects.filter(consular_card_number_hash__in=candidates)
+            .values_list('consular_card_number_hash', flat=True)
+        )
+        numbers.extend(number for digest, number in candidates.items() if digest not in taken)
+    return numbers
+
+
 def generate_consular_card_number():
     """
     Génère un numéro de carte consulaire unique au format SNXXXXXXX
     Format: SN suivi de 7 à 9 chiffres (ex: SN1234567, SN12345678, SN123456789)
+
+    Numbers come from a block reserved by this process, so the database is
+    only reached once per CONSULAR_CARD_BLOCK_SIZE numbers.
     """
-    max_attempts = 100
-    
-    for attempt in range(max_attempts):
-        # Générer un nombre aléatoire entre 7 et 9 chiffres
-        num_digits = random.choice([7, 8, 9])
-        # Générer le numéro (éviter de commencer par 0)
-        number = random.randint(10**(num_digits-1), 10**num_digits - 1)
-        consular_number = f"SN{number}"
-        
-        # Vérifier l'unicité
-        if not User.objects.filter(consular_card_number=consular_number).exists():
-            return consular_number
-    
-    # Si on n'a pas trouvé de numéro unique après max_attempts tentatives,
-    # essayer avec un numéro séquentiel basé sur le nombre d'utilisateurs
-    user_count = User.objects.count()
-    base_number = user_count + 1000000  # Commencer à partir de SN1000000
-    
-    # Trouver le premier numéro disponible
-    for i in range(10000):  # Essayer jusqu'à 10000 numéros
-        consular_number = f"SN{base_number + i}"
-        if not User.objects.filter(consular_card_number=consular_number).exists():
-            return consular_number
-    
-    # Dernier recours: utiliser un timestamp
-    import time
-    timestamp = int(time.time()) % 100000000  # Garder les 8 derniers chiffres
-    return f"SN{timestamp}"
+    with _reserved_lock:
+        if not _reserved_card_numbers:
+            block = allocate_consular_card_numbers(settings.CONSULAR_CARD_BLOCK_SIZE)
+            _reserved_card_numbers.extend(reversed(block))
+        return _reserved_card_numbers.pop()
 
 
 def assign_consular_card_number(user):
@@ -84,3 +97,15 @@ def assign_consular_card_number(user):
         return consular_number
     return user.consular_card_number
 
+
+def assign_consular_card_numbers(users):
+    """
+    Assigne un numéro de carte consulaire à chacun des ``users`` (sans numéro)
+    One block allocation and one bulk UPDATE for the whole list
+    """
+    users = list(users)
+    for user, number in zip(users, allocate_consular_card_numbers(len(users))):
+        user.consular_card_number = number
+        set_blind_indexes(user, 'consular_card_number')
+    User.objects.bulk_update(users, ['consular_card_number', 'consular_card_number_hash'])
+    return users
@@ -9,28 +9,37 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.throttling import AnonRateThrottle
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework import serializers
 from core.throttles import LoginRateThrottle, RegisterRateThrottle, PasswordResetRateThrottle, EmailVerificationRateThrottle
 from django.contrib.auth import authenticate
+from django.contrib.auth.models import update_last_login
+from django.contrib.auth.signals import user_login_failed
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.utils import timezone
 from django.conf import settings
-from django.db import models, DataError
+from django.db import models, transaction, DataError
 from datetime import date, timedelta
 from ipware import get_client_ip
+from axes.handlers.proxy import AxesProxyHandler
 
 from .models import User, Profile, EmailVerificationCode, UserDocument, DocumentReminder
 from core.models import SiteSettings
+from core.authentication import add_token_claims, token_is_current
+from core.outbox import enqueue
 from .serializers import (
     UserRegistrationSerializer, UserSerializer, AdminUserSerializer, ProfileSerializer, 
     ProfileUpdateSerializer, UserDocumentSerializer
 )
 from core.permissions import IsAdmin
+from core.sparse_fields import SparseFieldsViewMixin
 from .utils import hashids_decode
+from .expiry import user_reminders
 from django.http import Http404
 
 logger = logging.getLogger(__name__)
@@ -181,91 +190,92 @@ def send_account_deactivation_email(user):
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
-    """Custom JWT serializer that authenticates by email"""
+    """
+    Custom JWT serializer that authenticates by email
+
+    The user is read once and the password hashed once, whatever the outcome;
+    the result is then turned into the error the frontend expects. Attempts
+    on a locked out account (django-axes) are refused without hashing.
+    """
+    @classmethod
+    def get_token(cls, user):
+        # Token version and role, read by core.authentication and core.permissions
+        return add_token_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         email = attrs.get('email')
         password = attrs.get('password')
+        request = self.context.get('request')
         
         # Vérifier d'abord si l'utilisateur existe
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
+        user = User.objects.filter(email=email).first()
+        if user is None:
             raise serializers.ValidationError({
                 'error': 'Aucun compte n\'est associé à cet email. Si vous n\'avez pas encore de compte, veuillez vous rendre à l\'ambassade pour vous enregistrer et obtenir votre carte consulaire.',
                 'account_not_found': True,
                 'email': email
             })
         
-        # Vérifier si l'utilisateur a une carte consulaire (sauf pour admins/superadmins/agents)
+        # Les employés (ADMIN, SUPERADMIN, AGENT_RDV, AGENT_CONSULAIRE) n'ont besoin ni de carte consulaire ni de vérification email
         # VIGILE est retiré de l'exception pour tester le comportement sans carte consulaire
-        if user.role not in ['ADMIN', 'SUPERADMIN', 'AGENT_RDV', 'AGENT_CONSULAIRE']:
-            if not user.consular_card_number:
-                # Vérifier le mot de passe pour confirmer l'identité
-                if not user.check_password(password):
-                    raise serializers.ValidationError({
-                        'error': 'Mot de passe incorrect. Veuillez vérifier votre mot de passe.',
-                        'invalid_credentials': True
-                    })
-                # Si le mot de passe est correct mais pas de carte consulaire
-                raise serializers.ValidationError({
-                    'error': 'Votre compte nécessite une carte consulaire valide pour être activé. Veuillez vous rendre au bureau de l\'ambassade avec une pièce d\'identité et les documents requis pour obtenir votre carte consulaire et activer votre compte. Consultez la page d\'aide pour la liste complète des documents nécessaires.',
-                    'no_consular_card': True,
-                    'account_inactive': True,
-                    'email': email
-                })
+        is_staff_role = user.role in ['ADMIN', 'SUPERADMIN', 'AGENT_RDV', 'AGENT_CONSULAIRE']
+        missing_card = not is_staff_role and not user.consular_card_number
         
-        # Vérifier si le compte est actif avant d'authentifier
-        if not user.is_active:
-            # Vérifier quand même le mot de passe pour confirmer l'identité
-            if not user.check_password(password):
+        # Compte bloqué par Axes: refusé sans calculer le hash
+        credentials = {'username': email}
+        if not AxesProxyHandler.is_allowed(request, credentials):
+            user_login_failed.send(sender=__name__, credentials=credentials, request=request)
+            raise serializers.ValidationError({
+                'error': 'Mot de passe incorrect. Veuillez vérifier votre mot de passe et réessayer.',
+                'invalid_password': True
+            })
+        
+        # Unique vérification du mot de passe
+        if not user.check_password(password):
+            user_login_failed.send(sender=__name__, credentials=credentials, request=request)
+            if missing_card or not user.is_active:
                 raise serializers.ValidationError({
                     'error': 'Mot de passe incorrect. Veuillez vérifier votre mot de passe.',
                     'invalid_credentials': True
                 })
-            # Si le mot de passe est correct mais le compte est inactif
-            # Vérifier si c'est à cause de la carte consulaire
-            # VIGILE est retiré de l'exception pour tester le comportement sans carte consulaire
-            if user.role not in ['ADMIN', 'SUPERADMIN', 'AGENT_RDV', 'AGENT_CONSULAIRE'] and not user.consular_card_number:
-                raise serializers.ValidationError({
-                    'error': 'Votre compte est inactif car vous n\'avez pas de carte consulaire valide. Veuillez vous rendre au bureau de l\'ambassade avec une pièce d\'identité et les documents requis pour obtenir votre carte consulaire et activer votre compte. Consultez la page d\'aide pour la liste complète des documents nécessaires.',
-                    'no_consular_card': True,
-                    'account_inactive': True,
-                    'email': email
-                })
-            else:
-                raise serializers.ValidationError({
-                    'error': 'Votre compte est inactif. Veuillez vous rendre à l\'ambassade avec votre carte consulaire pour activer votre compte.',
-                    'account_inactive': True,
-                    'email': email
-                })
+            raise serializers.ValidationError({
+                'error': 'Mot de passe incorrect. Veuillez vérifier votre mot de passe et réessayer.',
+                'invalid_password': True
+            })
         
-        # Use email as username for authentication
-        attrs['username'] = email
-        try:
-            data = super().validate(attrs)
-        except serializers.ValidationError as e:
-            # Si l'authentification échoue, c'est probablement un mauvais mot de passe
-            error_detail = str(e.detail.get('non_field_errors', [''])[0] if hasattr(e, 'detail') and isinstance(e.detail, dict) else '')
-            if 'no active account' in error_detail.lower() or 'invalid' in error_detail.lower():
-                raise serializers.ValidationError({
-                    'error': 'Mot de passe incorrect. Veuillez vérifier votre mot de passe et réessayer.',
-                    'invalid_password': True
-                })
-            raise
+        # Mot de passe correct mais pas de carte consulaire
+        if missing_card:
+            raise serializers.ValidationError({
+                'error': 'Votre compte nécessite une carte consulaire valide pour être activé. Veuillez vous rendre au bureau de l\'ambassade avec une pièce d\'identité et les documents requis pour obtenir votre carte consulaire et activer votre compte. Consultez la page d\'aide pour la liste complète des documents nécessaires.',
+                'no_consular_card': True,
+                'account_inactive': True,
+                'email': email
+            })
+        
+        # Mot de passe correct mais compte inactif
+        if not user.is_active:
+            raise serializers.ValidationError({
+                'error': 'Votre compte est inactif. Veuillez vous rendre à l\'ambassade avec votre carte consulaire pour activer votre compte.',
+                'account_inactive': True,
+                'email': email
+            })
         
         # Check if user is verified (sauf pour les employés de l'ambassade)
-        # VIGILE est retiré de l'exception pour tester le comportement sans carte consulaire
-        # Les employés (ADMIN, SUPERADMIN, AGENT_RDV, AGENT_CONSULAIRE) n'ont pas besoin de vérification email
-        if self.user.role not in ['ADMIN', 'SUPERADMIN', 'AGENT_RDV', 'AGENT_CONSULAIRE']:
-            if not self.user.is_verified:
-                raise serializers.ValidationError({
-                    'error': 'Veuillez vérifier votre email avant de vous connecter. Un email de vérification vous a été envoyé lors de votre inscription.',
-                    'needs_verification': True,
-                    'email': self.user.email
-                })
+        if not is_staff_role and not user.is_verified:
+            raise serializers.ValidationError({
+                'error': 'Veuillez vérifier votre email avant de vous connecter. Un email de vérification vous a été envoyé lors de votre inscription.',
+                'needs_verification': True,
+                'email': user.email
+            })
+        
+        self.user = user
+        refresh = self.get_token(user)
+        data = {'refresh': str(refresh), 'access': str(refresh.access_token)}
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
         
         # Add user data to response
-        data['user'] = UserSerializer(self.user).data
+        data['user'] = UserSerializer(user).data
         return data
 
 
@@ -275,6 +285,23 @@ class UserLoginView(TokenObtainPairView):
     throttle_classes = [LoginRateThrottle]  # Limite les tentatives de connexion
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuse refresh tokens issued before a role or status change"""
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(
+            pk=refresh.get(jwt_settings.USER_ID_CLAIM), is_active=True
+        ).only('auth_version').first()
+        if user is None or not token_is_current(refresh, user):
+            raise InvalidToken("Votre compte a été modifié. Veuillez vous reconnecter.")
+        return super().validate(attrs)
+
+
+class UserTokenRefreshView(TokenRefreshView):
+    """JWT refresh endpoint"""
+    serializer_class = CustomTokenRefreshSerializer
+
+
 class UserRegistrationView(generics.CreateAPIView):
     """User registration endpoint"""
     queryset = User.objects.all()
@@ -323,123 +350,30 @@ class UserRegistrationView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # Récupérer le mot de passe avant la création (il sera hashé après)
-        password = request.data.get('password', '')
-        
-        # Create user (profile will be created automatically by signal)
-        user = serializer.save()
+        # Create user (profile will be created automatically by signal) and
+        # record the emails and admin notifications, sent by the outbox worker
+        # once the user is committed (core.outbox, users.tasks)
+        with transaction.atomic():
+            user = serializer.save()
+            enqueue('users.tasks.notify_admins_of_registration', user_id=user.id)
+            enqueue('users.tasks.email_admins_of_registration', user_id=user.id)
+            # Le mot de passe n'est jamais recopié dans le message (ni dans l'email)
+            enqueue('users.tasks.send_registration_verification_email', user_id=user.id)
         
         # Vérifier si le numéro de carte consulaire est valide
         # Pour l'instant, on considère qu'un numéro valide doit être vérifié par l'admin
         # On marque le compte comme nécessitant une validation
         consular_card_validated = False  # Par défaut, non validé jusqu'à vérification admin
         
-        # Notifier les admins de la nouvelle inscription
-        try:
-            from notifications.models import Notification
-            admins = User.objects.filter(role__in=['ADMIN', 'SUPERADMIN'], is_active=True)
-            
-            # S'assurer que l'utilisateur est rechargé depuis la DB pour avoir les valeurs déchiffrées
-            user.refresh_from_db()
-            
-            # Obtenir le nom complet de manière sécurisée
-            user_full_name = user.get_full_name() or f"{user.first_name} {user.last_name}".strip() or user.email
-            
-            # Vérifier si le numéro de carte consulaire existe (gérer les cas None, '', et valeurs chiffrées)
-            has_consular_card = user.consular_card_number and str(user.consular_card_number).strip()
-            
-            # Message de notification selon si le numéro est fourni ou non
-            if not has_consular_card:
-                notification_message = f'Nouvel utilisateur inscrit SANS numéro de carte consulaire: {user_full_name} ({user.email}). ACTION REQUISE: L\'utilisateur doit se rendre à l\'ambassade pour obtenir une carte consulaire.'
-                email_subject = f'[URGENT] Nouvelle inscription SANS carte consulaire - {user_full_name}'
-            else:
-                # Obtenir le numéro de carte consulaire de manière sécurisée
-                consular_card_display = str(user.consular_card_number) if user.consular_card_number else 'N/A'
-                notification_message = f'Nouvel utilisateur inscrit: {user_full_name} ({user.email}). Numéro de carte consulaire: {consular_card_display}. Le compte est en attente de validation du numéro de carte.'
-                email_subject = f'[Ambassade] Nouvelle inscription - {user_full_name}'
-            
-            for admin in admins:
-                # Notification in-app
-                Notification.objects.create(
-                    recipient=admin,
-                    channel=Notification.Channel.IN_APP,
-                    title='Nouvelle inscription',
-                    message=notification_message,
-                    notification_type='NEW_USER_REGISTRATION',
-                    related_object_type='user',
-                    related_object_id=str(user.id),
-                    status=Notification.Status.SENT
-                )
-            
-            # Envoyer un email aux admins
-            try:
-                from django.core.mail import send_mail
-                from django.conf import settings
-                
-                admin_emails = [admin.email for admin in admins if admin.email]
-                if admin_emails:
-                    # Obtenir le nom complet de manière sécurisée
-                    user_full_name = user.get_full_name() or f"{user.first_name} {user.last_name}".strip() or user.email
-                    has_consular_card = user.consular_card_number and str(user.consular_card_number).strip()
-                    
-                    email_message = f"""
-Nouvel utilisateur inscrit sur la plateforme de l'ambassade.
-
-Informations:
-- Nom: {user_full_name}
-- Email: {user.email}
-- Téléphone: {user.phone_number or 'Non fourni'}
-- Numéro de carte consulaire: {user.consular_card_number if has_consular_card else 'NON FOURNI - ACTION REQUISE'}
-
-Statut: Compte en attente de validation
-Action requise: {'Vérifier et valider le numéro de carte consulaire, puis activer le compte.' if has_consular_card else 'L\'utilisateur doit se rendre à l\'ambassade pour obtenir une carte consulaire. Une fois la carte obtenue, vous pourrez modifier le numéro et activer le compte.'}
-
-Accédez au dashboard admin pour gérer cet utilisateur.
-"""
-                    send_mail(
-                        subject=email_subject,
-                        message=email_message,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=admin_emails,
-                        fail_silently=True
-                    )
-            except Exception as email_error:
-                logger.error(f"Failed to send admin notification email: {email_error}")
-                
-        except Exception as notif_error:
-            logger.error(f"Failed to create admin notifications: {notif_error}")
-        
-        # Send verification email to user (non-blocking) avec le mot de passe
-        # L'inscription réussit même si l'email échoue
-        email_sent = False
-        try:
-            send_verification_email(user, password=password)
-            logger.info(f"Verification email with password sent to {user.email}")
-            email_sent = True
-        except Exception as e:
-            # Logger l'erreur mais ne pas bloquer l'inscription
-            logger.error(f"Failed to send verification email to {user.email}: {e}")
-            # L'inscription continue même si l'email échoue
-            # L'utilisateur pourra demander un nouveau code plus tard
-
-        # S'assurer que l'utilisateur est rechargé pour avoir les valeurs à jour
-        user.refresh_from_db()
-        
         # Obtenir le numéro de carte consulaire de manière sécurisée
         consular_card = user.consular_card_number if (user.consular_card_number and str(user.consular_card_number).strip()) else None
         
-        # Message selon si l'email a été envoyé ou non
-        if email_sent:
-            message = "Inscription réussie ! Un code de vérification a été envoyé à votre email."
-        else:
-            message = "Inscription réussie ! Cependant, l'envoi de l'email de vérification a échoué. Veuillez contacter l'ambassade pour obtenir votre code de vérification."
-        
         return Response({
-            "message": message,
+            "message": "Inscription réussie ! Un code de vérification va vous être envoyé par email.",
             "user_id": user.id,
             "email": user.email,
             "needs_verification": True,
-            "email_sent": email_sent,
+            "email_queued": True,
             "consular_card_validated": consular_card_validated,
             "consular_card_number": consular_card
         }, status=status.HTTP_201_CREATED)
@@ -626,170 +560,8 @@ def user_info(request):
 @permission_classes([IsAuthenticated])
 def document_reminders(request):
     """Get document expiration reminders for the user"""
-    user = request.user
-    profile = user.profile
-    today = date.today()
-    reminders = []
-    
-    # Vérifier le passeport
-    if profile.passport_expiry:
-        days_until_expiry = (profile.passport_expiry - today).days
-        if days_until_expiry <= 30:
-            if days_until_expiry <= 0:
-                reminders.append({
-                    'type': 'PASSPORT_EXPIRED',
-                    'document': 'Passeport',
-                    'expiry_date': profile.passport_expiry,
-                    'days_remaining': days_until_expiry,
-                    'message': f'Votre passeport a expiré le {profile.passport_expiry.strftime("%d/%m/%Y")}',
-                    'priority': 'URGENT',
-                    'action_required': 'Renouveler immédiatement'
-                })
-            elif days_until_expiry <= 7:
-                reminders.append({
-                    'type': 'PASSPORT_EXPIRING_SOON',
-                    'document': 'Passeport',
-                    'expiry_date': profile.passport_expiry,
-                    'days_remaining': days_until_expiry,
-                    'message': f'Votre passeport expire dans {days_until_expiry} jours',
-                    'priority': 'HIGH',
-                    'action_required': 'Renouveler rapidement'
-                })
-            else:
-                reminders.append({
-                    'type': 'PASSPORT_EXPIRING',
-                    'document': 'Passeport',
-                    'expiry_date': profile.passport_expiry,
-                    'days_remaining': days_until_expiry,
-                    'message': f'Votre passeport expire dans {days_until_expiry} jours',
-                    'priority': 'MEDIUM',
-                    'action_required': 'Planifier le renouvellement'
-                })
-    
-    # Vérifier la carte d'identité
-    if profile.id_card_expiry:
-        days_until_expiry = (profile.id_card_expiry - today).days
-        if days_until_expiry <= 30:
-            if days_until_expiry <= 0:
-                reminders.append({
-                    'type': 'ID_CARD_EXPIRED',
-                    'document': 'Carte d\'identité',
-                    'expiry_date': profile.id_card_expiry,
-                    'days_remaining': days_until_expiry,
-                    'message': f'Votre carte d\'identité a expiré le {profile.id_card_expiry.strftime("%d/%m/%Y")}',
-                    'priority': 'URGENT',
-                    'action_required': 'Renouveler immédiatement'
-                })
-            elif days_until_expiry <= 7:
-                reminders.append({
-                    'type': 'ID_CARD_EXPIRING_SOON',
-                    'document': 'Carte d\'identité',
-                    'expiry_date': profile.id_card_expiry,
-                    'days_remaining': days_until_expiry,
-                    'message': f'Votre carte d\'identité expire dans {days_until_expiry} jours',
-                    'priority': 'HIGH',
-                    'action_required': 'Renouveler rapidement'
-                })
-            else:
-                reminders.append({
-                    'type': 'ID_CARD_EXPIRING',
-                    'document': 'Carte d\'identité',
-                    'expiry_date': profile.id_card_expiry,
-                    'days_remaining': days_until_expiry,
-                    'message': f'Votre carte d\'identité expire dans {days_until_expiry} jours',
-                    'priority': 'MEDIUM',
-                    'action_required': 'Planifier le renouvellement'
-                })
-    
-    # Vérifier le permis de conduire
-    if profile.driving_license_expiry:
-        days_until_expiry = (profile.driving_license_expiry - today).days
-        if days_until_expiry <= 30:
-            if days_until_expiry <= 0:
-                reminders.append({
-                    'type': 'DRIVING_LICENSE_EXPIRED',
-                    'document': 'Permis de conduire',
-                    'expiry_date': profile.driving_license_expiry,
-                    'days_remaining': days_until_expiry,
-                    'message': f'Votre permis de conduire a expiré le {profile.driving_license_expiry.strftime("%d/%m/%Y")}',
-                    'priority': 'URGENT',
-                    'action_required': 'Renouveler immédiatement'
-                })
-            elif days_until_expiry <= 7:
-                reminders.append({
-                    'type': 'DRIVING_LICENSE_EXPIRING_SOON',
-                    'document': 'Permis de conduire',
-                    'expiry_date': profile.driving_license_expiry,
-                    'days_remaining': days_until_expiry,
-                    'message': f'Votre permis de conduire expire dans {days_until_expiry} jours',
-                    'priority': 'HIGH',
-                    'action_required': 'Renouveler rapidement'
-                })
-            else:
-                reminders.append({
-                    'type': 'DRIVING_LICENSE_EXPIRING',
-                    'document': 'Permis de conduire',
-                    'expiry_date': profile.driving_license_expiry,
-                    'days_remaining': days_until_expiry,
-                    'message': f'Votre permis de conduire expire dans {days_until_expiry} jours',
-                    'priority': 'MEDIUM',
-                    'action_required': 'Planifier le renouvellement'
-                })
-    
-    # Vérifier les documents utilisateur scannés
-    user_documents = UserDocument.objects.filter(user=user, expiry_date__isnull=False)
-    for doc in user_documents:
-        days_until_expiry = (doc.expiry_date - today).days
-        if days_until_expiry <= 30:
-            if days_until_expiry <= 0:
-                reminders.append({
-                    'id': f'doc_{doc.id}_expired',
-                    'type': f'DOCUMENT_EXPIRED_{doc.document_type.upper()}',
-                    'document': doc.name,
-                    'expiry_date': doc.expiry_date,
-                    'days_remaining': days_until_expiry,
-                    'message': f'Votre {doc.name.lower()} a expiré le {doc.expiry_date.strftime("%d/%m/%Y")}',
-                    'priority': 'URGENT',
-                    'action_required': 'Renouveler immédiatement',
-                    'document_type': doc.document_type
-                })
-            elif days_until_expiry <= 3:
-                reminders.append({
-                    'type': f'DOCUMENT_EXPIRING_SOON_{doc.document_type.upper()}',
-                    'document': doc.name,
-                    'expiry_date': doc.expiry_date,
-                    'days_remaining': days_until_expiry,
-                    'message': f'Votre {doc.name.lower()} expire dans {days_until_expiry} jours',
-                    'priority': 'URGENT',
-                    'action_required': 'Renouveler rapidement',
-                    'document_type': doc.document_type
-                })
-            elif days_until_expiry <= 7:
-                reminders.append({
-                    'type': f'DOCUMENT_EXPIRING_HIGH_{doc.document_type.upper()}',
-                    'document': doc.name,
-                    'expiry_date': doc.expiry_date,
-                    'days_remaining': days_until_expiry,
-                    'message': f'Votre {doc.name.lower()} expire dans {days_until_expiry} jours',
-                    'priority': 'HIGH',
-                    'action_required': 'Planifier le renouvellement',
-                    'document_type': doc.document_type
-                })
-            else:
-                reminders.append({
-                    'type': f'DOCUMENT_EXPIRING_{doc.document_type.upper()}',
-                    'document': doc.name,
-                    'expiry_date': doc.expiry_date,
-                    'days_remaining': days_until_expiry,
-                    'message': f'Votre {doc.name.lower()} expire dans {days_until_expiry} jours',
-                    'priority': 'MEDIUM',
-                    'action_required': 'Planifier le renouvellement',
-                    'document_type': doc.document_type
-                })
-    
-    # Trier par priorité (URGENT > HIGH > MEDIUM)
-    priority_order = {'URGENT': 0, 'HIGH': 1, 'MEDIUM': 2}
-    reminders.sort(key=lambda x: priority_order.get(x['priority'], 3))
+    # Read from the expiry index (users.expiry), most urgent first
+    reminders = user_reminders(request.user)
     
     return Response({
         'reminders': reminders,
@@ -846,7 +618,7 @@ def update_reminder_status(request, reminder_id):
         return Response({'error': 'Rappel non trouvé'}, status=404)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """CRUD utilisateur (Admin uniquement)"""
     queryset = User.objects.all()
     permission_classes = [IsAuthenticated, IsAdmin]
@@ -1027,7 +799,7 @@ class UserViewSet(viewsets.ModelViewSet):
                         status=status.HTTP_400_BAD_REQUEST
                     )
                 # Vérifier si le numéro est déjà utilisé par un autre utilisateur
-                existing_user = User.objects.filter(consular_card_number=consular_card_number).exclude(pk=instance.pk).first()
+                existing_user = User.objects.filter(consular_card_number__blind=consular_card_number).exclude(pk=instance.pk).first()
                 if existing_user:
                     return Response(
                         {"consular_card_number": ["Ce numéro de carte consulaire est déjà utilisé par un autre utilisateur."]},